@@ -0,0 +1,6 @@
+from django.contrib import admin
+
+from .models import ContributorDay, ProjectDay
+
+admin.site.register(ProjectDay)
+admin.site.register(ContributorDay)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from analytics.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily project and contributor rollups from the task and commit tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--project", type=int, action="append", help="Only this project id (repeatable)")
+        parser.add_argument(
+            "--forget-deleted", action="store_true",
+            help="Drop what deleted tasks and commits contributed instead of keeping it",
+        )
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_rollups(options["project"], forget_deleted=options["forget_deleted"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuilt} project-days of analytics"))
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('project', '0007_outboxevent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContributorDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('commits', models.PositiveIntegerField(default=0)),
+                ('successful_commits', models.PositiveIntegerField(default=0)),
+                ('tasks_created', models.PositiveIntegerField(default=0)),
+                ('tasks_completed', models.PositiveIntegerField(default=0)),
+                ('completion_seconds', models.BigIntegerField(default=0)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contributor_rollups', to='project.project')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('project', 'user', 'day'), name='analytics_contributor_day')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProjectDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('commits', models.PositiveIntegerField(default=0)),
+                ('successful_commits', models.PositiveIntegerField(default=0)),
+                ('tasks_created', models.PositiveIntegerField(default=0)),
+                ('tasks_completed', models.PositiveIntegerField(default=0)),
+                ('completion_seconds', models.BigIntegerField(default=0)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='project.project')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('project', 'day'), name='analytics_project_day')],
+            },
+        ),
+    ]
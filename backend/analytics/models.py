@@ -0,0 +1,52 @@
+from django.db import models
+
+from project.models import Project
+from user.models import CustomUser
+
+
+class DailyCounters(models.Model):
+    """
+    One day of activity. Commits count on the day they were created;
+    tasks count as created on their created_at day and, while completed,
+    as completed on their updated_at day (the last write to a completed
+    task), with completion_seconds summing updated_at - created_at.
+    """
+    day = models.DateField()
+    commits = models.PositiveIntegerField(default=0)
+    successful_commits = models.PositiveIntegerField(default=0)
+    tasks_created = models.PositiveIntegerField(default=0)
+    tasks_completed = models.PositiveIntegerField(default=0)
+    completion_seconds = models.BigIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class ProjectDay(DailyCounters):
+    """Per-project daily rollup, kept in step by analytics.signals."""
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="daily_rollups")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'day'], name='analytics_project_day'),
+        ]
+
+    def __str__(self):
+        return f"project {self.project_id} on {self.day}"
+
+
+class ContributorDay(DailyCounters):
+    """
+    Per-contributor daily rollup: commits go to completed_by, created
+    tasks to created_by and completed tasks to assigned_to.
+    """
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="contributor_rollups")
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="daily_rollups")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'user', 'day'], name='analytics_contributor_day'),
+        ]
+
+    def __str__(self):
+        return f"user {self.user_id} in project {self.project_id} on {self.day}"
@@ -0,0 +1,170 @@
+"""
+Incremental upkeep of the daily rollups (ProjectDay, ContributorDay).
+
+Each task or commit contributes fixed amounts to a few (project, user,
+day) cells; a write moves its old contribution out (from loaded_values)
+and its new one in, with F() updates in the same transaction as the
+change. rebuild_rollups() recomputes the same cells from the raw tables.
+
+The rollups are history: deleting a task or commit (accepting a commit
+deletes its task, and the cascade its commits) does not take back what
+it already counted. Only deleting the project or user drops its rows,
+through their foreign keys.
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ContributorDay, ProjectDay
+
+COLUMNS = ["commits", "successful_commits", "tasks_created", "tasks_completed", "completion_seconds"]
+
+ITERATOR_CHUNK_SIZE = 2000
+
+
+def _day(value):
+    return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+
+
+def task_cells(values):
+    """(project_id, user_id, day, column, amount) for a task's values."""
+    project_id, created_at = values["project_id_id"], values["created_at"]
+    yield project_id, values["created_by_id"], _day(created_at), "tasks_created", 1
+    if values["status"] == "completed":
+        updated_at = values["updated_at"]
+        day = _day(updated_at)
+        seconds = max(0, int((updated_at - created_at).total_seconds()))
+        yield project_id, values["assigned_to_id"], day, "tasks_completed", 1
+        yield project_id, values["assigned_to_id"], day, "completion_seconds", seconds
+
+
+def commit_cells(values):
+    project_id, user_id, day = values["project_id_id"], values["completed_by_id"], _day(values["created_at"])
+    yield project_id, user_id, day, "commits", 1
+    if values["is_successful"]:
+        yield project_id, user_id, day, "successful_commits", 1
+
+
+def _values(instance):
+    return {field.attname: getattr(instance, field.attname) for field in instance._meta.concrete_fields}
+
+
+def diff(instances, cells, created=False):
+    """
+    Counter of (project_id, user_id, day, column) deltas for saved
+    ``instances``; updates without loaded_values are skipped, as their
+    old contribution is unknown.
+    """
+    deltas = Counter()
+    for instance in instances:
+        previous = instance.loaded_values
+        if created:
+            before, after = None, _values(instance)
+        elif previous:
+            before, after = previous, _values(instance)
+        else:
+            continue
+        for values, sign in ((before, -1), (after, 1)):
+            if values is not None:
+                for *key, amount in cells(values):
+                    deltas[tuple(key)] += sign * amount
+    return deltas
+
+
+def _grouped(deltas):
+    """Per-project and per-contributor {key: {column: n}}, zeros dropped."""
+    projects, contributors = defaultdict(Counter), defaultdict(Counter)
+    for (project_id, user_id, day, column), n in deltas.items():
+        projects[project_id, day][column] += n
+        if user_id is not None:
+            contributors[project_id, user_id, day][column] += n
+
+    def nonzero(grouped):
+        changes = {key: {column: n for column, n in counter.items() if n} for key, counter in grouped.items()}
+        return {key: columns for key, columns in changes.items() if columns}
+    return nonzero(projects), nonzero(contributors)
+
+
+def _grows(columns):
+    return any(n > 0 for n in columns.values())
+
+
+def apply_deltas(deltas):
+    """Add (project_id, user_id, day, column) deltas to the rollup rows."""
+    projects, contributors = _grouped(deltas)
+    # rows are created for cells that grow; shrinking ones already exist
+    ProjectDay.objects.bulk_create(
+        [ProjectDay(project_id=p, day=d) for (p, d), columns in projects.items() if _grows(columns)],
+        batch_size=500, ignore_conflicts=True,
+    )
+    ContributorDay.objects.bulk_create(
+        [ContributorDay(project_id=p, user_id=u, day=d) for (p, u, d), columns in contributors.items() if _grows(columns)],
+        batch_size=500, ignore_conflicts=True,
+    )
+    for (project_id, day), columns in projects.items():
+        ProjectDay.objects.filter(project_id=project_id, day=day).update(
+            **{column: F(column) + n for column, n in columns.items()}
+        )
+    for (project_id, user_id, day), columns in contributors.items():
+        ContributorDay.objects.filter(project_id=project_id, user_id=user_id, day=day).update(
+            **{column: F(column) + n for column, n in columns.items()}
+        )
+
+
+def _keep_history(rows, recomputed, key_fields):
+    """
+    ``recomputed`` with each column raised to the stored value where that
+    is higher: the stored rows also count tasks and commits since deleted.
+    """
+    merged = {key: dict(columns) for key, columns in recomputed.items()}
+    for row in rows.values(*key_fields, *COLUMNS):
+        columns = merged.setdefault(tuple(row[field] for field in key_fields), {})
+        for column in COLUMNS:
+            if row[column] > columns.get(column, 0):
+                columns[column] = row[column]
+    return merged
+
+
+def rebuild_rollups(project_ids=None, forget_deleted=False):
+    """
+    Recompute the rollups of ``project_ids`` (all projects by default)
+    from the task and commit tables; returns the number of ProjectDay rows.
+
+    Deleted tasks and commits are gone from those tables, so a rebuild
+    keeps any stored count that is higher, unless ``forget_deleted``.
+    """
+    from task.models import Task
+    from task_commit.models import TaskCommit
+
+    tasks, commits = Task.objects.order_by(), TaskCommit.objects.order_by()
+    project_rows, contributor_rows = ProjectDay.objects.all(), ContributorDay.objects.all()
+    if project_ids is not None:
+        project_ids = list(project_ids)
+        tasks, commits = tasks.filter(project_id__in=project_ids), commits.filter(project_id__in=project_ids)
+        project_rows = project_rows.filter(project_id__in=project_ids)
+        contributor_rows = contributor_rows.filter(project_id__in=project_ids)
+
+    totals = Counter()
+    for queryset, cells in ((tasks, task_cells), (commits, commit_cells)):
+        fields = [field.attname for field in queryset.model._meta.concrete_fields]
+        for values in queryset.values(*fields).iterator(chunk_size=ITERATOR_CHUNK_SIZE):
+            for *key, amount in cells(values):
+                totals[tuple(key)] += amount
+    projects, contributors = _grouped(totals)
+
+    with transaction.atomic():
+        if not forget_deleted:
+            projects = _keep_history(project_rows, projects, ("project_id", "day"))
+            contributors = _keep_history(contributor_rows, contributors, ("project_id", "user_id", "day"))
+        project_rows.delete()
+        contributor_rows.delete()
+        ProjectDay.objects.bulk_create(
+            [ProjectDay(project_id=p, day=d, **columns) for (p, d), columns in projects.items()], batch_size=500,
+        )
+        ContributorDay.objects.bulk_create(
+            [ContributorDay(project_id=p, user_id=u, day=d, **columns) for (p, u, d), columns in contributors.items()],
+            batch_size=500,
+        )
+    return len(projects)
@@ -0,0 +1,35 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from task.models import Task
+from task.signals import tasks_updated
+from task_commit.models import TaskCommit
+from task_commit.signals import commit_accepted, commits_upserted
+from .rollups import apply_deltas, commit_cells, diff, task_cells
+
+CELLS = {Task: task_cells, TaskCommit: commit_cells}
+
+
+# no post_delete receiver: the rollups keep counting deleted rows (see rollups)
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=TaskCommit)
+def roll_up_save(sender, instance, created, **kwargs):
+    apply_deltas(diff([instance], CELLS[sender], created=created))
+
+
+@receiver(tasks_updated)
+def roll_up_bulk_update(sender, tasks, **kwargs):
+    apply_deltas(diff(tasks, task_cells))
+
+
+@receiver(commits_upserted)
+def roll_up_upsert(sender, created, updated, **kwargs):
+    deltas = diff(created, commit_cells, created=True)
+    deltas.update(diff(updated, commit_cells))  # update() keeps negative counts, + would drop them
+    apply_deltas(deltas)
+
+
+@receiver(commit_accepted)
+def roll_up_accept(sender, commit, **kwargs):
+    # the commit is deleted right after, but its success stays counted
+    apply_deltas(diff([commit], commit_cells))
@@ -0,0 +1,167 @@
+import io
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from project.access import membership_cache
+from project.models import Project
+from task.models import Task
+from task_commit.models import TaskCommit
+from user.models import CustomUser
+from .models import ContributorDay, ProjectDay
+from .rollups import COLUMNS, rebuild_rollups
+
+DAY_ONE = datetime(2026, 3, 1, 9, 0, tzinfo=dt_timezone.utc)
+
+
+def at(days, hours=0):
+    """Freeze auto_now/auto_now_add at DAY_ONE plus an offset."""
+    return mock.patch("django.utils.timezone.now", return_value=DAY_ONE + timedelta(days=days, hours=hours))
+
+
+def snapshot():
+    fields = ("project_id", "day", *COLUMNS)
+    return (
+        {row[:2]: row[2:] for row in ProjectDay.objects.values_list(*fields) if any(row[2:])},
+        {row[:3]: row[3:] for row in ContributorDay.objects.values_list("user_id", *fields) if any(row[3:])},
+    )
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        membership_cache.clear()
+        self.owner = CustomUser.objects.create_user(email="owner@example.com", github_username="owner")
+        self.dev = CustomUser.objects.create_user(email="dev@example.com", github_username="dev")
+        self.project = Project.objects.create(name="metrics", created_by=self.owner)
+        self.project.contributors.add(self.dev)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        with at(0):
+            self.tasks = [
+                Task.objects.create(
+                    project_id=self.project, title=f"t{i}", branch_name=f"b{i}",
+                    created_by=self.owner, assigned_to=self.dev,
+                )
+                for i in range(4)
+            ]
+
+    def ingest(self, sha, steps):
+        return self.client.post(
+            f"/api/task_commit/commit_task/batch/?project_id={self.project.id}",
+            {"records": [
+                {"github_task": self.tasks[0].id, "commit_id": sha, "step": step, "message": step, "is_successful": ok}
+                for step, ok in steps
+            ]},
+            format="json",
+        )
+
+    def daily(self, query=""):
+        return self.client.get(f"/api/analytics/daily/?project_id={self.project.id}{query}")
+
+    def test_incremental_rollups_match_a_rebuild(self):
+        with at(1, 3):
+            self.client.put(f"/api/tasks/create_task/?pk={self.tasks[0].id}", {"status": "completed"}, format="json")
+        with at(2):
+            self.client.patch(f"/api/tasks/batch/?project_id={self.project.id}", {"changes": [
+                {"id": self.tasks[1].id, "status": "completed"},
+                {"id": self.tasks[2].id, "status": "completed", "assigned_to": self.owner.id},
+            ]}, format="json")
+            self.ingest("a" * 40, [("build", True), ("test", False)])
+        with at(3):
+            self.ingest("a" * 40, [("build", True), ("test", True)])  # one upsert changes
+            TaskCommit.objects.create(
+                github_task=self.tasks[3], project_id=self.project, completed_by=self.owner,
+                commit_id="b" * 40, message="push", step="push",
+            )
+            reopened = Task.objects.get(pk=self.tasks[1].pk)
+            reopened.status = "in_progress"
+            reopened.save()
+            self.tasks[3].delete()
+
+        incremental = snapshot()
+        rebuild_rollups([self.project.id])
+        self.assertEqual(snapshot(), incremental)
+
+        projects, contributors = incremental
+        day = lambda n: date(2026, 3, 1) + timedelta(days=n)
+        columns = lambda **values: tuple(values.get(column, 0) for column in COLUMNS)
+        self.assertEqual(projects, {
+            # the deleted task and its commit stay counted
+            (self.project.id, day(0)): columns(tasks_created=4),
+            (self.project.id, day(1)): columns(tasks_completed=1, completion_seconds=27 * 3600),
+            (self.project.id, day(2)): columns(commits=2, successful_commits=2, tasks_completed=1,
+                                               completion_seconds=48 * 3600),
+            (self.project.id, day(3)): columns(commits=1),
+        })
+        self.assertEqual(contributors[self.owner.id, self.project.id, day(2)], columns(
+            commits=2, successful_commits=2, tasks_completed=1, completion_seconds=48 * 3600,
+        ))
+        self.assertEqual(contributors[self.dev.id, self.project.id, day(1)], columns(
+            tasks_completed=1, completion_seconds=27 * 3600,
+        ))
+
+        rebuild_rollups([self.project.id], forget_deleted=True)
+        self.assertEqual(snapshot()[0][self.project.id, day(0)], columns(tasks_created=3))
+        self.assertNotIn((self.project.id, day(3)), snapshot()[0])
+
+    def test_daily_series_is_served_from_rollups(self):
+        with at(1):
+            self.ingest("c" * 40, [("clone", True), ("build", True), ("test", False)])
+            self.tasks[0].status = "completed"
+            self.tasks[0].save()
+
+        with self.assertNumQueries(1):
+            res = self.daily("&since=2026-02-28&until=2026-03-03")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual([d["day"] for d in res.data["days"]], ["2026-02-28", "2026-03-01", "2026-03-02", "2026-03-03"])
+        first, created, busy, quiet = res.data["days"]
+        self.assertEqual((first["commits"], first["success_rate"]), (0, None))
+        self.assertEqual(created["tasks_created"], 4)
+        self.assertEqual((busy["commits"], busy["successful_commits"]), (3, 2))
+        self.assertAlmostEqual(busy["success_rate"], 2 / 3)
+        self.assertEqual(busy["avg_completion_seconds"], 24 * 3600)
+        self.assertEqual(quiet["tasks_completed"], 0)
+        self.assertEqual(res.data["totals"]["commits"], 3)
+
+        mine = self.daily(f"&since=2026-03-01&until=2026-03-02&user_id={self.owner.id}").data
+        self.assertEqual([d["commits"] for d in mine["days"]], [0, 3])
+        self.assertEqual(mine["totals"]["tasks_created"], 4)
+        self.assertEqual(mine["totals"]["tasks_completed"], 0)
+
+    def test_contributor_totals(self):
+        with at(1):
+            self.ingest("d" * 40, [("build", True)])
+            self.tasks[0].status = "completed"
+            self.tasks[0].save()
+        res = self.client.get(
+            f"/api/analytics/contributors/?project_id={self.project.id}&since=2026-03-01&until=2026-03-31"
+        )
+        self.assertEqual([(c["user_id"], c["commits"], c["tasks_completed"]) for c in res.data["contributors"]], [
+            (self.owner.id, 1, 0), (self.dev.id, 0, 1),
+        ])
+        self.assertEqual(res.data["contributors"][0]["success_rate"], 1.0)
+
+    def test_rejects_bad_ranges(self):
+        for query in ("&since=2026-03-05&until=2026-03-01", "&since=2020-01-01&until=2026-01-01",
+                      "&since=yesterday", "&user_id=me"):
+            self.assertEqual(self.daily(query).status_code, 400, query)
+        stranger = CustomUser.objects.create_user(email="stranger@example.com")
+        self.client.force_authenticate(stranger)
+        self.assertEqual(self.daily().status_code, 403)
+
+    def test_rebuild_command_and_project_delete(self):
+        ProjectDay.objects.all().delete()
+        out = io.StringIO()
+        call_command("rebuild_analytics", stdout=out)
+        self.assertIn("Rebuilt 1 project-days", out.getvalue())
+        self.assertEqual(ProjectDay.objects.get().tasks_created, 4)
+
+        # the rollups go with the project, not with its tasks
+        self.tasks[0].delete()
+        self.assertEqual(ProjectDay.objects.get().tasks_created, 4)
+        self.project.delete()
+        self.assertFalse(ProjectDay.objects.exists())
+        self.assertFalse(ContributorDay.objects.exists())
@@ -0,0 +1,7 @@
+from django.urls import path
+from .views import ContributorsView, DailyView
+
+urlpatterns = [
+    path('daily/', DailyView.as_view(), name='analytics_daily'),
+    path('contributors/', ContributorsView.as_view(), name='analytics_contributors'),
+]
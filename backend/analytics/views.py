@@ -0,0 +1,125 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from project.permissions import IsProjectMember
+from .models import ContributorDay, ProjectDay
+from .rollups import COLUMNS
+
+DEFAULT_RANGE_DAYS = 30
+MAX_RANGE_DAYS = getattr(settings, "ANALYTICS_MAX_RANGE_DAYS", 731)
+
+
+def date_range(params):
+    """(since, until) from ?since=/?until= (YYYY-MM-DD, inclusive); raises ValueError."""
+    try:
+        until = parse_date(params["until"]) if params.get("until") else timezone.localdate()
+        since = parse_date(params["since"]) if params.get("since") else until - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    except ValueError:
+        until = since = None
+    if until is None or since is None:
+        raise ValueError("since and until must be dates (YYYY-MM-DD)")
+    if since > until:
+        raise ValueError("since must not be after until")
+    if (until - since).days >= MAX_RANGE_DAYS:
+        raise ValueError(f"at most {MAX_RANGE_DAYS} days per request")
+    return since, until
+
+
+def metrics(counters):
+    """Raw counters plus the derived rates."""
+    commits, completed = counters["commits"], counters["tasks_completed"]
+    return {
+        **counters,
+        "success_rate": counters["successful_commits"] / commits if commits else None,
+        "avg_completion_seconds": counters["completion_seconds"] / completed if completed else None,
+    }
+
+
+def _totals(rows):
+    return {column: sum(row[column] for row in rows) for column in COLUMNS}
+
+
+class DailyView(APIView):
+    """
+    GET ?project_id=N[&since=&until=][&user_id=U]: one entry per day of the
+    range (zeros included) with commits, successful_commits, success_rate,
+    tasks_created, tasks_completed and avg_completion_seconds, plus totals.
+    Served from the daily rollups, so the cost grows with the days asked
+    for, not with the commits behind them.
+    """
+    permission_classes = [IsAuthenticated, IsProjectMember]
+
+    def get(self, request):
+        project_id = request.query_params.get("project_id")
+        if not project_id:
+            return Response({"error": "project_id required"}, status=status.HTTP_400_BAD_REQUEST)
+        user_id = request.query_params.get("user_id")
+        if user_id and not user_id.isdigit():
+            return Response({"error": "user_id must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            since, until = date_range(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if user_id:
+            rows = ContributorDay.objects.filter(project_id=project_id, user_id=user_id)
+        else:
+            rows = ProjectDay.objects.filter(project_id=project_id)
+        by_day = {row["day"]: row for row in rows.filter(day__range=(since, until)).values("day", *COLUMNS)}
+
+        zero = dict.fromkeys(COLUMNS, 0)
+        days = []
+        for offset in range((until - since).days + 1):
+            day = since + timedelta(days=offset)
+            counters = {column: by_day.get(day, zero)[column] for column in COLUMNS}
+            days.append({"day": day.isoformat(), **metrics(counters)})
+        return Response({
+            "project_id": int(project_id),
+            "since": since.isoformat(),
+            "until": until.isoformat(),
+            "days": days,
+            "totals": metrics(_totals(by_day.values())),
+        }, status=status.HTTP_200_OK)
+
+
+class ContributorsView(APIView):
+    """
+    GET ?project_id=N[&since=&until=]: each contributor's totals over the
+    range (same metrics as the daily series), most commits first.
+    """
+    permission_classes = [IsAuthenticated, IsProjectMember]
+
+    def get(self, request):
+        project_id = request.query_params.get("project_id")
+        if not project_id:
+            return Response({"error": "project_id required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            since, until = date_range(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = (
+            ContributorDay.objects.filter(project_id=project_id, day__range=(since, until))
+            .order_by()
+            .values("user_id")
+            .annotate(**{f"total_{column}": Sum(column) for column in COLUMNS})
+        )
+        contributors = [
+            {"user_id": row["user_id"], **metrics({column: row[f"total_{column}"] for column in COLUMNS})}
+            for row in rows
+        ]
+        contributors.sort(key=lambda row: (-row["commits"], -row["tasks_completed"], row["user_id"]))
+        return Response({
+            "project_id": int(project_id),
+            "since": since.isoformat(),
+            "until": until.isoformat(),
+            "contributors": contributors,
+        }, status=status.HTTP_200_OK)
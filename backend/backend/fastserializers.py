@@ -0,0 +1,217 @@
+"""
+values()-based read serializers for hot list endpoints.
+
+A FastSerializer reproduces the output of an existing DRF ModelSerializer
+without building model instances or walking fields per row. The first
+time a FastSerializer class is used, its ``serializer_class`` is
+introspected into a plan:
+
+* the ``values()`` lookups needed for every readable field, including
+  forward relations of nested serializers (fetched through joins);
+* a converter per field (DRF's own ``to_representation`` where the
+  value needs formatting, e.g. datetimes; identity otherwise);
+* one extra set-based query per nested ``many=True`` serializer or
+  many-to-many id list.
+
+Rows are then built straight from value dicts, with the same keys, order
+and values as ``serializer_class(queryset, many=True).data``.
+
+    class FastTaskSerializer(FastSerializer):
+        serializer_class = TaskSerializer
+
+    FastTaskSerializer(Task.objects.filter(...)).data
+
+Serializers using backend.flexfields take ``fields``/``expand`` here too;
+each combination gets its own plan. For exports, ``iterator()`` yields the
+same rows a chunk at a time, so memory stays flat however many there are.
+"""
+import threading
+from collections import OrderedDict
+from itertools import islice
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import fields as drf_fields
+from rest_framework import relations, serializers
+
+# fields whose database value is already the representation
+PASSTHROUGH_FIELDS = (
+    drf_fields.CharField,
+    drf_fields.IntegerField,
+    drf_fields.BooleanField,
+    drf_fields.ChoiceField,
+)
+
+# fields whose representation needs formatting
+CONVERTED_FIELDS = (
+    drf_fields.DateTimeField,
+    drf_fields.DateField,
+    drf_fields.TimeField,
+    drf_fields.DecimalField,
+    drf_fields.FloatField,
+    drf_fields.UUIDField,
+    drf_fields.DurationField,
+    drf_fields.JSONField,
+)
+
+
+PLAN_CACHE_SIZE = 64
+_plans_lock = threading.Lock()
+
+
+class ManyStep:
+    """
+    A many-to-many relation rendered as a list: nested serializers
+    (``child`` is a serializer) or primary keys (``child`` is None).
+    """
+
+    def __init__(self, key, relation, child, parent_key):
+        self.key = key
+        self.parent_key = parent_key
+        self.query_name = relation.related_query_name()
+        self.model = relation.related_model
+        self.plan = Plan(child) if child is not None else None
+
+    def fetch(self, parent_ids):
+        """{parent pk: [child dicts or pks]} for all ``parent_ids`` in one query."""
+        grouped = {pk: [] for pk in parent_ids}
+        if not parent_ids:
+            return grouped
+        related = self.model.objects.filter(
+            **{f"{self.query_name}__in": parent_ids}
+        ).order_by(self.query_name, "pk")
+        if self.plan is None:
+            for parent, pk in related.values_list(self.query_name, "pk"):
+                grouped[parent].append(pk)
+            return grouped
+        rows = list(related.values(self.query_name, *self.plan.lookups))
+        for row, data in zip(rows, self.plan.materialize(rows)):
+            grouped[row[self.query_name]].append(data)
+        return grouped
+
+
+class Plan:
+    def __init__(self, serializer, prefix=""):
+        model = serializer.Meta.model
+        self.lookups = []
+        self.steps = []
+        self.many_steps = []
+
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if len(field.source_attrs) != 1:
+                raise ImproperlyConfigured(f"{name}: dotted sources are not supported")
+            lookup = prefix + field.source
+
+            if isinstance(field, (serializers.ListSerializer, relations.ManyRelatedField)):
+                relation = model._meta.get_field(field.source)
+                if not relation.many_to_many:
+                    raise ImproperlyConfigured(f"{name}: only many-to-many lists are supported")
+                if isinstance(field, relations.ManyRelatedField):
+                    if not isinstance(field.child_relation, relations.PrimaryKeyRelatedField):
+                        raise ImproperlyConfigured(f"{name}: only primary key lists are supported")
+                    child = None
+                else:
+                    child = field.child
+                step = ManyStep(name, relation, child, prefix + model._meta.pk.name)
+                self.lookups.append(step.parent_key)
+                self.steps.append(("many", name, step, None))
+                self.many_steps.append(step)
+            elif isinstance(field, serializers.BaseSerializer):
+                nested = Plan(field, prefix=lookup + "__")
+                # a NULL foreign key renders the whole nested object as None
+                self.lookups.append(lookup)
+                self.lookups.extend(nested.lookups)
+                self.steps.append(("one", name, nested, lookup))
+                self.many_steps.extend(nested.many_steps)
+            elif isinstance(field, relations.PrimaryKeyRelatedField):
+                self.lookups.append(lookup)
+                self.steps.append(("value", name, lookup, None))
+            elif isinstance(field, CONVERTED_FIELDS):
+                self.lookups.append(lookup)
+                self.steps.append(("value", name, lookup, field.to_representation))
+            elif isinstance(field, PASSTHROUGH_FIELDS):
+                self.lookups.append(lookup)
+                self.steps.append(("value", name, lookup, None))
+            else:
+                raise ImproperlyConfigured(
+                    f"{name}: {type(field).__name__} is not supported by FastSerializer"
+                )
+        self.lookups = list(dict.fromkeys(self.lookups))
+
+    def build(self, row, resolved):
+        data = {}
+        for kind, key, arg, extra in self.steps:
+            if kind == "value":
+                value = row[arg]
+                data[key] = extra(value) if extra is not None and value is not None else value
+            elif kind == "one":
+                data[key] = arg.build(row, resolved) if row[extra] is not None else None
+            else:
+                data[key] = resolved[arg].get(row[arg.parent_key], [])
+        return data
+
+    def columns(self, prefix=""):
+        """Output keys with nested objects flattened to dotted names."""
+        names = []
+        for kind, key, arg, _ in self.steps:
+            if kind == "one":
+                names.extend(arg.columns(prefix + key + "."))
+            else:
+                names.append(prefix + key)
+        return names
+
+    def materialize(self, rows):
+        resolved = {}
+        for step in self.many_steps:
+            parent_ids = {row[step.parent_key] for row in rows if row[step.parent_key] is not None}
+            resolved[step] = step.fetch(parent_ids)
+        return [self.build(row, resolved) for row in rows]
+
+
+class FastSerializer:
+    """Read-only, values()-based stand-in for ``serializer_class(many=True)``."""
+
+    serializer_class = None
+
+    def __init__(self, queryset, **options):
+        self.queryset = queryset
+        # fields/expand for backend.flexfields serializers
+        self.options = {key: value for key, value in options.items() if value}
+
+    @classmethod
+    def plan(cls, **options):
+        # compiled once per subclass and option set, on first use; threaded
+        # workers share the cache, so it is only touched under the lock and
+        # a plan built twice in a race is dropped in favour of the first
+        key = tuple(sorted((name, frozenset(value)) for name, value in options.items()))
+        with _plans_lock:
+            plans = cls.__dict__.get("_plans")
+            if plans is None:
+                plans = cls._plans = OrderedDict()
+            plan = plans.get(key)
+        if plan is not None:
+            return plan
+        plan = Plan(cls.serializer_class(**options))
+        with _plans_lock:
+            plan = plans.setdefault(key, plan)
+            while len(plans) > PLAN_CACHE_SIZE:
+                plans.popitem(last=False)
+        return plan
+
+    @property
+    def data(self):
+        plan = self.plan(**self.options)
+        rows = list(self.queryset.values(*plan.lookups))
+        return plan.materialize(rows)
+
+    def iterator(self, chunk_size=2000):
+        """
+        The rows of ``data``, read with QuerySet.iterator() (a server-side
+        cursor where the database has them) and built ``chunk_size`` at a
+        time, with the many-to-many queries run per chunk.
+        """
+        plan = self.plan(**self.options)
+        rows = self.queryset.values(*plan.lookups).iterator(chunk_size=chunk_size)
+        while chunk := list(islice(rows, chunk_size)):
+            yield from plan.materialize(chunk)
@@ -0,0 +1,83 @@
+"""
+Sparse fieldsets and opt-in expansion for ModelSerializers.
+
+Relations named in a serializer's ``Meta.expandable`` render as primary
+keys unless expanded, in which case they nest the serializer mapped to
+them. Clients choose per request:
+
+    ?fields=id,name,created_by     only these fields
+    ?expand=created_by,contributors
+    ?expand=project.contributors   dotted names reach nested serializers
+                                   (and imply expanding ``project``)
+
+Views pass ``flex_params(request)`` on to the serializer (or to its
+FastSerializer, which compiles one plan per combination).
+"""
+from rest_framework.relations import ManyRelatedField
+
+
+def parse_names(value):
+    """'a, b,c' -> frozenset({'a', 'b', 'c'}); empty or missing -> None."""
+    if not value:
+        return None
+    names = frozenset(name.strip() for name in value.split(",") if name.strip())
+    return names or None
+
+
+def flex_params(request):
+    return {
+        "fields": parse_names(request.query_params.get("fields")),
+        "expand": parse_names(request.query_params.get("expand")) or frozenset(),
+    }
+
+
+def _head(names):
+    return {name.split(".", 1)[0] for name in names}
+
+
+def _nested(names, prefix):
+    """Names below ``prefix.``, or None if ``prefix`` itself was listed bare."""
+    rest = frozenset(name[len(prefix) + 1:] for name in names if name.startswith(prefix + "."))
+    return rest or None
+
+
+def trim(row, fields):
+    """Apply a ``fields`` set to an already rendered dict."""
+    if fields is None:
+        return row
+    return {key: value for key, value in row.items() if key in fields}
+
+
+class FlexFieldsMixin:
+    """
+    Mixin for a ModelSerializer whose relations are ids by default.
+
+    ``Meta.expandable`` maps relation names to the serializer used when
+    the relation is expanded. ``fields`` and ``expand`` are keyword
+    arguments (sets of names, dotted for nested serializers).
+    """
+
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        self._only = frozenset(fields) if fields is not None else None
+        self._expand = frozenset(expand or ())
+        super().__init__(*args, **kwargs)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        expandable = getattr(self.Meta, "expandable", {})
+
+        for name in _head(self._expand) & set(expandable) & set(fields):
+            nested = expandable[name]
+            kwargs = {"read_only": True, "many": isinstance(fields[name], ManyRelatedField)}
+            if fields[name].source != name:
+                kwargs["source"] = fields[name].source
+            if issubclass(nested, FlexFieldsMixin):
+                kwargs["expand"] = _nested(self._expand, name) or ()
+                if self._only is not None:
+                    kwargs["fields"] = _nested(self._only, name)
+            fields[name] = nested(**kwargs)
+
+        if self._only is not None:
+            keep = _head(self._only)
+            fields = type(fields)((name, field) for name, field in fields.items() if name in keep)
+        return fields
@@ -0,0 +1,81 @@
+"""
+Fast JSON used by the REST API and the chat sockets.
+
+Encodes with orjson when it is installed and falls back to the standard
+library otherwise. Either way the output follows DRF's JSONRenderer
+rules: compact separators, UTF-8 rather than \\u escapes (except U+2028
+and U+2029, which stay escaped for JavaScript), and datetimes, Decimals
+and other non-JSON types formatted by DRF's JSONEncoder. UUIDs are
+encoded natively.
+"""
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised where orjson is missing
+    orjson = None
+
+_drf_default = JSONEncoder().default
+
+_LINE_SEPARATORS = ((b"\xe2\x80\xa8", b"\\u2028"), (b"\xe2\x80\xa9", b"\\u2029"))
+
+
+def _js_safe(data):
+    for raw, escaped in _LINE_SEPARATORS:
+        if raw in data:
+            data = data.replace(raw, escaped)
+    return data
+
+
+if orjson is not None:
+    BACKEND = "orjson"
+    _OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def dumps(obj):
+        """Encode ``obj`` to UTF-8 JSON bytes."""
+        return _js_safe(orjson.dumps(obj, default=_drf_default, option=_OPTIONS))
+
+    def loads(data):
+        """Decode JSON from str or bytes; raises ValueError on bad input."""
+        return orjson.loads(data)
+else:
+    BACKEND = "json"
+
+    def dumps(obj):
+        return _js_safe(json.dumps(
+            obj, cls=JSONEncoder, ensure_ascii=False, allow_nan=False, separators=(",", ":"),
+        ).encode("utf-8"))
+
+    def loads(data):
+        return json.loads(data)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer backed by ``dumps``; indented output is left to DRF."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if self.get_indent(accepted_media_type or "", renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser backed by ``loads`` for UTF-8 request bodies."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if encoding.lower().replace("_", "-") not in ("utf-8", "utf8"):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return loads(stream.read())
+        except ValueError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
@@ -42,6 +42,8 @@ INSTALLED_APPS = [
     "joinrequest",
     "chatapp",
     "task_commit",
+    "sync",
+    "analytics",
 ]
 
 # Middleware
@@ -71,7 +73,17 @@ CORS_ALLOW_ALL_ORIGINS = True
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework_simplejwt.authentication.JWTAuthentication",
-    )
+    ),
+    # orjson-backed JSON (stdlib fallback), see backend/jsoncodec.py
+    "DEFAULT_RENDERER_CLASSES": (
+        "backend.jsoncodec.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "backend.jsoncodec.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
 }
 
 # JWT Settings
@@ -113,6 +125,66 @@ CHANNEL_LAYERS = {
         },
     },
 }
+# Chat
+CHAT_ACCESS_CACHE_SIZE = 10000      # (user, project) handshake decisions kept per process
+CHAT_ACCESS_CACHE_TTL = 10          # seconds a removed member may still connect via another worker
+CHAT_FLUSH_BATCH_SIZE = 100         # write-behind buffer flushes at this many messages...
+CHAT_FLUSH_INTERVAL = 0.5           # ...or after this many seconds
+CHAT_ID_BLOCK_SIZE = 1000           # message ids reserved per allocation
+CHAT_SPOOL_PATH = BASE_DIR / "chat_spool.jsonl"   # messages the DB refused, replayed on next flush
+CHAT_REPLAY_BUFFER_SIZE = 200       # recent events kept in memory per room for ?since= resumes
+CHAT_REPLAY_LIMIT = 500             # larger gaps get "resync_required" instead of a replay
+CHAT_REPLAY_OVERLAP = 5             # seconds of other workers' messages replayed before the resume point
+CHAT_MAX_SUBSCRIPTIONS = 50         # project streams one multiplexed socket may follow
+CHAT_ARCHIVE_AFTER_DAYS = 180       # default age for `manage.py archive_chat`
+CHAT_ARCHIVE_SEGMENT_SIZE = 1000    # messages per archive segment (what one history page unpacks)
+# Sockets pick their wire format with ?encoding=json (default) or ?encoding=msgpack.
+# permessage-deflate is negotiated by the ASGI server, not here: uvicorn offers it
+# (--ws-per-message-deflate, on by default), daphne does not.
+
+# Projects
+PROJECT_MEMBERSHIP_CACHE_SIZE = 10000   # users whose project-id sets are kept per process
+PROJECT_MEMBERSHIP_CACHE_TTL = 60       # seconds; bounds staleness from other processes' writes
+
+# Live events (`manage.py dispatch_outbox`, see project/events.py)
+OUTBOX_BATCH_SIZE = 500             # outbox rows coalesced and sent per round
+OUTBOX_POLL_INTERVAL = 0.2          # seconds between polls when the outbox is empty
+
+# Sync (/api/sync/)
+SYNC_LOG_RETENTION_DAYS = 30        # default for `manage.py prune_sync_log`
+SYNC_SETTLE_SECONDS = 5             # cursors stay behind changes younger than this (see sync/log.py)
+SYNC_RESET_AFTER_SECONDS = 86400    # cursors from an older snapshot get a fresh one
+
+# Analytics (/api/analytics/)
+ANALYTICS_MAX_RANGE_DAYS = 731      # longest since..until range served per request
+# Rollups are kept up to date on write; `manage.py rebuild_analytics` recomputes them.
+
+# Exports (?output=ndjson|csv on the export endpoints, see backend/export.py)
+EXPORT_CHUNK_SIZE = 2000            # rows fetched and encoded per round trip
+
+# Caches: "shared" is seen by every worker: Redis when REDIS_URL is set (e.g.
+# redis://127.0.0.1:6379/1), otherwise the database (its table is created by
+# `manage.py migrate`). "default" stays a per-process LocMemCache.
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+}
+if os.getenv("REDIS_URL"):
+    CACHES["shared"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("REDIS_URL"),
+    }
+else:
+    CACHES["shared"] = {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "django_cache",
+    }
+
+# Dashboard (/api/user/me/)
+# Cache alias for dashboard versions and bodies. It must be shared by all workers;
+# None renders every request fresh (no ETags).
+DASHBOARD_CACHE = "shared"
+DASHBOARD_CACHE_TTL = 60 * 60       # seconds a rendered dashboard body is kept per version
+
 # DATABASES = {
 #     "default": dj_database_url.config(default=os.getenv("DATABASE_URL"))
 # }
@@ -0,0 +1,35 @@
+from django.db.models.base import DEFERRED
+
+
+class LoadedValuesMixin:
+    """
+    Model mixin remembering the column values an instance was loaded (or
+    last saved) with, so save signals can tell what an update changed
+    without querying the old row.
+
+        previous = instance.loaded_values   # {} for unsaved instances
+        previous.get("status")
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values) if value is not DEFERRED
+        }
+        return instance
+
+    @property
+    def loaded_values(self):
+        return getattr(self, "_loaded_values", {})
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # post_save receivers ran inside super().save() with the old values
+        self.remember_values()
+
+    def remember_values(self):
+        """Treat the current values as saved, e.g. after a bulk_update()."""
+        self._loaded_values = {
+            field.attname: getattr(self, field.attname) for field in self._meta.concrete_fields
+        }
@@ -35,6 +35,8 @@ urlpatterns = [
     path("auth/github/", github_login),
     path("auth/github/callback/", github_callback),
     path("api/task_commit/", include("task_commit.urls")),
+    path("api/sync/", include("sync.urls")),
+    path("api/analytics/", include("analytics.urls")),
 ]
 
 
@@ -0,0 +1,209 @@
+"""
+Load test for the chat WebSocket path.
+
+Drives backend.asgi.application in-process with N clients spread over M
+rooms on the in-memory channel layer, so it needs neither Redis nor a
+running server. Reports connect latency, end-to-end fan-out latency,
+delivered messages per second, memory per connection, chat INSERT count
+and chatapp_home latency against a seeded history.
+
+    python -m benchmarks.chat_ws --clients 200 --rooms 10 --messages 20 \\
+        --seed-messages 20000 --out chat.json
+"""
+import asyncio
+import random
+import time
+import tracemalloc
+
+from benchmarks.harness import (
+    base_parser, percentiles, setup_django, throwaway_database, write_report,
+)
+
+
+def parse_args():
+    parser = base_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--rooms", type=int, default=10)
+    parser.add_argument("--messages", type=int, default=10, help="messages sent per client")
+    parser.add_argument("--seed-messages", type=int, default=1000, help="history rows per room")
+    parser.add_argument("--encoding", choices=["json", "msgpack"], default="json")
+    parser.add_argument("--history-requests", type=int, default=50)
+    return parser.parse_args()
+
+
+def seed(args):
+    from chatapp.buffer import reserve_ids
+    from chatapp.models import ChatMessage
+    from project.models import Project
+    from user.models import CustomUser
+
+    rng = random.Random(args.seed)
+    users = CustomUser.objects.bulk_create([
+        CustomUser(email=f"load{i}@example.com", github_username=f"load{i}")
+        for i in range(args.clients)
+    ])
+    owner = users[0]
+    projects = [
+        Project.objects.create(name=f"load-room-{i}", created_by=owner)
+        for i in range(args.rooms)
+    ]
+    membership = {project.id: [] for project in projects}
+    for i, user in enumerate(users):
+        project = projects[i % len(projects)]
+        membership[project.id].append(user)
+    for project in projects:
+        project.contributors.add(*membership[project.id])
+
+        start = reserve_ids(args.seed_messages)
+        ChatMessage.objects.bulk_create([
+            ChatMessage(
+                id=start + n, seq=n + 1, project=project,
+                sender=rng.choice(membership[project.id]),
+                message=f"seeded message {n}",
+            )
+            for n in range(args.seed_messages)
+        ], batch_size=2000)
+    return projects, membership
+
+
+async def run_sockets(args, membership):
+    from channels.testing import WebsocketCommunicator
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from backend.asgi import application
+    from chatapp.buffer import chat_buffer
+    from chatapp.codecs import CODECS
+
+    codec = CODECS[args.encoding]
+    clients = []
+    for project_id, users in membership.items():
+        for user in users:
+            token = AccessToken.for_user(user)
+            clients.append((project_id, WebsocketCommunicator(
+                application, f"/ws/chat/{project_id}/?token={token}&encoding={args.encoding}",
+            )))
+
+    async def receive(communicator):
+        output = await communicator.receive_output(timeout=30)
+        return codec.decode(output.get("text"), output.get("bytes"))
+
+    # ---------- CONNECT ----------
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    connect_ms = []
+    for _, communicator in clients:
+        started = time.perf_counter()
+        await communicator.connect()
+        hello = await receive(communicator)
+        connect_ms.append((time.perf_counter() - started) * 1000)
+        assert hello["type"] == "connection_success", hello
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # ---------- FAN-OUT ----------
+    room_sizes = {project_id: len(users) for project_id, users in membership.items()}
+    fanout_ms = []
+
+    async def listen(project_id, communicator):
+        expected = room_sizes[project_id] * args.messages
+        received = 0
+        while received < expected:
+            frame = await receive(communicator)
+            if frame["type"] != "chat_message":
+                continue
+            sent_at = float(frame["message"].split("|", 1)[0])
+            fanout_ms.append((time.perf_counter() - sent_at) * 1000)
+            received += 1
+
+    async def talk(communicator):
+        for _ in range(args.messages):
+            payload = {"message": f"{time.perf_counter()}|load"}
+            if codec.binary:
+                await communicator.send_to(bytes_data=codec.encode(payload))
+            else:
+                await communicator.send_to(text_data=codec.encode(payload))
+            await asyncio.sleep(0)
+
+    listeners = [asyncio.ensure_future(listen(pid, c)) for pid, c in clients]
+    started = time.perf_counter()
+    await asyncio.gather(*(talk(c) for _, c in clients))
+    await asyncio.gather(*listeners)
+    duration = time.perf_counter() - started
+    await chat_buffer.flush()
+
+    for _, communicator in clients:
+        await communicator.disconnect()
+
+    sent = len(clients) * args.messages
+    return {
+        "connect_ms": percentiles(connect_ms),
+        "fanout_ms": percentiles(fanout_ms),
+        "messages": {
+            "sent": sent,
+            "delivered": len(fanout_ms),
+            "duration_s": round(duration, 3),
+            "sent_per_s": round(sent / duration, 1),
+            "delivered_per_s": round(len(fanout_ms) / duration, 1),
+        },
+        "memory": {
+            "per_connection_kb": round((after - before) / 1024 / max(len(clients), 1), 2),
+        },
+    }
+
+
+def measure_history(args, membership):
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    timings = []
+    for i in range(args.history_requests):
+        project_id = list(membership)[i % len(membership)]
+        client.force_authenticate(membership[project_id][0])
+        started = time.perf_counter()
+        response = client.get("/api/chat/chatapp_home/", {"project_id": project_id})
+        timings.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, response.content
+    return percentiles(timings)
+
+
+def main():
+    args = parse_args()
+    setup_django()
+
+    from asgiref.sync import async_to_sync
+    from django.db import connection
+    from django.test.utils import override_settings
+
+    from chatapp.access import access_cache
+    from chatapp.replay import rooms
+
+    inserts = []
+
+    def count_chat_inserts(execute, sql, params, many, context):
+        # INSERT INTO / INSERT OR IGNORE INTO / ON CONFLICT variants
+        if sql.startswith("INSERT") and '"chatapp_chatmessage"' in sql.split("(", 1)[0]:
+            inserts.append(sql)
+        return execute(sql, params, many, context)
+
+    layers = {"default": {
+        "BACKEND": "channels.layers.InMemoryChannelLayer",
+        "CONFIG": {"capacity": 100000},
+    }}
+    with throwaway_database(), override_settings(CHANNEL_LAYERS=layers):
+        from channels.layers import channel_layers
+        channel_layers.backends.clear()
+        access_cache.clear()
+        rooms.clear()
+
+        _, membership = seed(args)
+        # thread-sensitive DB work runs on this thread under async_to_sync
+        with connection.execute_wrapper(count_chat_inserts):
+            results = async_to_sync(run_sockets)(args, membership)
+        results["db"] = {"chat_insert_statements": len(inserts)}
+        results["history_ms"] = measure_history(args, membership)
+
+    write_report("chat_ws", vars(args), results, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+JSON encode/decode cost: DRF/stdlib vs backend.jsoncodec.
+
+Renders a seeded task list and a commit list with DRF's JSONRenderer and
+with FastJSONRenderer (asserting identical bytes), and encodes/decodes a
+chat event per frame with the stdlib and with the chat JSONCodec.
+
+    python -m benchmarks.json_codec --rows 5000 --frames 20000 --out json.json
+"""
+import json
+import time
+
+from benchmarks.harness import base_parser, setup_django, throwaway_database, write_report
+
+
+def parse_args():
+    parser = base_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000, help="rows in each rendered list")
+    parser.add_argument("--frames", type=int, default=10000, help="chat frames encoded/decoded")
+    parser.add_argument("--repeat", type=int, default=5)
+    return parser.parse_args()
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def compare(repeat, units, old, new):
+    old_s, new_s = best_of(repeat, old), best_of(repeat, new)
+    return {
+        "stdlib_per_s": round(units / old_s, 1),
+        "fast_per_s": round(units / new_s, 1),
+        "speedup": round(old_s / new_s, 2),
+    }
+
+
+def seed(rows):
+    from project.models import Project
+    from task.models import Task
+    from task_commit.models import TaskCommit
+    from user.models import CustomUser
+
+    users = CustomUser.objects.bulk_create([
+        CustomUser(email=f"json{i}@example.com", github_username=f"json{i}") for i in range(20)
+    ])
+    project = Project.objects.create(name="json-bench", created_by=users[0])
+    tasks = Task.objects.bulk_create([
+        Task(
+            project_id=project, title=f"task {n}", branch_name=f"task-{n}",
+            description="lorem ipsum " * 10, assigned_to=users[n % 20], created_by=users[0],
+        )
+        for n in range(rows)
+    ], batch_size=1000)
+    TaskCommit.objects.bulk_create([
+        TaskCommit(
+            github_task=tasks[n], project_id=project, completed_by=users[n % 20],
+            commit_id=f"{n:040x}", message=f"commit {n}", step="test",
+        )
+        for n in range(rows)
+    ], batch_size=1000)
+    return project, users[0]
+
+
+def main():
+    args = parse_args()
+    setup_django()
+
+    from django.utils import timezone
+    from rest_framework.renderers import JSONRenderer
+
+    from backend.jsoncodec import BACKEND, FastJSONRenderer
+    from chatapp.codecs import CODECS
+    from task.models import Task
+    from task.serializers import FastTaskSerializer
+    from task_commit.models import TaskCommit
+    from task_commit.serializers import FastTaskCommitListSerializer
+    from user.serializers import usserprofileSerializer
+
+    drf, fast = JSONRenderer(), FastJSONRenderer()
+    results = {"backend": BACKEND}
+    with throwaway_database():
+        project, sender = seed(args.rows)
+        lists = {
+            "task_list": FastTaskSerializer(
+                Task.objects.filter(project_id=project), expand={"assigned_to", "created_by"},
+            ).data,
+            "commit_list": FastTaskCommitListSerializer(TaskCommit.objects.filter(project_id=project)).data,
+        }
+        for name, data in lists.items():
+            body = drf.render(data)
+            if fast.render(data) != body:
+                raise SystemExit(f"{name}: FastJSONRenderer output differs from JSONRenderer")
+            results[name] = compare(args.repeat, 1, lambda: drf.render(data), lambda: fast.render(data))
+            results[name]["bytes"] = len(body)
+
+        now = timezone.now()
+        event = {
+            "type": "chat_message", "project_id": project.id, "id": 1, "seq": 1,
+            "sender": dict(usserprofileSerializer(sender).data),
+            "message": "hello everyone, the build is green again",
+            "timestamp": now.isoformat(), "ts": int(now.timestamp() * 1000),
+        }
+        codec = CODECS["json"]
+        frame = codec.encode(event)
+        results["chat_encode"] = compare(
+            args.repeat, args.frames,
+            lambda: [json.dumps(event) for _ in range(args.frames)],
+            lambda: [codec.encode(event) for _ in range(args.frames)],
+        )
+        results["chat_decode"] = compare(
+            args.repeat, args.frames,
+            lambda: [json.loads(frame) for _ in range(args.frames)],
+            lambda: [codec.decode(frame) for _ in range(args.frames)],
+        )
+
+    write_report("json_codec", vars(args), results, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Read-serializer throughput: DRF ModelSerializers vs their FastSerializer.
+
+Seeds tasks, commits and join requests, then times each list serializer
+both ways over the same queryset (query time included) and reports
+rows/sec, with relations fully expanded (the heaviest shape). The
+rendered JSON of both is compared once per pair and the run fails if
+they differ.
+
+    python -m benchmarks.serializers --rows 5000 --repeat 5 --out ser.json
+"""
+import random
+import time
+
+from benchmarks.harness import base_parser, setup_django, throwaway_database, write_report
+
+
+def parse_args():
+    parser = base_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000, help="rows per serialized list")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--contributors", type=int, default=5, help="contributors per project")
+    parser.add_argument("--repeat", type=int, default=5)
+    return parser.parse_args()
+
+
+def seed(args):
+    from joinrequest.models import JoinRequest
+    from project.models import Project
+    from task.models import Task
+    from task_commit.models import TaskCommit
+    from user.models import CustomUser
+
+    rng = random.Random(args.seed)
+    users = CustomUser.objects.bulk_create([
+        CustomUser(email=f"ser{i}@example.com", github_username=f"ser{i}")
+        for i in range(args.users)
+    ])
+    project = Project.objects.create(name="serializer-bench", created_by=users[0])
+    tasks = Task.objects.bulk_create([
+        Task(
+            project_id=project, title=f"task {n}", branch_name=f"task-{n}",
+            description="x" * rng.randint(0, 200),
+            assigned_to=rng.choice(users + [None]), created_by=rng.choice(users),
+        )
+        for n in range(args.rows)
+    ], batch_size=1000)
+    TaskCommit.objects.bulk_create([
+        TaskCommit(
+            github_task=rng.choice(tasks), project_id=project, completed_by=rng.choice(users),
+            commit_id=f"{n:040x}", message=f"commit {n}", step="build",
+        )
+        for n in range(args.rows)
+    ], batch_size=1000)
+
+    receiver = users[0]
+    # join requests point at many small projects, each with contributors
+    projects = Project.objects.bulk_create([
+        Project(name=f"serializer-bench-{n}", created_by=rng.choice(users))
+        for n in range(max(args.rows // 10, 1))
+    ])
+    Through = Project.contributors.through
+    Through.objects.bulk_create([
+        Through(project_id=p.id, customuser_id=u.id)
+        for p in projects for u in rng.sample(users, min(args.contributors, len(users)))
+    ])
+    JoinRequest.objects.bulk_create([
+        JoinRequest(
+            project=rng.choice(projects), sender=rng.choice(users[1:] or users),
+            receiver=receiver, content=f"request {n}",
+        )
+        for n in range(args.rows)
+    ], batch_size=1000)
+    return project, receiver
+
+
+def measure(label, serialize, rows, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        data = serialize()
+        timings.append(time.perf_counter() - started)
+        assert len(data) == rows, (label, len(data), rows)
+    best = min(timings)
+    return {"best_s": round(best, 4), "rows_per_s": round(rows / best, 1)}
+
+
+def main():
+    args = parse_args()
+    setup_django()
+
+    from rest_framework.renderers import JSONRenderer
+
+    from joinrequest.models import JoinRequest
+    from joinrequest.serializers import FastJoindtSerializer, JoindtSerializer
+    from task.models import Task
+    from task.serializers import FastTaskSerializer, TaskSerializer
+    from task_commit.models import TaskCommit
+    from task_commit.serializers import FastTaskCommitListSerializer, TaskCommitListSerializer
+
+    render = JSONRenderer().render
+    results = {}
+    with throwaway_database():
+        project, receiver = seed(args)
+        pairs = {
+            "task": (
+                TaskSerializer, FastTaskSerializer,
+                lambda: Task.objects.filter(project_id=project),
+                {"assigned_to", "created_by"},
+            ),
+            "task_commit": (
+                TaskCommitListSerializer, FastTaskCommitListSerializer,
+                lambda: TaskCommit.objects.filter(project_id=project),
+                {"completed_by"},
+            ),
+            "join_request": (
+                JoindtSerializer, FastJoindtSerializer,
+                lambda: JoinRequest.objects.filter(receiver=receiver),
+                {"sender", "receiver", "project.created_by", "project.contributors"},
+            ),
+        }
+        for name, (drf, fast, queryset, expand) in pairs.items():
+            if render(drf(queryset(), many=True, expand=expand).data) != render(fast(queryset(), expand=expand).data):
+                raise SystemExit(f"{name}: FastSerializer output differs from {drf.__name__}")
+            old = measure(name, lambda: drf(queryset(), many=True, expand=expand).data, args.rows, args.repeat)
+            new = measure(name, lambda: fast(queryset(), expand=expand).data, args.rows, args.repeat)
+            results[name] = {
+                "drf": old,
+                "fast": new,
+                "speedup": round(new["rows_per_s"] / old["rows_per_s"], 2),
+            }
+
+    write_report("serializers", vars(args), results, args.out)
+
+
+if __name__ == "__main__":
+    main()
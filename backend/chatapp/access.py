@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef
+
+from project.models import Project, ProjectMembership
+
+User = get_user_model()
+
+ACCESS_OK = "OK"
+AUTH_REQUIRED = "AUTH_REQUIRED"
+PROJECT_NOT_FOUND = "PROJECT_NOT_FOUND"
+PERMISSION_DENIED = "PERMISSION_DENIED"
+
+ERROR_MESSAGES = {
+    AUTH_REQUIRED: "Authentication required",
+    PROJECT_NOT_FOUND: "Project does not exist",
+    PERMISSION_DENIED: "You do not have access to this project",
+}
+
+# code is one of the constants above, user is the sender profile
+# ({id, email, github_username}) or None when the user does not exist
+AccessDecision = namedtuple("AccessDecision", ["code", "user"])
+
+
+class AccessCache:
+    """
+    Bounded TTL cache of (user_id, project_id) -> AccessDecision.
+
+    Shared by every socket in the process; entries are dropped on
+    membership changes made in this process (see chatapp.signals) and in
+    processes holding a socket of the affected user, which hears of them
+    through its user group (see consumers.ChatRoomMixin.lost_access).
+    Elsewhere they expire after ``ttl`` seconds, which bounds how long a
+    removed member can still open a socket there.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id, project_id):
+        key = (user_id, project_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, decision = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return decision
+
+    def set(self, user_id, project_id, decision):
+        key = (user_id, project_id)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, decision)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, project_id=None, user_id=None):
+        with self._lock:
+            stale = [
+                key for key in self._entries
+                if (user_id is None or key[0] == user_id)
+                and (project_id is None or key[1] == project_id)
+            ]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+access_cache = AccessCache(
+    maxsize=getattr(settings, "CHAT_ACCESS_CACHE_SIZE", 10000),
+    ttl=getattr(settings, "CHAT_ACCESS_CACHE_TTL", 10),
+)
+
+
+def resolve_access(user_id, project_id):
+    """
+    Resolve user, project and membership in a single query; membership
+    is one probe of the (user, project) membership index.
+    """
+    row = (
+        User.objects.filter(pk=user_id)
+        .annotate(
+            project_exists=Exists(Project.objects.filter(pk=project_id)),
+            is_member=Exists(ProjectMembership.objects.filter(user=OuterRef("pk"), project_id=project_id)),
+        )
+        .values("id", "email", "github_username", "project_exists", "is_member")
+        .first()
+    )
+    if row is None:
+        return AccessDecision(AUTH_REQUIRED, None)
+
+    user = {
+        "id": row["id"],
+        "email": row["email"],
+        "github_username": row["github_username"],
+    }
+    if not row["project_exists"]:
+        return AccessDecision(PROJECT_NOT_FOUND, user)
+    if not row["is_member"]:
+        return AccessDecision(PERMISSION_DENIED, user)
+    return AccessDecision(ACCESS_OK, user)
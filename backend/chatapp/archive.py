@@ -0,0 +1,201 @@
+"""
+Cold storage for old chat messages (`manage.py archive_chat`).
+
+Archived messages live in ChatArchiveSegment rows of at most
+CHAT_ARCHIVE_SEGMENT_SIZE messages, so serving a history page unpacks a
+segment or two rather than a whole month. They are served to chatapp_home
+pages only: deleting them from ChatMessage also drops them from the
+full-text index, so chat search covers the hot table alone.
+"""
+import gzip
+import json
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import ChatArchiveSegment, ChatMessage
+from .serializers import ChatHistorySerializer
+
+
+def pack(rows):
+    body = "".join(json.dumps(row, separators=(",", ":")) + "\n" for row in rows)
+    return gzip.compress(body.encode("utf-8"))
+
+
+def unpack(data):
+    return [json.loads(line) for line in gzip.decompress(bytes(data)).decode("utf-8").splitlines()]
+
+
+class SegmentCache:
+    """Small LRU of unpacked segments, keyed by (pk, message_count)."""
+
+    def __init__(self, maxsize=16):
+        self.maxsize = maxsize
+        self._rows = OrderedDict()
+        self._lock = threading.Lock()
+
+    def rows(self, segment):
+        key = (segment.pk, segment.message_count)
+        with self._lock:
+            if key in self._rows:
+                self._rows.move_to_end(key)
+                return self._rows[key]
+        rows = unpack(segment.data)
+        with self._lock:
+            self._rows[key] = rows
+            while len(self._rows) > self.maxsize:
+                self._rows.popitem(last=False)
+        return rows
+
+    def clear(self):
+        with self._lock:
+            self._rows.clear()
+
+
+segment_cache = SegmentCache()
+
+
+# ---------- WRITE ----------
+
+SEGMENT_SIZE = getattr(settings, "CHAT_ARCHIVE_SEGMENT_SIZE", 1000)
+
+
+def _segment(project_id, month, rows):
+    return ChatArchiveSegment(
+        project_id=project_id, month=month,
+        first_id=rows[0]["id"], last_id=rows[-1]["id"],
+        message_count=len(rows), data=pack(rows),
+    )
+
+
+def _chunks(rows, size):
+    return [rows[i:i + size] for i in range(0, len(rows), size)]
+
+
+def archive_project(project_id, cutoff, batch_size=5000, segment_size=SEGMENT_SIZE):
+    """
+    Move ``project_id``'s messages up to the newest one older than
+    ``cutoff`` into segments of at most ``segment_size`` rows per month.
+    Returns the number archived.
+
+    Segments are only ever inserted, never unpacked and rewritten, so a
+    run costs O(messages). The last month of a batch keeps its partial
+    tail in the hot table for the next batch to fill up; only the end of
+    a run leaves short segments behind, for compact_project() to merge.
+    """
+    boundary = ChatMessage.objects.filter(
+        project_id=project_id, timestamp__lt=cutoff
+    ).aggregate(Max("id"))["id__max"]
+    if boundary is None:
+        return 0
+    segment_size = min(segment_size, batch_size)
+
+    archived = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                ChatMessage.objects.filter(project_id=project_id, id__lte=boundary)
+                .only("id", "seq", "sender_id", "message", "timestamp")
+                .order_by("id")[:batch_size]
+            )
+            if not batch:
+                return archived
+            last_batch = len(batch) < batch_size
+
+            by_month = OrderedDict()
+            for msg in batch:
+                month = msg.timestamp.date().replace(day=1)
+                by_month.setdefault(month, []).append(msg)
+
+            segments, moved = [], []
+            for month, messages in by_month.items():
+                chunks = _chunks(messages, segment_size)
+                if not last_batch and month == next(reversed(by_month)) and len(chunks[-1]) < segment_size:
+                    chunks.pop()  # continues in the next batch
+                for chunk in chunks:
+                    segments.append(_segment(project_id, month, ChatHistorySerializer(chunk, many=True).data))
+                    moved += [msg.id for msg in chunk]
+
+            ChatArchiveSegment.objects.bulk_create(segments)
+            ChatMessage.objects.filter(id__in=moved).delete()
+            archived += len(moved)
+
+
+def compact_project(project_id, segment_size=SEGMENT_SIZE):
+    """
+    Repack each month whose segments are not all full (several short runs
+    left by successive archive runs, or oversized ones written before
+    segments were capped) into full segments. Months that are already
+    packed are not read. Returns the number of segments rewritten.
+    """
+    rewritten = 0
+    months = (
+        ChatArchiveSegment.objects.filter(project_id=project_id)
+        .exclude(message_count=segment_size)
+        .order_by("month").values_list("month", flat=True).distinct()
+    )
+    for month in list(months):
+        with transaction.atomic():
+            loose = list(
+                ChatArchiveSegment.objects.select_for_update()
+                .filter(project_id=project_id, month=month)
+                .exclude(message_count=segment_size)
+                .order_by("first_id")
+            )
+            if len(loose) < 2 and all(segment.message_count < segment_size for segment in loose):
+                continue
+            rows = sorted((row for segment in loose for row in unpack(segment.data)), key=lambda row: row["id"])
+            ChatArchiveSegment.objects.filter(id__in=[segment.id for segment in loose]).delete()
+            ChatArchiveSegment.objects.bulk_create(
+                [_segment(project_id, month, chunk) for chunk in _chunks(rows, segment_size)]
+            )
+            rewritten += len(loose)
+    return rewritten
+
+
+def archive_older_than(days, project_id=None, batch_size=5000, compact=True):
+    cutoff = timezone.now() - timedelta(days=days)
+    messages = ChatMessage.objects.filter(timestamp__lt=cutoff)
+    if project_id is not None:
+        messages = messages.filter(project_id=project_id)
+    archived = {}
+    for pid in list(messages.values_list("project_id", flat=True).distinct()):
+        archived[pid] = archive_project(pid, cutoff, batch_size)
+        if compact:
+            compact_project(pid)
+    return archived
+
+
+# ---------- READ ----------
+
+def archived_before(project_id, before, limit):
+    """Up to ``limit`` archived rows with id < before, newest first."""
+    # the gzipped body is only loaded on a segment_cache miss
+    segments = ChatArchiveSegment.objects.filter(project_id=project_id).defer("data")
+    if before is not None:
+        segments = segments.filter(first_id__lt=before)
+    rows = []
+    for segment in segments.order_by("-last_id").iterator():
+        # segments of neighbouring months may overlap in id
+        if len(rows) >= limit and segment.last_id < rows[limit - 1]["id"]:
+            break
+        rows.extend(row for row in segment_cache.rows(segment) if before is None or row["id"] < before)
+        rows.sort(key=lambda row: row["id"], reverse=True)
+    return rows[:limit]
+
+
+def archived_after(project_id, after, limit):
+    """Up to ``limit`` archived rows with id > after, oldest first."""
+    segments = ChatArchiveSegment.objects.filter(project_id=project_id, last_id__gt=after).defer("data")
+    rows = []
+    for segment in segments.order_by("first_id").iterator():
+        if len(rows) >= limit and segment.first_id > rows[limit - 1]["id"]:
+            break
+        rows.extend(row for row in segment_cache.rows(segment) if row["id"] > after)
+        rows.sort(key=lambda row: row["id"])
+    return rows[:limit]
@@ -0,0 +1,197 @@
+import asyncio
+import atexit
+import json
+import logging
+import os
+import threading
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import F, Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ChatIdSequence, ChatMessage
+from .replay import allocate_seq_block
+
+logger = logging.getLogger(__name__)
+
+
+def reserve_ids(size):
+    """Reserve ``size`` consecutive message ids, returning the first one."""
+    with transaction.atomic():
+        # the UPDATE takes the write lock before anything is read
+        if not ChatIdSequence.objects.filter(pk=1).update(next_id=F("next_id") + size):
+            try:
+                with transaction.atomic():
+                    ChatIdSequence.objects.create(pk=1, next_id=1 + size)
+            except IntegrityError:
+                ChatIdSequence.objects.filter(pk=1).update(next_id=F("next_id") + size)
+        end = ChatIdSequence.objects.get(pk=1).next_id
+        start = end - size
+
+        # rows written without the allocator (fixtures, admin) push it forward
+        highest = ChatMessage.objects.aggregate(Max("id"))["id__max"] or 0
+        if start <= highest:
+            start = highest + 1
+            ChatIdSequence.objects.filter(pk=1).update(next_id=start + size)
+        return start
+
+
+class ChatWriteBuffer:
+    """
+    Per-process write-behind buffer for chat messages.
+
+    ``add`` hands back an unsaved ChatMessage that already has its final
+    id and timestamp, so the consumer can broadcast it straight away. The
+    buffer is written with one bulk_create once ``batch_size`` messages
+    are pending or ``flush_interval`` seconds have passed. Batches the
+    database refuses are appended to a JSONL spool file and replayed
+    before the next write; ``drain`` runs at interpreter exit.
+    """
+
+    def __init__(self, batch_size, flush_interval, id_block_size, spool_path):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.id_block_size = id_block_size
+        self.spool_path = spool_path
+        self._pending = []
+        self._next_id = None
+        self._last_id = None
+        self._seqs = {}  # project_id -> (next, last) of this worker's seq block
+        self._timer = None
+        self._timer_loop = None
+        self._lock = threading.Lock()
+
+    # ---------- ACCEPT ----------
+
+    async def add(self, sender_id, project_id, message, numbered=False):
+        """
+        Queue a message. With ``numbered`` it also takes the room's next
+        sequence number from this worker's block (replay.allocate_seq_block).
+        Id and seq are taken with no await in between, so concurrent adds
+        on the event loop never share them; only refilling a used-up block
+        waits on the database.
+        """
+        # each refill awaits, and other adds may run meanwhile: re-check both
+        while True:
+            if self._ids_used():
+                start = await database_sync_to_async(reserve_ids)(self.id_block_size)
+                if self._ids_used():
+                    self._next_id, self._last_id = start, start + self.id_block_size - 1
+            elif numbered and self._seqs_used(project_id):
+                block = await database_sync_to_async(allocate_seq_block)(project_id)
+                if self._seqs_used(project_id):
+                    self._seqs[project_id] = block
+            else:
+                break
+
+        msg_id, self._next_id = self._next_id, self._next_id + 1
+        seq = 0
+        if numbered:
+            seq, last = self._seqs[project_id]
+            self._seqs[project_id] = (seq + 1, last)
+
+        msg = ChatMessage(
+            id=msg_id,
+            sender_id=sender_id,
+            project_id=project_id,
+            message=message,
+            timestamp=timezone.now(),
+            seq=seq,
+        )
+
+        with self._lock:
+            self._pending.append(msg)
+            pending = len(self._pending)
+
+        loop = asyncio.get_running_loop()
+        if pending >= self.batch_size:
+            asyncio.ensure_future(self.flush())
+        elif self._timer is None or self._timer_loop is not loop:
+            self._timer_loop = loop
+            self._timer = loop.call_later(self.flush_interval, self._flush_soon)
+        return msg
+
+    def _ids_used(self):
+        return self._next_id is None or self._next_id > self._last_id
+
+    def _seqs_used(self, project_id):
+        next_seq, last = self._seqs.get(project_id, (1, 0))
+        return next_seq > last
+
+    def _flush_soon(self):
+        self._timer = None
+        asyncio.ensure_future(self.flush())
+
+    # ---------- WRITE ----------
+
+    async def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if batch:
+            # thread-sensitive, so flushes never overlap
+            await database_sync_to_async(self.write)(batch)
+
+    def write(self, batch):
+        self.replay_spool()
+        try:
+            ChatMessage.objects.bulk_create(batch)
+        except DatabaseError:
+            logger.exception("chat flush failed, spooling %d messages", len(batch))
+            self.spool(batch)
+
+    def drain(self):
+        """Synchronously write whatever is pending (shutdown path)."""
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if batch:
+            self.write(batch)
+
+    # ---------- SPOOL ----------
+
+    def spool(self, batch):
+        with open(self.spool_path, "a", encoding="utf-8") as fh:
+            for msg in batch:
+                fh.write(json.dumps({
+                    "id": msg.id,
+                    "sender_id": msg.sender_id,
+                    "project_id": msg.project_id,
+                    "message": msg.message,
+                    "timestamp": msg.timestamp.isoformat(),
+                    "seq": msg.seq,
+                }) + "\n")
+
+    def replay_spool(self):
+        if not os.path.exists(self.spool_path):
+            return
+        with open(self.spool_path, encoding="utf-8") as fh:
+            rows = [json.loads(line) for line in fh if line.strip()]
+        for row in rows:
+            row["timestamp"] = parse_datetime(row["timestamp"])
+        try:
+            ChatMessage.objects.bulk_create([ChatMessage(**row) for row in rows])
+        except DatabaseError:
+            logger.exception("chat spool replay failed, keeping %s", self.spool_path)
+            return
+        os.remove(self.spool_path)
+
+
+chat_buffer = ChatWriteBuffer(
+    batch_size=getattr(settings, "CHAT_FLUSH_BATCH_SIZE", 100),
+    flush_interval=getattr(settings, "CHAT_FLUSH_INTERVAL", 0.5),
+    id_block_size=getattr(settings, "CHAT_ID_BLOCK_SIZE", 1000),
+    spool_path=getattr(settings, "CHAT_SPOOL_PATH", os.path.join(settings.BASE_DIR, "chat_spool.jsonl")),
+)
+
+
+@atexit.register
+def _drain_on_exit():
+    try:
+        chat_buffer.drain()
+    except Exception:
+        logger.exception("could not drain chat buffer on exit")
@@ -0,0 +1,101 @@
+import threading
+from collections import OrderedDict
+
+import msgpack
+
+from backend import jsoncodec
+
+
+class JSONCodec:
+    """Default wire format: one JSON text frame per payload."""
+
+    name = "json"
+    binary = False
+    # chat events keep the nested sender and ISO timestamp
+    compact = False
+
+    def encode(self, payload):
+        return jsoncodec.dumps(payload).decode("utf-8")
+
+    def decode(self, text_data=None, bytes_data=None):
+        if text_data is None:
+            raise ValueError("expected a text frame")
+        return jsoncodec.loads(text_data)
+
+
+class MsgPackCodec:
+    """
+    Binary frames in MessagePack. Chat events are sent compact: the
+    sender is an id (profiles go out once per socket as "sender" frames)
+    and the timestamp is integer epoch milliseconds.
+    """
+
+    name = "msgpack"
+    binary = True
+    compact = True
+
+    def encode(self, payload):
+        return msgpack.packb(payload, use_bin_type=True)
+
+    def decode(self, text_data=None, bytes_data=None):
+        if bytes_data is None:
+            raise ValueError("expected a binary frame")
+        try:
+            return msgpack.unpackb(bytes_data, raw=False)
+        except msgpack.UnpackException as exc:
+            raise ValueError(str(exc)) from exc
+
+
+CODECS = {codec.name: codec for codec in (JSONCodec(), MsgPackCodec())}
+DEFAULT_CODEC = CODECS["json"]
+
+
+def compact_event(event):
+    frame = {
+        "type": event["type"],
+        "id": event["id"],
+        "seq": event["seq"],
+        "sender_id": event["sender"]["id"],
+        "message": event["message"],
+        "ts": event["ts"],
+    }
+    for key in ("project_id", "stream"):
+        if key in event:
+            frame[key] = event[key]
+    return frame
+
+
+class FrameCache:
+    """
+    Encoded chat frames keyed by (codec, message id, variant).
+
+    A group_send reaches every socket in the process as its own copy of
+    the event; this lets all of them share one encoding of it.
+    """
+
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+
+    def encode(self, codec, event, variant=""):
+        key = (codec.name, event["id"], variant)
+        with self._lock:
+            frame = self._frames.get(key)
+        if frame is not None:
+            return frame
+
+        payload = compact_event(event) if codec.compact else event
+        frame = codec.encode(payload)
+        with self._lock:
+            self._frames[key] = frame
+            while len(self._frames) > self.maxsize:
+                self._frames.popitem(last=False)
+        return frame
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+
+
+frame_cache = FrameCache()
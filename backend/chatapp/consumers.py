@@ -1,62 +1,202 @@
-import json
+import asyncio
+from urllib.parse import parse_qs
+
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from django.contrib.auth.models import AnonymousUser
+from django.conf import settings
 
-from project.models import Project
-from .models import ChatMessage
+from project.events import GROUP as PROJECT_EVENTS_GROUP, USER_GROUP, USER_STREAM
+from .access import ACCESS_OK, AUTH_REQUIRED, ERROR_MESSAGES, access_cache, resolve_access
+from .buffer import chat_buffer
+from .codecs import CODECS, DEFAULT_CODEC, frame_cache
+from .replay import replay_events, rooms, stored_last_seq
 
+REPLAY_LIMIT = getattr(settings, "CHAT_REPLAY_LIMIT", 500)
+MAX_SUBSCRIPTIONS = getattr(settings, "CHAT_MAX_SUBSCRIPTIONS", 50)
 
-class ChatConsumer(AsyncWebsocketConsumer):
+# stream name -> channel-layer group for one project
+STREAMS = {
+    "chat": "chat_{project_id}",
+    "events": PROJECT_EVENTS_GROUP,  # task/commit changes, see project.events
+}
 
-    async def connect(self):
-        self.project_id = self.scope["url_route"]["kwargs"].get("project_id")
-        self.user = self.scope.get("user")
 
-        # Accept FIRST (required)
-        await self.accept()
+class ChatRoomMixin:
+    """Room operations shared by ChatConsumer and MultiplexConsumer."""
+
+    codec = DEFAULT_CODEC
+
+    def query_param(self, name):
+        values = parse_qs(self.scope.get("query_string", b"").decode()).get(name)
+        return values[0] if values else None
 
-        # -------- AUTH CHECK --------
-        if not self.user or isinstance(self.user, AnonymousUser):
-            await self.send_error("AUTH_REQUIRED", "Authentication required")
+    async def negotiate_codec(self):
+        """Pick the wire format from ?encoding= (json unless asked)."""
+        self.known_senders = set()
+        encoding = self.query_param("encoding") or DEFAULT_CODEC.name
+        if encoding not in CODECS:
+            await self.send_error("UNSUPPORTED_ENCODING", f"Supported encodings: {', '.join(CODECS)}")
             await self.close()
-            return
+            return False
+        self.codec = CODECS[encoding]
+        return True
+
+    async def send_frame(self, payload):
+        await self.send_encoded(self.codec.encode(payload))
+
+    async def send_encoded(self, frame):
+        if self.codec.binary:
+            await self.send(bytes_data=frame)
+        else:
+            await self.send(text_data=frame)
 
-        # -------- PROJECT CHECK --------
+    async def send_chat_event(self, event, variant=""):
+        if self.codec.compact and event["sender"]["id"] not in self.known_senders:
+            # compact frames carry sender ids; ship each profile once
+            self.known_senders.add(event["sender"]["id"])
+            await self.send_frame({"type": "sender", **event["sender"]})
+        await self.send_encoded(frame_cache.encode(self.codec, event, variant))
+
+    async def decode_frame(self, text_data, bytes_data):
         try:
-            self.project = await self.get_project(self.project_id)
-        except Project.DoesNotExist:
-            await self.send_error("PROJECT_NOT_FOUND", "Project does not exist")
-            await self.close()
+            data = self.codec.decode(text_data, bytes_data)
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            if self.codec.binary:
+                await self.send_error("INVALID_FRAME", "Invalid MessagePack payload")
+            else:
+                await self.send_error("INVALID_JSON", "Invalid JSON payload")
+            return None
+        return data
+
+    async def send_error(self, code, message, **extra):
+        await self.send_frame({
+            "type": "error",
+            "code": code,
+            "message": message,
+            **extra,
+        })
+
+    async def get_access(self, user_id, project_id):
+        # cache hits skip the sync thread pool entirely
+        decision = access_cache.get(user_id, project_id)
+        if decision is None:
+            decision = await database_sync_to_async(resolve_access)(user_id, project_id)
+            access_cache.set(user_id, project_id, decision)
+        return decision
+
+    async def lost_access(self, user_id, events):
+        """
+        (project_id, code) for each project a "projects_changed" event in
+        ``events`` names that ``user_id`` may no longer use. The events
+        reach the user's group from every membership change, so they also
+        drop this process's cached decisions before the TTL would.
+        """
+        changed = {
+            project_id
+            for event in events if event.get("type") == "projects_changed"
+            for project_id in event["project_ids"]
+        }
+        lost = []
+        for project_id in sorted(changed):
+            access_cache.invalidate(project_id=project_id, user_id=user_id)
+            decision = await self.get_access(user_id, project_id)
+            if decision.code != ACCESS_OK:
+                lost.append((project_id, decision.code))
+        return lost
+
+    async def post_message(self, user, project_id, text):
+        # the buffer assigns id and timestamp up front and persists the
+        # message in the background, so broadcasting never waits on the DB
+        msg = await chat_buffer.add(user["id"], project_id, text, numbered=True)
+        event = {
+            "type": "chat_message",
+            "project_id": project_id,
+            "id": msg.id,
+            "seq": msg.seq,
+            "sender": user,
+            "message": msg.message,
+            "timestamp": msg.timestamp.isoformat(),
+            "ts": int(msg.timestamp.timestamp() * 1000),
+        }
+        rooms.get(project_id).record(event)
+
+        await self.channel_layer.group_send(
+            STREAMS["chat"].format(project_id=project_id),
+            event
+        )
+
+    async def replay_frames(self, project_id, since):
+        """Frames catching a client up on everything after ``since``."""
+        # other workers may still hold recent messages in their
+        # write-behind buffers; give them one flush to land
+        await asyncio.sleep(chat_buffer.flush_interval)
+        # later messages reach the socket live: it joined the group first
+        events = await database_sync_to_async(replay_events)(project_id, since, REPLAY_LIMIT)
+        if events is None or len(events) > REPLAY_LIMIT:
+            latest = await database_sync_to_async(stored_last_seq)(project_id)
+            return [{"type": "resync_required", "last_seq": latest}]
+        latest = max([since] + [event["seq"] for event in events])
+        return events + [{"type": "replay_complete", "last_seq": latest}]
+
+
+class ChatConsumer(ChatRoomMixin, AsyncWebsocketConsumer):
+
+    async def connect(self):
+        self.project_id = int(self.scope["url_route"]["kwargs"].get("project_id"))
+        user_id = self.scope.get("user_id")
+
+        # Accept FIRST (required)
+        await self.accept()
+        if not await self.negotiate_codec():
             return
 
-        # -------- PERMISSION CHECK --------
-        has_access = await self.user_has_project_access(self.project, self.user)
-        if not has_access:
-            await self.send_error(
-                "PERMISSION_DENIED",
-                "You do not have access to this project"
-            )
+        # -------- AUTH / PROJECT / PERMISSION CHECK --------
+        if user_id is None:
+            code = AUTH_REQUIRED
+        else:
+            decision = await self.get_access(user_id, self.project_id)
+            code = decision.code
+
+        if code != ACCESS_OK:
+            await self.send_error(code, ERROR_MESSAGES[code])
             await self.close()
             return
 
+        self.user = decision.user
+
         # -------- JOIN GROUP --------
-        self.room_group_name = f"chat_{self.project_id}"
+        self.room_group_name = STREAMS["chat"].format(project_id=self.project_id)
 
         await self.channel_layer.group_add(
             self.room_group_name,
             self.channel_name
         )
+        # membership changes for this user, to drop the socket on removal
+        self.user_group_name = USER_GROUP.format(user_id=user_id)
+        await self.channel_layer.group_add(self.user_group_name, self.channel_name)
+        # ?events=1: task/commit events for the project on the same socket
+        if self.query_param("events") == "1":
+            self.events_group_name = STREAMS["events"].format(project_id=self.project_id)
+            await self.channel_layer.group_add(self.events_group_name, self.channel_name)
 
         # -------- SUCCESS --------
-        await self.send(text_data=json.dumps({
+        await self.send_frame({
             "type": "connection_success",
-            "user": {
-                "id": self.user.id,
-                "email": self.user.email,
-                "github_username": self.user.github_username,
-            }
-        }))
+            "user": self.user,
+        })
+
+        # -------- RESUME --------
+        # joined the group first, so nothing falls between replay and live
+        # traffic; clients drop duplicates by id
+        since = self.query_param("since")
+        if since and since.isdigit():
+            for frame in await self.replay_frames(self.project_id, int(since)):
+                if frame["type"] == "chat_message":
+                    await self.send_chat_event(frame)
+                else:
+                    await self.send_frame(frame)
 
     async def disconnect(self, close_code):
         if hasattr(self, "room_group_name"):
@@ -64,66 +204,177 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 self.room_group_name,
                 self.channel_name
             )
+        if hasattr(self, "events_group_name"):
+            await self.channel_layer.group_discard(self.events_group_name, self.channel_name)
+        if hasattr(self, "user_group_name"):
+            await self.channel_layer.group_discard(self.user_group_name, self.channel_name)
 
-    async def receive(self, text_data):
-        try:
-            data = json.loads(text_data)
-        except json.JSONDecodeError:
-            await self.send_error("INVALID_JSON", "Invalid JSON payload")
+    async def receive(self, text_data=None, bytes_data=None):
+        data = await self.decode_frame(text_data, bytes_data)
+        if data is None:
             return
 
         message = data.get("message")
-        if not message or not message.strip():
+        if not isinstance(message, str) or not message.strip():
             await self.send_error("EMPTY_MESSAGE", "Message cannot be empty")
             return
 
-        saved_msg = await self.save_message(
-            self.user, self.project, message.strip()
-        )
-
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            saved_msg
-        )
+        await self.post_message(self.user, self.project_id, message.strip())
 
     async def chat_message(self, event):
-        await self.send(text_data=json.dumps(event))
+        await self.send_chat_event(event)
 
-    async def send_error(self, code, message):
-        await self.send(text_data=json.dumps({
-            "type": "error",
-            "code": code,
-            "message": message
-        }))
+    async def outbox_events(self, message):
+        if message["stream"] == USER_STREAM:
+            # only acted on here; the multiplexed socket forwards them
+            for project_id, code in await self.lost_access(self.user["id"], message["events"]):
+                if project_id == self.project_id:
+                    await self.send_error(code, ERROR_MESSAGES[code])
+                    await self.close()
+            return
+        for event in message["events"]:
+            await self.send_frame(event)
 
-    # ---------- DB HELPERS ----------
 
-    @database_sync_to_async
-    def get_project(self, project_id):
-        return Project.objects.get(id=project_id)
+class MultiplexConsumer(ChatRoomMixin, AsyncWebsocketConsumer):
+    """
+    One authenticated socket for any number of project streams.
 
-    @database_sync_to_async
-    def user_has_project_access(self, project, user):
-        return (
-            project.created_by_id == user.id
-            or project.contributors.filter(id=user.id).exists()
-        )
+    Control frames:
+      {"action": "subscribe", "stream": "chat", "project_id": 1, "since": 10}
+      {"action": "unsubscribe", "stream": "chat", "project_id": 1}
+      {"action": "send", "stream": "chat", "project_id": 1, "message": "hi"}
+      {"action": "subscribe", "stream": "events", "project_id": 1}
 
-    @database_sync_to_async
-    def save_message(self, user, project, message):
-        msg = ChatMessage.objects.create(
-            sender=user,
-            project=project,
-            message=message
-        )
-        return {
-            "type": "chat_message",
-            "id": msg.id,
-            "sender": {
-                "id": user.id,
-                "email": user.email,
-                "github_username": user.github_username,
-            },
-            "message": msg.message,
-            "timestamp": msg.timestamp.isoformat()
-        }
+    The "events" stream carries task and commit changes (project.events)
+    and is receive-only; the user's own join requests and membership
+    changes arrive unasked on the "user" stream. Every frame sent back
+    carries "stream" and "project_id". Each subscription goes through the
+    same access check as ChatConsumer, and is ended with an error frame
+    when a membership change takes the access away.
+    """
+
+    async def connect(self):
+        self.user_id = self.scope.get("user_id")
+        # (stream, project_id) -> sender profile resolved at subscribe time
+        self.subscriptions = {}
+
+        await self.accept()
+        if not await self.negotiate_codec():
+            return
+
+        if self.user_id is None:
+            await self.send_error(AUTH_REQUIRED, ERROR_MESSAGES[AUTH_REQUIRED])
+            await self.close()
+            return
+
+        # join requests and membership changes for this user, unasked
+        self.user_group_name = USER_GROUP.format(user_id=self.user_id)
+        await self.channel_layer.group_add(self.user_group_name, self.channel_name)
+
+        await self.send_frame({"type": "connection_success", "user_id": self.user_id})
+
+    async def disconnect(self, close_code):
+        if hasattr(self, "user_group_name"):
+            await self.channel_layer.group_discard(self.user_group_name, self.channel_name)
+        for stream, project_id in list(getattr(self, "subscriptions", {})):
+            await self.channel_layer.group_discard(
+                STREAMS[stream].format(project_id=project_id),
+                self.channel_name
+            )
+
+    async def receive(self, text_data=None, bytes_data=None):
+        data = await self.decode_frame(text_data, bytes_data)
+        if data is None:
+            return
+
+        action = data.get("action")
+        stream = data.get("stream")
+        project_id = data.get("project_id")
+        if stream not in STREAMS or not isinstance(project_id, int):
+            await self.send_error("INVALID_STREAM", "stream and integer project_id are required")
+            return
+
+        handler = {
+            "subscribe": self.subscribe,
+            "unsubscribe": self.unsubscribe,
+            "send": self.send_to_stream,
+        }.get(action)
+        if handler is None:
+            await self.send_error("INVALID_ACTION", "action must be subscribe, unsubscribe or send")
+            return
+        await handler(stream, project_id, data)
+
+    async def subscribe(self, stream, project_id, data):
+        key = (stream, project_id)
+        if key not in self.subscriptions:
+            if len(self.subscriptions) >= MAX_SUBSCRIPTIONS:
+                await self.send_error(
+                    "TOO_MANY_SUBSCRIPTIONS", "Subscription limit reached",
+                    stream=stream, project_id=project_id,
+                )
+                return
+            decision = await self.get_access(self.user_id, project_id)
+            if decision.code != ACCESS_OK:
+                await self.send_error(
+                    decision.code, ERROR_MESSAGES[decision.code],
+                    stream=stream, project_id=project_id,
+                )
+                return
+            self.subscriptions[key] = decision.user
+            await self.channel_layer.group_add(
+                STREAMS[stream].format(project_id=project_id),
+                self.channel_name
+            )
+
+        await self.send_frame({"type": "subscribed", "stream": stream, "project_id": project_id})
+
+        since = data.get("since")
+        if stream == "chat" and isinstance(since, int):
+            for frame in await self.replay_frames(project_id, since):
+                frame = {**frame, "stream": stream, "project_id": project_id}
+                if frame["type"] == "chat_message":
+                    await self.send_chat_event(frame, variant=stream)
+                else:
+                    await self.send_frame(frame)
+
+    async def unsubscribe(self, stream, project_id, data):
+        if self.subscriptions.pop((stream, project_id), None) is not None:
+            await self.channel_layer.group_discard(
+                STREAMS[stream].format(project_id=project_id),
+                self.channel_name
+            )
+        await self.send_frame({"type": "unsubscribed", "stream": stream, "project_id": project_id})
+
+    async def send_to_stream(self, stream, project_id, data):
+        user = self.subscriptions.get((stream, project_id))
+        if user is None or stream != "chat":
+            await self.send_error(
+                "NOT_SUBSCRIBED", "Subscribe to the chat stream before sending",
+                stream=stream, project_id=project_id,
+            )
+            return
+
+        message = data.get("message")
+        if not isinstance(message, str) or not message.strip():
+            await self.send_error(
+                "EMPTY_MESSAGE", "Message cannot be empty",
+                stream=stream, project_id=project_id,
+            )
+            return
+
+        await self.post_message(user, project_id, message.strip())
+
+    async def chat_message(self, event):
+        await self.send_chat_event({**event, "stream": "chat"}, variant="chat")
+
+    async def outbox_events(self, message):
+        # project "events" streams and the socket's own "user" stream
+        for event in message["events"]:
+            await self.send_frame({**event, "stream": message["stream"]})
+        if message["stream"] == USER_STREAM:
+            for project_id, code in await self.lost_access(self.user_id, message["events"]):
+                for stream in STREAMS:
+                    if (stream, project_id) in self.subscriptions:
+                        await self.send_error(code, ERROR_MESSAGES[code], stream=stream, project_id=project_id)
+                        await self.unsubscribe(stream, project_id, {})
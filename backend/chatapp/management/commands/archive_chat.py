@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from chatapp.archive import archive_older_than
+
+
+class Command(BaseCommand):
+    help = "Move chat messages older than a given age into compressed per-month archive segments."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than-days", type=int,
+            default=getattr(settings, "CHAT_ARCHIVE_AFTER_DAYS", 180),
+        )
+        parser.add_argument("--project", type=int, help="Only archive this project id")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--no-compact", action="store_true",
+            help="Leave short segments from this run unmerged",
+        )
+
+    def handle(self, *args, **options):
+        archived = archive_older_than(
+            options["older_than_days"],
+            project_id=options["project"],
+            batch_size=options["batch_size"],
+            compact=not options["no_compact"],
+        )
+        for project_id, count in archived.items():
+            self.stdout.write(f"project {project_id}: archived {count} messages")
+        self.stdout.write(self.style.SUCCESS(f"Archived {sum(archived.values())} messages"))
@@ -1,36 +1,33 @@
 from urllib.parse import parse_qs
 from channels.middleware import BaseMiddleware
-from channels.db import database_sync_to_async
-from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
 from rest_framework_simplejwt.tokens import AccessToken
 
-User = get_user_model()
-
 
 class JWTAuthMiddleware(BaseMiddleware):
+    """
+    Validates the ``?token=`` JWT and puts its ``user_id`` on the scope.
+
+    No database work happens here: consumers resolve the user together
+    with the project and its membership in one query (chatapp.access).
+    ``scope["user"]`` is only set for unauthenticated sockets.
+    """
 
     async def __call__(self, scope, receive, send):
         query_string = scope.get("query_string", b"").decode()
         params = parse_qs(query_string)
 
         token = params.get("token")
+        scope["user_id"] = None
 
         if token:
             try:
                 access_token = AccessToken(token[0])
-                user_id = int(access_token["user_id"])
-                scope["user"] = await self.get_user(user_id)
+                scope["user_id"] = int(access_token["user_id"])
             except Exception:
-                scope["user"] = AnonymousUser()
-        else:
+                pass
+
+        if scope["user_id"] is None:
             scope["user"] = AnonymousUser()
 
         return await super().__call__(scope, receive, send)
-
-    @database_sync_to_async
-    def get_user(self, user_id):
-        try:
-            return User.objects.get(id=user_id)
-        except User.DoesNotExist:
-            return AnonymousUser()
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatapp', '0001_initial'),
+        ('project', '0004_alter_project_contributors'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['project', 'id'], name='chat_project_id_idx'),
+        ),
+    ]
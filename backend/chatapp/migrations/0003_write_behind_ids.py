@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:39
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatapp', '0002_chatmessage_project_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatIdSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('next_id', models.BigIntegerField()),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='chatmessage',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
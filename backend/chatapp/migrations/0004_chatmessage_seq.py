@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def number_existing_messages(apps, schema_editor):
+    ChatMessage = apps.get_model('chatapp', 'ChatMessage')
+    project_ids = ChatMessage.objects.values_list('project_id', flat=True).distinct()
+    for project_id in project_ids:
+        ids = ChatMessage.objects.filter(project_id=project_id).order_by('id').values_list('id', flat=True)
+        batch = [ChatMessage(id=pk, seq=seq) for seq, pk in enumerate(ids, start=1)]
+        ChatMessage.objects.bulk_update(batch, ['seq'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatapp', '0003_write_behind_ids'),
+        ('project', '0004_alter_project_contributors'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatmessage',
+            name='seq',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(number_existing_messages, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['project', 'seq'], name='chat_project_seq_idx'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+from django.db import migrations
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE chatapp_chatmessage_fts USING fts5(
+        message, project_id,
+        content='chatapp_chatmessage', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER chatapp_chatmessage_fts_ai AFTER INSERT ON chatapp_chatmessage BEGIN
+        INSERT INTO chatapp_chatmessage_fts(rowid, message, project_id)
+        VALUES (new.id, new.message, new.project_id);
+    END
+    """,
+    """
+    CREATE TRIGGER chatapp_chatmessage_fts_ad AFTER DELETE ON chatapp_chatmessage BEGIN
+        INSERT INTO chatapp_chatmessage_fts(chatapp_chatmessage_fts, rowid, message, project_id)
+        VALUES ('delete', old.id, old.message, old.project_id);
+    END
+    """,
+    """
+    CREATE TRIGGER chatapp_chatmessage_fts_au AFTER UPDATE OF message, project_id ON chatapp_chatmessage BEGIN
+        INSERT INTO chatapp_chatmessage_fts(chatapp_chatmessage_fts, rowid, message, project_id)
+        VALUES ('delete', old.id, old.message, old.project_id);
+        INSERT INTO chatapp_chatmessage_fts(rowid, message, project_id)
+        VALUES (new.id, new.message, new.project_id);
+    END
+    """,
+    "INSERT INTO chatapp_chatmessage_fts(chatapp_chatmessage_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS chatapp_chatmessage_fts_au",
+    "DROP TRIGGER IF EXISTS chatapp_chatmessage_fts_ad",
+    "DROP TRIGGER IF EXISTS chatapp_chatmessage_fts_ai",
+    "DROP TABLE IF EXISTS chatapp_chatmessage_fts",
+]
+
+# an expression index is maintained by PostgreSQL itself on every write
+POSTGRES_FORWARD = [
+    "CREATE INDEX chat_message_fts_idx ON chatapp_chatmessage "
+    "USING GIN (to_tsvector('english', message))",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS chat_message_fts_idx",
+]
+
+
+def run(statements_by_vendor):
+    def apply(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return apply
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatapp', '0004_chatmessage_seq'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            run({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD}),
+        ),
+    ]
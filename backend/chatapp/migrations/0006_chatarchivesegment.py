@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatapp', '0005_chatmessage_fts'),
+        ('project', '0004_alter_project_contributors'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatArchiveSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('first_id', models.BigIntegerField()),
+                ('last_id', models.BigIntegerField()),
+                ('message_count', models.PositiveIntegerField(default=0)),
+                ('data', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chat_archive', to='project.project')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['project', 'last_id'], name='chat_archive_last_id_idx')],
+                'constraints': [models.UniqueConstraint(fields=('project', 'month'), name='chat_archive_project_month')],
+            },
+        ),
+    ]
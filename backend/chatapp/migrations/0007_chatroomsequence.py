@@ -0,0 +1,38 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def seed_sequences(apps, schema_editor):
+    """Start each room's counter at its highest stored seq."""
+    ChatMessage = apps.get_model('chatapp', 'ChatMessage')
+    ChatRoomSequence = apps.get_model('chatapp', 'ChatRoomSequence')
+    ChatRoomSequence.objects.bulk_create(
+        [
+            ChatRoomSequence(project_id=project_id, last_seq=last_seq)
+            for project_id, last_seq in ChatMessage.objects.order_by()
+            .values_list('project_id').annotate(Max('seq'))
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatapp', '0006_chatarchivesegment'),
+        ('project', '0004_alter_project_contributors'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatRoomSequence',
+            fields=[
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='chat_sequence', serialize=False, to='project.project')),
+                ('last_seq', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
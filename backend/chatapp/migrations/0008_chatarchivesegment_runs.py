@@ -0,0 +1,22 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatapp', '0007_chatroomsequence'),
+        ('project', '0007_outboxevent'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='chatarchivesegment',
+            name='chat_archive_project_month',
+        ),
+        migrations.AddIndex(
+            model_name='chatarchivesegment',
+            index=models.Index(fields=['project', 'month'], name='chat_archive_month_idx'),
+        ),
+    ]
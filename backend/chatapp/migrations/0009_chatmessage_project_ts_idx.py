@@ -0,0 +1,20 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatapp', '0008_chatarchivesegment_runs'),
+        ('project', '0007_outboxevent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['project', 'timestamp'], name='chat_project_ts_idx'),
+        ),
+    ]
@@ -1,12 +1,71 @@
 from user.models import CustomUser
 from project.models import Project
 from django.db import models
+from django.utils import timezone
 class ChatMessage(models.Model):
     sender = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     project = models.ForeignKey(Project, on_delete=models.CASCADE)
     message = models.TextField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # set when the message is accepted, not when the write-behind buffer
+    # flushes it (auto_now_add would overwrite it inside bulk_create)
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
+    # per-room sequence number, used to resume after a reconnect; ordered
+    # within a worker's block only (see replay)
+    seq = models.BigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # keyset pagination of a room's history walks (project, id)
+            models.Index(fields=["project", "id"], name="chat_project_id_idx"),
+            # reconnect catch-up reads the rest of a seq block ...
+            models.Index(fields=["project", "seq"], name="chat_project_seq_idx"),
+            # ... and everything other workers accepted since a time
+            models.Index(fields=["project", "timestamp"], name="chat_project_ts_idx"),
+        ]
 
     def __str__(self):
         return f"{self.sender.username} - {self.project.name} - {self.timestamp}"
-# Create your models here.
+
+
+class ChatIdSequence(models.Model):
+    """
+    Single-row counter from which each process reserves blocks of
+    ChatMessage ids, so messages get their final id before they are
+    written. Every chat write must take its id from here.
+    """
+    next_id = models.BigIntegerField()
+
+
+class ChatRoomSequence(models.Model):
+    """
+    End of the last block of chat sequence numbers handed out per room.
+    Every process reserves its blocks here (see replay.allocate_seq_block),
+    so numbers stay unique however many ASGI workers accept messages for
+    the room.
+    """
+    project = models.OneToOneField(Project, on_delete=models.CASCADE, primary_key=True, related_name="chat_sequence")
+    last_seq = models.BigIntegerField(default=0)
+
+
+class ChatArchiveSegment(models.Model):
+    """
+    A run of one project's archived messages from one calendar month (at
+    most CHAT_ARCHIVE_SEGMENT_SIZE of them), as gzipped JSONL in the
+    chatapp_home row format. Archiving moves a project's oldest messages
+    here by id, so every archived id is lower than every id still in
+    ChatMessage for that project. Segments are written once; a month may
+    hold several, and compaction merges the short ones.
+    """
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="chat_archive")
+    month = models.DateField()
+    first_id = models.BigIntegerField()
+    last_id = models.BigIntegerField()
+    message_count = models.PositiveIntegerField(default=0)
+    data = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["project", "last_id"], name="chat_archive_last_id_idx"),
+            models.Index(fields=["project", "month"], name="chat_archive_month_idx"),
+        ]
@@ -0,0 +1,169 @@
+"""
+Sequence numbers and reconnect replay for chat rooms.
+
+Each worker reserves ``seq`` numbers for a room in aligned blocks of
+SEQ_BLOCK_SIZE from the shared ChatRoomSequence row (one locked UPDATE
+per block, not per message), so numbers are unique across ASGI workers
+and increase with accept order within a block. Blocks of different
+workers interleave, though: a lower seq can be accepted after a higher
+one.
+
+A resume therefore anchors on the time of the ``since`` message rather
+than on the number alone: it replays the rest of that message's block
+(same worker, so in order) plus every message of other blocks accepted
+from CHAT_REPLAY_OVERLAP seconds before it. Clients drop what they
+already have by id. The database is read first, then the events this
+process accepted but has not flushed (RoomHistory); messages other
+workers still hold are waited for, one flush interval.
+"""
+from collections import deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max, Q
+from django.utils.dateparse import parse_datetime
+
+from .models import ChatMessage, ChatRoomSequence
+
+# fixed rather than a setting: a block is recognised by its number
+SEQ_BLOCK_SIZE = 100
+REPLAY_OVERLAP = timedelta(seconds=getattr(settings, "CHAT_REPLAY_OVERLAP", 5))
+
+
+def block_of(seq):
+    """(first, last) seq of the aligned block holding ``seq``."""
+    first = (seq - 1) // SEQ_BLOCK_SIZE * SEQ_BLOCK_SIZE + 1
+    return first, first + SEQ_BLOCK_SIZE - 1
+
+
+def allocate_seq_block(project_id):
+    """(first, last) of a fresh block of the room's sequence numbers."""
+    size = SEQ_BLOCK_SIZE
+    with transaction.atomic():
+        # the UPDATE takes the row lock before anything is read; it also
+        # rounds a counter left between blocks up to the next boundary
+        bumped = ChatRoomSequence.objects.filter(project_id=project_id).update(
+            last_seq=(F("last_seq") + 2 * size - 1) / size * size
+        )
+        if not bumped:
+            stored = stored_last_seq(project_id)
+            try:
+                with transaction.atomic():
+                    ChatRoomSequence.objects.create(project_id=project_id, last_seq=block_of(stored + 1)[1])
+            except IntegrityError:
+                ChatRoomSequence.objects.filter(project_id=project_id).update(
+                    last_seq=(F("last_seq") + 2 * size - 1) / size * size
+                )
+        last = ChatRoomSequence.objects.values_list("last_seq", flat=True).get(project_id=project_id)
+        return last - size + 1, last
+
+
+def stored_last_seq(project_id):
+    return ChatMessage.objects.filter(project_id=project_id).aggregate(Max("seq"))["seq__max"] or 0
+
+
+class RoomHistory:
+    """
+    Ring buffer of the events this process accepted for one room, which
+    may still be waiting in the write-behind buffer. It is never the only
+    source for a replay: other workers' messages are not in it.
+    """
+
+    def __init__(self, size):
+        self.recent = deque(maxlen=size)
+
+    def record(self, event):
+        self.recent.append(event)
+
+    def find(self, seq):
+        return next((event for event in self.recent if event["seq"] == seq), None)
+
+
+class RoomRegistry:
+    def __init__(self, size):
+        self.size = size
+        self._rooms = {}
+
+    def get(self, project_id):
+        room = self._rooms.get(project_id)
+        if room is None:
+            room = self._rooms[project_id] = RoomHistory(self.size)
+        return room
+
+    def clear(self):
+        self._rooms.clear()
+
+
+rooms = RoomRegistry(size=getattr(settings, "CHAT_REPLAY_BUFFER_SIZE", 200))
+
+
+def _time(event):
+    return parse_datetime(event["timestamp"])
+
+
+def anchor_time(project_id, since):
+    """When the ``since`` message was accepted, or None if it is unknown."""
+    event = rooms.get(project_id).find(since)
+    if event is not None:
+        return _time(event)
+    return ChatMessage.objects.filter(project_id=project_id, seq=since).values_list("timestamp", flat=True).first()
+
+
+def follows(event, since, start):
+    """Whether a client that saw ``since`` (accepted at ``start`` + overlap) may lack ``event``."""
+    if event["seq"] == since:
+        return False
+    first, last = block_of(since)
+    if first <= event["seq"] <= last:
+        return event["seq"] > since
+    return _time(event) >= start
+
+
+def replay_events(project_id, since, limit):
+    """
+    chat_message events a client that saw ``since`` may have missed
+    (every message when ``since`` is 0), in accept order; at most
+    ``limit`` + 1 of them, or None when ``since`` is not known here.
+    """
+    rows = ChatMessage.objects.filter(project_id=project_id)
+    start = None
+    if since:
+        anchor = anchor_time(project_id, since)
+        if anchor is None:
+            return None
+        start = anchor - REPLAY_OVERLAP
+        first, last = block_of(since)
+        rows = rows.filter(
+            Q(seq__gt=since, seq__lte=last) | (Q(timestamp__gte=start) & ~Q(seq__range=(first, last)))
+        )
+    events = {event["id"]: event for event in stored_events(rows, limit + 1)}
+    for event in rooms.get(project_id).recent:
+        if not since or follows(event, since, start):
+            events.setdefault(event["id"], event)
+    return sorted(events.values(), key=lambda event: (_time(event), event["seq"]))[:limit + 1]
+
+
+def stored_events(rows, limit):
+    """chat_message events for the ChatMessage queryset ``rows``, oldest first."""
+    rows = (
+        rows.select_related("sender")
+        .only("id", "seq", "message", "timestamp", "sender__id", "sender__email", "sender__github_username")
+        .order_by("timestamp", "seq")[:limit]
+    )
+    return [
+        {
+            "type": "chat_message",
+            "id": row.id,
+            "seq": row.seq,
+            "sender": {
+                "id": row.sender.id,
+                "email": row.sender.email,
+                "github_username": row.sender.github_username,
+            },
+            "message": row.message,
+            "timestamp": row.timestamp.isoformat(),
+            "ts": int(row.timestamp.timestamp() * 1000),
+        }
+        for row in rows
+    ]
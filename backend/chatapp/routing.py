@@ -1,6 +1,7 @@
 from django.urls import re_path
-from .consumers import ChatConsumer
+from .consumers import ChatConsumer, MultiplexConsumer
 
 websocket_urlpatterns = [
     re_path(r"ws/chat/(?P<project_id>\d+)/$", ChatConsumer.as_asgi()),
+    re_path(r"ws/stream/$", MultiplexConsumer.as_asgi()),
 ]
@@ -0,0 +1,80 @@
+import html
+import re
+
+from django.db import connection
+
+from .models import ChatMessage
+
+# snippet boundaries, swapped for <mark> after the text is escaped
+MARK_START = "\x02"
+MARK_END = "\x03"
+
+SQLITE_SEARCH = """
+    SELECT m.id, m.seq, m.sender_id, m.timestamp,
+           -bm25(chatapp_chatmessage_fts, 1.0, 0.0) AS rank,
+           snippet(chatapp_chatmessage_fts, 0, %s, %s, '…', 16) AS snippet
+    FROM chatapp_chatmessage_fts
+    JOIN chatapp_chatmessage m ON m.id = chatapp_chatmessage_fts.rowid
+    WHERE chatapp_chatmessage_fts MATCH %s
+    ORDER BY rank DESC, m.id DESC
+    LIMIT %s OFFSET %s
+"""
+
+POSTGRES_SEARCH = """
+    SELECT m.id, m.seq, m.sender_id, m.timestamp,
+           ts_rank(to_tsvector('english', m.message), q) AS rank,
+           ts_headline('english', m.message, q, %s) AS snippet
+    FROM chatapp_chatmessage m, websearch_to_tsquery('english', %s) q
+    WHERE m.project_id = %s AND to_tsvector('english', m.message) @@ q
+    ORDER BY rank DESC, m.id DESC
+    LIMIT %s OFFSET %s
+"""
+
+
+def fts5_query(project_id, text):
+    """
+    Turn free text into an FTS5 expression: every word must appear (the
+    last one as a prefix) and the hit must belong to ``project_id``.
+    """
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    terms = " ".join(f'"{word}"' for word in words[:-1])
+    terms = f'{terms} "{words[-1]}"*'.strip()
+    return f'message : ({terms}) AND project_id : "{int(project_id)}"'
+
+
+def highlight(snippet):
+    escaped = html.escape(snippet or "")
+    return escaped.replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+
+
+def search_messages(project_id, text, limit, offset):
+    """
+    Ranked hits for ``text`` in one project's chat history, best first.
+    Each ChatMessage carries ``rank`` and an HTML-escaped ``snippet``
+    with the matches wrapped in <mark>. Messages moved to the archive
+    (chatapp.archive) are not searched.
+    """
+    vendor = connection.vendor
+    if vendor == "sqlite":
+        match = fts5_query(project_id, text)
+        if match is None:
+            return []
+        hits = ChatMessage.objects.raw(SQLITE_SEARCH, [MARK_START, MARK_END, match, limit, offset])
+    elif vendor == "postgresql":
+        options = f"StartSel={MARK_START}, StopSel={MARK_END}, MaxWords=24, MinWords=8"
+        hits = ChatMessage.objects.raw(POSTGRES_SEARCH, [options, text, project_id, limit, offset])
+    else:
+        # no full-text index on this backend: unranked substring match
+        hits = ChatMessage.objects.filter(
+            project_id=project_id, message__icontains=text
+        ).order_by("-id")[offset:offset + limit]
+        for hit in hits:
+            hit.rank = 0.0
+            hit.snippet = hit.message
+
+    hits = list(hits)
+    for hit in hits:
+        hit.snippet = highlight(hit.snippet)
+    return hits
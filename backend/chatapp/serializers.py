@@ -1,11 +1,41 @@
+from rest_framework import serializers
 from rest_framework.serializers import ModelSerializer
 from .models import ChatMessage
 from project.serializers import ProjectSerializer
-from user.serializers import Userserializer
-class ChatMessageSerializer(ModelSerializer):
-    sender = Userserializer(read_only=True)
-    project = ProjectSerializer(read_only=True)
+from user.serializers import usserprofileSerializer
+from backend.fastserializers import FastSerializer
+from backend.flexfields import FlexFieldsMixin
+class ChatMessageSerializer(FlexFieldsMixin, ModelSerializer):
     class Meta:
         model = ChatMessage
         fields = ['id', 'sender', 'project', 'message', 'timestamp']
-        read_only_fields = ['id', 'sender', 'timestamp']
\ No newline at end of file
+        read_only_fields = ['id', 'sender', 'project', 'timestamp']
+        expandable = {
+            'sender': usserprofileSerializer,
+            'project': ProjectSerializer,
+        }
+
+
+class ChatHistorySerializer(ModelSerializer):
+    # Compact history row: the sender is referenced by id and resolved
+    # through the page-level "senders" table instead of being nested.
+    sender_id = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = ChatMessage
+        fields = ['id', 'seq', 'sender_id', 'message', 'timestamp']
+
+
+class FastChatHistorySerializer(FastSerializer):
+    serializer_class = ChatHistorySerializer
+
+
+class ChatSearchHitSerializer(ModelSerializer):
+    sender_id = serializers.IntegerField(read_only=True)
+    rank = serializers.FloatField(read_only=True)
+    # HTML-escaped message excerpt with matches wrapped in <mark>
+    snippet = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = ChatMessage
+        fields = ['id', 'seq', 'sender_id', 'timestamp', 'rank', 'snippet']
@@ -0,0 +1,27 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from project.models import Project
+from project.signals import membership_changed
+from .access import access_cache
+
+User = get_user_model()
+
+
+@receiver(membership_changed)
+def drop_access_on_membership_change(sender, project_ids, user_ids, **kwargs):
+    for project_id in project_ids:
+        access_cache.invalidate(project_id=project_id)
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def drop_access_on_project_change(sender, instance, **kwargs):
+    access_cache.invalidate(project_id=instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def drop_access_on_user_change(sender, instance, **kwargs):
+    access_cache.invalidate(user_id=instance.pk)
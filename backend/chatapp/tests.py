@@ -1,3 +1,790 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import os
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import msgpack
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.core.management import call_command
+from django.db import DatabaseError, transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from backend.asgi import application
+
+from project.access import membership_cache
+from project.models import OutboxEvent, Project
+from project.outbox import build_messages, run
+from task.models import Task
+from task_commit.models import TaskCommit
+from user.models import CustomUser
+from .archive import archive_older_than, archive_project, compact_project, segment_cache, unpack
+from .access import ACCESS_OK, AccessCache, access_cache, resolve_access
+from .codecs import CODECS, frame_cache
+from .buffer import ChatWriteBuffer, chat_buffer, reserve_ids
+from .models import ChatArchiveSegment, ChatMessage
+from .replay import rooms
+
+
+class ChatHistoryTests(TestCase):
+    def setUp(self):
+        membership_cache.clear()
+        self.owner = CustomUser.objects.create_user(email="owner@example.com", github_username="owner")
+        self.member = CustomUser.objects.create_user(email="member@example.com", github_username="member")
+        self.project = Project.objects.create(name="Chat", created_by=self.owner)
+        self.project.contributors.add(self.member)
+        self.messages = [
+            ChatMessage.objects.create(
+                project=self.project,
+                sender=self.owner if i % 2 else self.member,
+                message=f"message {i}",
+            )
+            for i in range(7)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def get_history(self, **params):
+        params.setdefault("project_id", self.project.id)
+        return self.client.get("/api/chat/chatapp_home/", params)
+
+    def test_latest_page_is_newest_first(self):
+        res = self.get_history(limit=3)
+        self.assertEqual(res.status_code, 200)
+        ids = [m["id"] for m in res.data["messages"]]
+        self.assertEqual(ids, [m.id for m in self.messages[-1:-4:-1]])
+        self.assertTrue(res.data["has_more"])
+        self.assertEqual(res.data["next_before"], ids[-1])
+
+    def test_sparse_fields(self):
+        res = self.get_history(limit=3, fields="id,message")
+        self.assertEqual(list(res.data["messages"][0]), ["id", "message"])
+        self.assertEqual(res.data["senders"], {})
+        self.assertEqual(res.data["next_before"], self.messages[-3].id)
+
+    def test_before_cursor_walks_back_to_the_start(self):
+        seen = []
+        before = None
+        while True:
+            params = {"limit": 3}
+            if before:
+                params["before"] = before
+            res = self.get_history(**params)
+            seen.extend(m["id"] for m in res.data["messages"])
+            if not res.data["has_more"]:
+                break
+            before = res.data["next_before"]
+        self.assertEqual(seen, [m.id for m in reversed(self.messages)])
+
+    def test_after_cursor_returns_the_gap(self):
+        res = self.get_history(after=self.messages[4].id)
+        ids = [m["id"] for m in res.data["messages"]]
+        self.assertEqual(ids, [self.messages[6].id, self.messages[5].id])
+        self.assertFalse(res.data["has_more"])
+
+    def test_senders_are_listed_once(self):
+        res = self.get_history()
+        self.assertEqual(set(res.data["senders"]), {str(self.owner.id), str(self.member.id)})
+        self.assertNotIn("github_auth_token", res.data["senders"][str(self.owner.id)])
+        self.assertNotIn("sender", res.data["messages"][0])
+        self.assertNotIn("project", res.data["messages"][0])
+
+    def test_query_count_is_independent_of_page_size(self):
+        self.get_history()  # warms the membership cache
+        # hot page, archive segment lookup (the page ran out), senders
+        with self.assertNumQueries(3):
+            self.get_history(limit=200)
+        with self.assertNumQueries(2):
+            self.get_history(limit=3)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.get_history(before="abc").status_code, 400)
+        self.assertEqual(self.get_history(before=1, after=1).status_code, 400)
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class ChatHandshakeTests(TestCase):
+    def setUp(self):
+        access_cache.clear()
+        rooms.clear()
+        frame_cache.clear()
+        self.owner = CustomUser.objects.create_user(email="owner@example.com", github_username="owner")
+        self.member = CustomUser.objects.create_user(email="member@example.com", github_username="member")
+        self.outsider = CustomUser.objects.create_user(email="outsider@example.com")
+        self.project = Project.objects.create(name="Chat", created_by=self.owner)
+        self.project.contributors.add(self.member)
+
+    async def connect(self, user=None, project_id=None):
+        path = f"/ws/chat/{project_id or self.project.id}/"
+        if user is not None:
+            path += f"?token={AccessToken.for_user(user)}"
+        communicator = WebsocketCommunicator(application, path)
+        await communicator.connect()
+        first = await communicator.receive_json_from()
+        return communicator, first
+
+    async def test_member_connects(self):
+        communicator, first = await self.connect(self.member)
+        self.assertEqual(first["type"], "connection_success")
+        self.assertEqual(first["user"]["github_username"], "member")
+        await communicator.disconnect()
+
+    async def test_message_is_broadcast_before_it_is_written(self):
+        communicator, _ = await self.connect(self.member)
+        await communicator.send_json_to({"message": " hello "})
+        event = await communicator.receive_json_from()
+        self.assertEqual((event["type"], event["message"]), ("chat_message", "hello"))
+        self.assertFalse(await ChatMessage.objects.filter(id=event["id"]).aexists())
+
+        await chat_buffer.flush()
+        self.assertTrue(await ChatMessage.objects.filter(id=event["id"]).aexists())
+        await communicator.disconnect()
+
+    async def test_rejections(self):
+        for user, project_id, code in [
+            (None, None, "AUTH_REQUIRED"),
+            (self.outsider, None, "PERMISSION_DENIED"),
+            (self.owner, 999999, "PROJECT_NOT_FOUND"),
+        ]:
+            communicator, first = await self.connect(user, project_id)
+            self.assertEqual(first["code"], code)
+            await communicator.disconnect()
+
+    def test_handshake_is_one_query(self):
+        with self.assertNumQueries(1):
+            decision = resolve_access(self.member.id, self.project.id)
+        self.assertEqual(decision.code, ACCESS_OK)
+
+    def test_membership_change_invalidates_cache(self):
+        access_cache.set(self.member.id, self.project.id, resolve_access(self.member.id, self.project.id))
+        self.project.contributors.remove(self.member)
+        self.assertIsNone(access_cache.get(self.member.id, self.project.id))
+        self.assertEqual(resolve_access(self.member.id, self.project.id).code, "PERMISSION_DENIED")
+
+    def test_cache_is_bounded(self):
+        cache = AccessCache(maxsize=2, ttl=60)
+        for project_id in range(3):
+            cache.set(1, project_id, project_id)
+        self.assertIsNone(cache.get(1, 0))
+        self.assertEqual(cache.get(1, 2), 2)
+
+
+class ChatWriteBufferTests(TestCase):
+    def setUp(self):
+        self.owner = CustomUser.objects.create_user(email="owner@example.com")
+        self.project = Project.objects.create(name="Chat", created_by=self.owner)
+        self.spool = tempfile.NamedTemporaryFile(suffix=".jsonl", delete=False).name
+        os.remove(self.spool)
+        self.buffer = ChatWriteBuffer(batch_size=50, flush_interval=60, id_block_size=10, spool_path=self.spool)
+
+    def tearDown(self):
+        if os.path.exists(self.spool):
+            os.remove(self.spool)
+
+    async def test_ids_are_assigned_before_the_write(self):
+        msgs = [await self.buffer.add(self.owner.id, self.project.id, f"m{i}") for i in range(15)]
+        ids = [m.id for m in msgs]
+        self.assertEqual(ids, sorted(set(ids)))
+        self.assertEqual(await ChatMessage.objects.acount(), 0)
+
+        await self.buffer.flush()
+        saved = [m async for m in ChatMessage.objects.order_by("id").values_list("id", "timestamp")]
+        self.assertEqual(saved, [(m.id, m.timestamp) for m in msgs])
+
+    async def test_concurrent_adds_lose_nothing(self):
+        # every add starts on an empty block, so each one awaits a refill
+        msgs = await asyncio.gather(*[
+            self.buffer.add(self.owner.id, self.project.id, f"m{i}", numbered=True) for i in range(25)
+        ])
+        self.assertEqual(len({m.id for m in msgs}), 25)
+        self.assertEqual(len({m.seq for m in msgs}), 25)
+
+        await self.buffer.flush()
+        self.assertEqual(await ChatMessage.objects.acount(), 25)
+
+    def test_flush_is_one_insert(self):
+        batch = [
+            ChatMessage(id=reserve_ids(1), sender=self.owner, project=self.project, message=str(i))
+            for i in range(20)
+        ]
+        with self.assertNumQueries(1):
+            self.buffer.write(batch)
+
+    def test_reservation_skips_existing_rows(self):
+        existing = ChatMessage.objects.create(sender=self.owner, project=self.project, message="x")
+        self.assertGreater(reserve_ids(5), existing.id)
+        first = reserve_ids(5)
+        self.assertEqual(reserve_ids(5), first + 5)
+
+    def test_failed_batch_is_spooled_and_replayed(self):
+        msg = ChatMessage(id=reserve_ids(1), sender=self.owner, project=self.project, message="later")
+        with mock.patch.object(ChatMessage.objects, "bulk_create", side_effect=DatabaseError), \
+                self.assertLogs("chatapp.buffer", "ERROR"):
+            self.buffer.write([msg])
+        self.assertTrue(os.path.exists(self.spool))
+        self.assertFalse(ChatMessage.objects.exists())
+
+        self.buffer.drain()  # nothing pending, spool is only replayed on write
+        self.buffer.write([])
+        self.assertFalse(os.path.exists(self.spool))
+        self.assertEqual(ChatMessage.objects.get().message, "later")
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class ChatResumeTests(TestCase):
+    def setUp(self):
+        access_cache.clear()
+        rooms.clear()
+        frame_cache.clear()
+        # seq blocks from earlier tests belong to rolled-back rooms
+        self.enterContext(mock.patch.object(chat_buffer, "_seqs", {}))
+        self.enterContext(mock.patch.object(chat_buffer, "flush_interval", 0.01))
+        self.owner = CustomUser.objects.create_user(email="owner@example.com", github_username="owner")
+        self.project = Project.objects.create(name="Chat", created_by=self.owner)
+        self.path = f"/ws/chat/{self.project.id}/?token={AccessToken.for_user(self.owner)}"
+
+    async def open(self, since=None):
+        path = self.path if since is None else f"{self.path}&since={since}"
+        communicator = WebsocketCommunicator(application, path)
+        await communicator.connect()
+        await communicator.receive_json_from()  # connection_success
+        return communicator
+
+    async def drain_replay(self, communicator):
+        frames = []
+        while True:
+            frame = await communicator.receive_json_from()
+            if frame["type"] != "chat_message":
+                return frames, frame
+            frames.append(frame)
+
+    async def test_resume_from_ring_buffer(self):
+        communicator = await self.open()
+        for text in ("one", "two", "three"):
+            await communicator.send_json_to({"message": text})
+            await communicator.receive_json_from()
+        await communicator.disconnect()
+
+        communicator = await self.open(since=1)
+        frames, done = await self.drain_replay(communicator)
+        self.assertEqual([(f["seq"], f["message"]) for f in frames], [(2, "two"), (3, "three")])
+        self.assertEqual(done, {"type": "replay_complete", "last_seq": 3})
+        await communicator.disconnect()
+        await chat_buffer.flush()
+
+    async def test_resume_falls_back_to_the_database(self):
+        for seq in range(1, 6):
+            await ChatMessage.objects.acreate(project=self.project, sender=self.owner, message=f"m{seq}", seq=seq)
+
+        communicator = await self.open(since=3)
+        frames, done = await self.drain_replay(communicator)
+        self.assertEqual([f["seq"] for f in frames], [4, 5])
+        self.assertEqual(done["last_seq"], 5)
+        await communicator.disconnect()
+
+    async def test_workers_share_one_sequence(self):
+        spool = os.path.join(tempfile.mkdtemp(), "spool.jsonl")
+        other = ChatWriteBuffer(batch_size=50, flush_interval=60, id_block_size=10, spool_path=spool)
+        workers = [chat_buffer, other, other, chat_buffer, other]
+        msgs = [
+            await worker.add(self.owner.id, self.project.id, f"m{i}", numbered=True)
+            for i, worker in enumerate(workers)
+        ]
+        # each worker numbers from its own block
+        self.assertEqual([m.seq for m in msgs], [1, 101, 102, 2, 103])
+        await chat_buffer.flush()
+
+        # the other worker flushes while this one waits for it
+        asyncio.get_running_loop().call_later(0.05, lambda: asyncio.ensure_future(other.flush()))
+        with mock.patch.object(chat_buffer, "flush_interval", 0.2):
+            communicator = await self.open(since=1)
+            frames, done = await self.drain_replay(communicator)
+        self.assertEqual(
+            [(f["seq"], f["message"]) for f in frames],
+            [(101, "m1"), (102, "m2"), (2, "m3"), (103, "m4")],
+        )
+        self.assertEqual(done["last_seq"], 103)
+        await communicator.disconnect()
+
+    async def test_unknown_resume_point_requires_resync(self):
+        await ChatMessage.objects.acreate(project=self.project, sender=self.owner, message="m", seq=1)
+
+        communicator = await self.open(since=7)
+        frame = await communicator.receive_json_from()
+        self.assertEqual(frame, {"type": "resync_required", "last_seq": 1})
+        await communicator.disconnect()
+
+    async def test_large_gap_requires_resync(self):
+        for seq in range(1, 6):
+            await ChatMessage.objects.acreate(project=self.project, sender=self.owner, message="m", seq=seq)
+
+        with mock.patch("chatapp.consumers.REPLAY_LIMIT", 2):
+            communicator = await self.open(since=0)
+            frame = await communicator.receive_json_from()
+        self.assertEqual(frame, {"type": "resync_required", "last_seq": 5})
+        await communicator.disconnect()
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class MultiplexConsumerTests(TestCase):
+    def setUp(self):
+        access_cache.clear()
+        rooms.clear()
+        frame_cache.clear()
+        self.owner = CustomUser.objects.create_user(email="owner@example.com", github_username="owner")
+        self.outsider = CustomUser.objects.create_user(email="outsider@example.com")
+        self.first = Project.objects.create(name="First", created_by=self.owner)
+        self.second = Project.objects.create(name="Second", created_by=self.owner)
+        self.private = Project.objects.create(name="Private", created_by=self.outsider)
+
+    async def open(self):
+        communicator = WebsocketCommunicator(application, f"/ws/stream/?token={AccessToken.for_user(self.owner)}")
+        await communicator.connect()
+        hello = await communicator.receive_json_from()
+        self.assertEqual(hello, {"type": "connection_success", "user_id": self.owner.id})
+        return communicator
+
+    async def subscribe(self, communicator, project):
+        await communicator.send_json_to({"action": "subscribe", "stream": "chat", "project_id": project.id})
+        return await communicator.receive_json_from()
+
+    async def test_one_socket_many_rooms(self):
+        communicator = await self.open()
+        for project in (self.first, self.second):
+            self.assertEqual((await self.subscribe(communicator, project))["type"], "subscribed")
+
+        for project in (self.first, self.second):
+            await communicator.send_json_to({
+                "action": "send", "stream": "chat", "project_id": project.id, "message": project.name,
+            })
+            frame = await communicator.receive_json_from()
+            self.assertEqual(
+                (frame["type"], frame["stream"], frame["project_id"], frame["message"]),
+                ("chat_message", "chat", project.id, project.name),
+            )
+        await communicator.disconnect()
+        await chat_buffer.flush()
+
+    async def test_subscription_is_permission_checked(self):
+        communicator = await self.open()
+        frame = await self.subscribe(communicator, self.private)
+        self.assertEqual((frame["code"], frame["project_id"]), ("PERMISSION_DENIED", self.private.id))
+
+        await communicator.send_json_to({
+            "action": "send", "stream": "chat", "project_id": self.private.id, "message": "hi",
+        })
+        self.assertEqual((await communicator.receive_json_from())["code"], "NOT_SUBSCRIBED")
+        await communicator.disconnect()
+
+    async def test_unsubscribe_stops_delivery(self):
+        communicator = await self.open()
+        await self.subscribe(communicator, self.first)
+        await communicator.send_json_to({"action": "unsubscribe", "stream": "chat", "project_id": self.first.id})
+        self.assertEqual((await communicator.receive_json_from())["type"], "unsubscribed")
+
+        room = WebsocketCommunicator(application, f"/ws/chat/{self.first.id}/?token={AccessToken.for_user(self.owner)}")
+        await room.connect()
+        await room.receive_json_from()
+        await room.send_json_to({"message": "after unsubscribe"})
+        await room.receive_json_from()
+
+        self.assertTrue(await communicator.receive_nothing())
+        await room.disconnect()
+        await communicator.disconnect()
+        await chat_buffer.flush()
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class ChatEncodingTests(TestCase):
+    def setUp(self):
+        access_cache.clear()
+        rooms.clear()
+        frame_cache.clear()
+        # seq blocks from earlier tests belong to rolled-back rooms
+        self.enterContext(mock.patch.object(chat_buffer, "_seqs", {}))
+        self.enterContext(mock.patch.object(chat_buffer, "flush_interval", 0.01))
+        self.owner = CustomUser.objects.create_user(email="owner@example.com", github_username="owner")
+        self.project = Project.objects.create(name="Chat", created_by=self.owner)
+        self.path = f"/ws/chat/{self.project.id}/?token={AccessToken.for_user(self.owner)}"
+
+    async def test_msgpack_frames_are_compact(self):
+        communicator = WebsocketCommunicator(application, f"{self.path}&encoding=msgpack")
+        await communicator.connect()
+        hello = msgpack.unpackb(await communicator.receive_from())
+        self.assertEqual(hello["type"], "connection_success")
+
+        await communicator.send_to(bytes_data=msgpack.packb({"message": "hello"}))
+        sender = msgpack.unpackb(await communicator.receive_from())
+        self.assertEqual(sender, {"type": "sender", "id": self.owner.id, "email": "owner@example.com", "github_username": "owner"})
+        raw = await communicator.receive_from()
+        frame = msgpack.unpackb(raw)
+        self.assertEqual(frame["sender_id"], self.owner.id)
+        self.assertIsInstance(frame["ts"], int)
+        self.assertNotIn("timestamp", frame)
+
+        # the profile is not repeated for the same sender
+        await communicator.send_to(bytes_data=msgpack.packb({"message": "again"}))
+        self.assertEqual(msgpack.unpackb(await communicator.receive_from())["message"], "again")
+
+        json_frame = frame_cache.encode(CODECS["json"], rooms.get(self.project.id).recent[0])
+        self.assertLess(len(raw), len(json_frame.encode()))
+        await communicator.disconnect()
+        await chat_buffer.flush()
+
+    async def test_json_stays_the_default(self):
+        communicator = WebsocketCommunicator(application, self.path)
+        await communicator.connect()
+        self.assertEqual(json.loads(await communicator.receive_from())["type"], "connection_success")
+        await communicator.disconnect()
+
+    async def test_unknown_encoding_is_rejected(self):
+        communicator = WebsocketCommunicator(application, f"{self.path}&encoding=xml")
+        await communicator.connect()
+        self.assertEqual((await communicator.receive_json_from())["code"], "UNSUPPORTED_ENCODING")
+        await communicator.disconnect()
+
+
+class ChatSearchTests(TestCase):
+    def setUp(self):
+        self.owner = CustomUser.objects.create_user(email="owner@example.com")
+        self.project = Project.objects.create(name="Chat", created_by=self.owner)
+        self.other = Project.objects.create(name="Other", created_by=self.owner)
+        self.deploy = ChatMessage.objects.create(project=self.project, sender=self.owner, message="the deploy <failed> again")
+        ChatMessage.objects.create(project=self.project, sender=self.owner, message="lunch?")
+        ChatMessage.objects.create(project=self.other, sender=self.owner, message="deploy went fine")
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def search(self, **params):
+        params.setdefault("project_id", self.project.id)
+        return self.client.get("/api/chat/search/", params)
+
+    def test_hits_are_scoped_to_the_project(self):
+        res = self.search(q="deploy")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual([hit["id"] for hit in res.data["results"]], [self.deploy.id])
+        self.assertEqual(set(res.data["senders"]), {str(self.owner.id)})
+
+    def test_snippet_is_escaped_and_highlighted(self):
+        snippet = self.search(q="deploy").data["results"][0]["snippet"]
+        self.assertIn("<mark>deploy</mark>", snippet)
+        self.assertIn("&lt;failed&gt;", snippet)
+
+    def test_last_word_matches_as_prefix(self):
+        self.assertEqual(len(self.search(q="depl").data["results"]), 1)
+
+    def test_index_follows_updates_and_deletes(self):
+        self.deploy.message = "rollback"
+        self.deploy.save()
+        self.assertEqual(self.search(q="deploy").data["results"], [])
+        self.assertEqual(len(self.search(q="rollback").data["results"]), 1)
+        self.deploy.delete()
+        self.assertEqual(self.search(q="rollback").data["results"], [])
+
+    def test_bulk_inserts_are_indexed(self):
+        ChatMessage.objects.bulk_create([
+            ChatMessage(id=reserve_ids(1), project=self.project, sender=self.owner, message=f"release {i}")
+            for i in range(3)
+        ])
+        res = self.search(q="release", limit=2)
+        self.assertEqual(len(res.data["results"]), 2)
+        self.assertTrue(res.data["has_more"])
+
+    def test_query_is_required(self):
+        self.assertEqual(self.search(q=" ").status_code, 400)
+        self.assertEqual(self.search(q="!!!").data["results"], [])
+
+
+class ChatArchiveTests(TestCase):
+    def setUp(self):
+        segment_cache.clear()
+        self.owner = CustomUser.objects.create_user(email="owner@example.com")
+        self.project = Project.objects.create(name="Chat", created_by=self.owner)
+        now = timezone.now()
+        self.messages = []
+        for i, days_ago in enumerate([400, 380, 340, 300, 10, 5, 1]):
+            msg = ChatMessage.objects.create(
+                project=self.project, sender=self.owner, message=f"m{i}", seq=i + 1,
+                timestamp=now - timedelta(days=days_ago),
+            )
+            self.messages.append(msg)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def history(self, **params):
+        params.update(project_id=self.project.id)
+        return self.client.get("/api/chat/chatapp_home/", params).data
+
+    def test_command_moves_old_messages_into_monthly_segments(self):
+        expected = self.history(limit=200)["messages"]
+
+        call_command("archive_chat", "--older-than-days", "30", stdout=io.StringIO())
+
+        self.assertEqual(ChatMessage.objects.count(), 3)
+        segments = ChatArchiveSegment.objects.filter(project=self.project)
+        self.assertEqual(sum(s.message_count for s in segments), 4)
+        self.assertTrue(all(s.month.day == 1 for s in segments))
+        # archived rows page back exactly as they did from the hot table
+        self.assertEqual(self.history(limit=200)["messages"], expected)
+
+    def test_cursor_pages_through_hot_and_archived_data(self):
+        archive_older_than(30)
+        seen, before = [], None
+        while True:
+            params = {"limit": 2}
+            if before:
+                params["before"] = before
+            page = self.history(**params)
+            seen += [m["id"] for m in page["messages"]]
+            if not page["has_more"]:
+                break
+            before = page["next_before"]
+        self.assertEqual(seen, [m.id for m in reversed(self.messages)])
+
+        page = self.history(after=self.messages[1].id, limit=3)
+        self.assertEqual([m["message"] for m in page["messages"]], ["m4", "m3", "m2"])
+        self.assertTrue(page["has_more"])
+
+    def test_rearchiving_appends_to_the_month(self):
+        archive_project(self.project.id, self.messages[0].timestamp + timedelta(seconds=1))
+        archive_project(self.project.id, self.messages[1].timestamp + timedelta(seconds=1))
+        rows = [row for s in ChatArchiveSegment.objects.all() for row in unpack(s.data)]
+        self.assertEqual(sorted(row["id"] for row in rows), [self.messages[0].id, self.messages[1].id])
+
+    def month_of_messages(self, count):
+        project = Project.objects.create(name="Busy", created_by=self.owner)
+        start = timezone.now() - timedelta(days=400)
+        return project, [
+            ChatMessage.objects.create(
+                project=project, sender=self.owner, message=f"b{i}", seq=i + 1,
+                timestamp=start + timedelta(minutes=i),
+            )
+            for i in range(count)
+        ]
+
+    def test_segments_are_written_once(self):
+        project, messages = self.month_of_messages(7)
+        with mock.patch("chatapp.archive.unpack", side_effect=AssertionError("segment re-read")):
+            archived = archive_project(project.id, timezone.now(), batch_size=3, segment_size=2)
+        self.assertEqual(archived, 7)
+        segments = ChatArchiveSegment.objects.filter(project=project).order_by("first_id")
+        # batch tails wait for the next batch, so only the run's end is short
+        self.assertEqual([s.message_count for s in segments], [2, 2, 2, 1])
+        self.assertEqual(len({s.month for s in segments}), 1)
+        self.assertEqual([row["id"] for s in segments for row in unpack(s.data)], [m.id for m in messages])
+
+    def test_compaction_merges_short_runs(self):
+        project, messages = self.month_of_messages(5)
+        for msg in messages:
+            archive_project(project.id, msg.timestamp + timedelta(seconds=1), segment_size=2)
+        self.assertEqual(ChatArchiveSegment.objects.filter(project=project).count(), 5)
+
+        self.assertEqual(compact_project(project.id, segment_size=2), 5)
+        segments = ChatArchiveSegment.objects.filter(project=project).order_by("first_id")
+        self.assertEqual([s.message_count for s in segments], [2, 2, 1])
+        self.assertEqual([row["id"] for s in segments for row in unpack(s.data)], [m.id for m in messages])
+        self.assertEqual(compact_project(project.id, segment_size=2), 0)
+
+    def test_archived_messages_leave_search(self):
+        archive_older_than(30)
+        res = self.client.get("/api/chat/search/", {"project_id": self.project.id, "q": "m0"})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["results"], [])
+        res = self.client.get("/api/chat/search/", {"project_id": self.project.id, "q": "m6"})
+        self.assertEqual(len(res.data["results"]), 1)
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class ProjectEventTests(TestCase):
+    def setUp(self):
+        access_cache.clear()
+        membership_cache.clear()
+        self.owner = CustomUser.objects.create_user(email="owner@example.com", github_username="owner")
+        self.dev = CustomUser.objects.create_user(email="dev@example.com")
+        self.project = Project.objects.create(name="Events", created_by=self.owner)
+        self.task = Task.objects.create(
+            project_id=self.project, title="t", branch_name="b", created_by=self.owner, assigned_to=self.owner,
+        )
+        OutboxEvent.objects.all().delete()
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        self.layer = get_channel_layer()
+        self.channel = async_to_sync(self.layer.new_channel)()
+        async_to_sync(self.layer.group_add)(f"project_{self.project.id}", self.channel)
+
+    def events(self, channel=None, dispatch=True):
+        """Run the dispatcher over the outbox, then collect what was sent."""
+        async def drain():
+            if dispatch:
+                await run(once=True)
+            received = []
+            while True:
+                try:
+                    message = await asyncio.wait_for(self.layer.receive(channel or self.channel), 0.05)
+                except asyncio.TimeoutError:
+                    return received
+                received += message["events"]
+        return async_to_sync(drain)()
+
+    def test_rest_writes_publish_events(self):
+        self.client.put(f"/api/tasks/create_task/?pk={self.task.id}", {"status": "in_progress"}, format="json")
+        (event,) = self.events()
+        self.assertEqual((event["type"], event["project_id"]), ("task_updated", self.project.id))
+        self.assertEqual(event["task"]["status"], "in_progress")
+        self.assertEqual(event["task"]["assigned_to"]["email"], "owner@example.com")
+
+        self.client.post(
+            f"/api/task_commit/commit_task/?project_id={self.project.id}",
+            {"github_task": self.task.id, "project_id": self.project.id, "completed_by": self.owner.id,
+             "commit_id": "a" * 40, "message": "fix", "step": "test"}, format="json",
+        )
+        (event,) = self.events()
+        self.assertEqual(event["type"], "commit_created")
+        self.assertEqual(event["commit"]["completed_by"]["id"], self.owner.id)
+        commit_id = event["commit"]["id"]
+
+        self.client.post(f"/api/task_commit/task_request/deny/?commit_id={'a' * 40}")
+        self.assertEqual(
+            [(e["type"], e.get("id")) for e in self.events()],
+            [("task_updated", None), ("commit_deleted", commit_id)],
+        )
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_batches_are_coalesced_per_object(self):
+        other = Task.objects.create(project_id=self.project, title="o", branch_name="o", created_by=self.owner)
+        for status in ("in_progress", "completed", "pending"):
+            self.task.status = status
+            self.task.save()
+        other.priority = "high"
+        other.save()
+        gone = Task.objects.create(project_id=self.project, title="g", branch_name="g", created_by=self.owner)
+        gone_id = gone.id
+        gone.delete()
+
+        events = self.events()
+        self.assertEqual([(e["type"], e.get("task", e)["id"]) for e in events], [
+            ("task_updated", self.task.id), ("task_created", other.id), ("task_deleted", gone_id),
+        ])
+        self.assertEqual(events[0]["task"]["status"], "pending")
+        self.assertEqual(events[1]["task"]["priority"], "high")
+
+    def test_join_requests_and_membership_reach_user_groups(self):
+        inbox = async_to_sync(self.layer.new_channel)()
+        async_to_sync(self.layer.group_add)(f"user_{self.dev.id}", inbox)
+        self.client.post("/api/joinrequest/join-requests/", {
+            "project": self.project.id, "receiver": self.dev.id, "content": "join us",
+        }, format="json")
+        (event,) = self.events(inbox)
+        self.assertEqual(event["type"], "join_request_created")
+        self.assertEqual(event["join_request"]["sender"]["id"], self.owner.id)
+
+        self.project.contributors.add(self.dev)
+        self.assertEqual(self.events(inbox), [{"type": "projects_changed", "project_ids": [self.project.id]}])
+        self.assertEqual(self.events(dispatch=False), [
+            {"type": "members_changed", "user_ids": [self.dev.id], "project_id": self.project.id},
+        ])
+
+    def test_rolled_back_writes_enqueue_nothing(self):
+        try:
+            with transaction.atomic():
+                self.task.status = "completed"
+                self.task.save()
+                raise DatabaseError("rolled back")
+        except DatabaseError:
+            pass
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_failed_sends_are_retried(self):
+        self.task.save()
+        failing = mock.AsyncMock(side_effect=ConnectionError("layer down"))
+        with mock.patch.object(self.layer, "group_send", failing):
+            with self.assertRaises(ConnectionError):
+                async_to_sync(run)(once=True)
+        self.assertEqual(OutboxEvent.objects.count(), 1)
+        self.assertEqual([e["type"] for e in self.events()], ["task_updated"])
+
+    def test_rows_committed_late_with_lower_ids_are_kept(self):
+        early = OutboxEvent.objects.create(stream="events", group=f"project_{self.project.id}", event={})
+        self.task.save()
+        late_id = early.id
+        early.delete()
+
+        def commit_late(rows):
+            # a writer holding the lower id commits while the batch is out
+            OutboxEvent.objects.create(
+                id=late_id, stream="events", group=f"project_{self.project.id}",
+                event={"type": "task_deleted", "id": 99},
+            )
+            return build_messages(rows)
+
+        with mock.patch("project.outbox.build_messages", commit_late):
+            self.assertEqual([e["type"] for e in self.events()], ["task_updated"])
+        self.assertEqual(list(OutboxEvent.objects.values_list("id", flat=True)), [late_id])
+        self.assertEqual(self.events(), [{"type": "task_deleted", "id": 99}])
+
+    async def test_removed_members_lose_their_sockets(self):
+        await database_sync_to_async(self.project.contributors.add)(self.dev)
+        await OutboxEvent.objects.all().adelete()
+        token = AccessToken.for_user(self.dev)
+        room = WebsocketCommunicator(application, f"/ws/chat/{self.project.id}/?token={token}")
+        await room.connect()
+        self.assertEqual((await room.receive_json_from())["type"], "connection_success")
+        multiplex = WebsocketCommunicator(application, f"/ws/stream/?token={token}")
+        await multiplex.connect()
+        await multiplex.receive_json_from()
+        await multiplex.send_json_to({"action": "subscribe", "stream": "chat", "project_id": self.project.id})
+        self.assertEqual((await multiplex.receive_json_from())["type"], "subscribed")
+        allowed = access_cache.get(self.dev.id, self.project.id)
+
+        await database_sync_to_async(self.project.contributors.remove)(self.dev)
+        # as a worker that did not make the change still would
+        access_cache.set(self.dev.id, self.project.id, allowed)
+        await run(once=True)
+
+        self.assertEqual((await room.receive_json_from())["code"], "PERMISSION_DENIED")
+        self.assertEqual((await room.receive_output())["type"], "websocket.close")
+        frames = [await multiplex.receive_json_from() for _ in range(3)]
+        self.assertEqual([(f["type"], f.get("code")) for f in frames], [
+            ("projects_changed", None), ("error", "PERMISSION_DENIED"), ("unsubscribed", None),
+        ])
+        await multiplex.send_json_to({"action": "send", "stream": "chat", "project_id": self.project.id, "message": "hi"})
+        self.assertEqual((await multiplex.receive_json_from())["code"], "NOT_SUBSCRIBED")
+        await multiplex.disconnect()
+
+    async def test_sockets_receive_events(self):
+        token = AccessToken.for_user(self.owner)
+        multiplex = WebsocketCommunicator(application, f"/ws/stream/?token={token}")
+        await multiplex.connect()
+        await multiplex.receive_json_from()
+        await multiplex.send_json_to({"action": "subscribe", "stream": "events", "project_id": self.project.id})
+        self.assertEqual((await multiplex.receive_json_from())["type"], "subscribed")
+
+        room = WebsocketCommunicator(application, f"/ws/chat/{self.project.id}/?token={token}&events=1")
+        await room.connect()
+        await room.receive_json_from()
+
+        event = {"type": "task_deleted", "project_id": self.project.id, "id": 7}
+        await get_channel_layer().group_send(
+            f"project_{self.project.id}", {"type": "outbox_events", "stream": "events", "events": [event]},
+        )
+        self.assertEqual(await multiplex.receive_json_from(), {**event, "stream": "events"})
+        self.assertEqual(await room.receive_json_from(), event)
+
+        await get_channel_layer().group_send(
+            f"user_{self.owner.id}",
+            {"type": "outbox_events", "stream": "user", "events": [{"type": "projects_changed", "project_ids": [1]}]},
+        )
+        self.assertEqual(await multiplex.receive_json_from(), {
+            "type": "projects_changed", "project_ids": [1], "stream": "user",
+        })
+        self.assertTrue(await room.receive_nothing())
+        await multiplex.disconnect()
+        await room.disconnect()
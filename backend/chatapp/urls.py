@@ -2,4 +2,5 @@ from django.urls import path
 from .views import *
 urlpatterns = [
     path('chatapp_home/', chatapp_home, name='chatapp_home'),
-]
\ No newline at end of file
+    path('search/', chat_search, name='chat_search'),
+]
@@ -1,22 +1,143 @@
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from .archive import archived_after, archived_before
 from .models import ChatMessage as chatMessage
-from .serializers import ChatMessageSerializer
+from .search import search_messages
+from .serializers import ChatSearchHitSerializer, FastChatHistorySerializer
+from backend.flexfields import parse_names, trim
+from project.permissions import IsProjectMember
+from user.models import CustomUser
+from user.serializers import usserprofileSerializer
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def _senders(sender_ids):
+    senders = CustomUser.objects.filter(id__in=sender_ids).only(
+        'id', 'email', 'github_username'
+    )
+    return {str(sender.id): usserprofileSerializer(sender).data for sender in senders}
+
+
+def _page(rows, fields):
+    """Trim rows to ?fields=; the senders table only backs a sender_id column."""
+    rows = [trim(row, fields) for row in rows]
+    if fields is not None and 'sender_id' not in fields:
+        return rows, {}
+    return rows, _senders({row['sender_id'] for row in rows})
+
+
+def _int_param(request, name):
+    value = request.GET.get(name)
+    if value in (None, ''):
+        return None
+    return int(value)
+
 
 @api_view(['GET'])
+@permission_classes([IsAuthenticated, IsProjectMember])
 def chatapp_home(request):
-    # in function-based api_view, use request.GET for query params
+    """
+    Keyset-paginated chat history for a project, newest message first.
+
+    Query params:
+      project_id  required
+      before      only messages with id < before (scroll back)
+      after       only messages with id > after (catch up)
+      limit       page size, default 50, max 200
+      fields      only these message fields, e.g. id,message
+
+    Messages reference their sender by id; every sender on the page is
+    listed once in the "senders" table. Pages continue transparently into
+    archived segments (see chatapp.archive) once the hot table runs out.
+    """
     project_id = request.GET.get('project_id')
 
     if not project_id:
         return Response({'error': 'project_id is required'}, status=400)
 
     try:
-        messages = chatMessage.objects.filter(
-            project__id=project_id
-        ).order_by('timestamp')
+        before = _int_param(request, 'before')
+        after = _int_param(request, 'after')
+        limit = _int_param(request, 'limit') or DEFAULT_PAGE_SIZE
+    except ValueError:
+        return Response({'error': 'before, after and limit must be integers'}, status=400)
+
+    if before is not None and after is not None:
+        return Response({'error': 'use either before or after, not both'}, status=400)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
 
-        serializer = ChatMessageSerializer(messages, many=True)
-        return Response({'messages': serializer.data}, status=200)
+    try:
+        messages = chatMessage.objects.filter(project_id=project_id)
+        if after is not None:
+            # oldest messages past the cursor first, flipped below; archived
+            # ids are all below the hot ones, so the archive comes first
+            rows = archived_after(project_id, after, limit + 1)
+            hot_after = rows[-1]['id'] if rows else after
+            hot = messages.filter(id__gt=hot_after).order_by('id')[:limit + 1 - len(rows)]
+            rows += FastChatHistorySerializer(hot).data
+            has_more = len(rows) > limit
+            rows = rows[:limit][::-1]
+        else:
+            if before is not None:
+                messages = messages.filter(id__lt=before)
+            rows = FastChatHistorySerializer(messages.order_by('-id')[:limit + 1]).data
+            if len(rows) <= limit:
+                # ran past the hot table: continue into archived segments
+                archive_before = rows[-1]['id'] if rows else before
+                rows += archived_before(project_id, archive_before, limit + 1 - len(rows))
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+
+        next_before = rows[-1]['id'] if rows else before
+        next_after = rows[0]['id'] if rows else after
+        rows, senders = _page(rows, parse_names(request.GET.get('fields')))
+        return Response({
+            'messages': rows,
+            'senders': senders,
+            'has_more': has_more,
+            'next_before': next_before,
+            'next_after': next_after,
+        }, status=200)
     except Exception as e:
-        return Response({'error': str(e)}, status=400)
\ No newline at end of file
+        return Response({'error': str(e)}, status=400)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsProjectMember])
+def chat_search(request):
+    """
+    Full-text search over one project's chat history, best match first.
+    Archived messages (see chatapp.archive) are not included.
+
+    Query params: project_id and q (required), page (from 1), limit,
+    fields (only these result fields).
+    """
+    project_id = request.GET.get('project_id')
+    query = request.GET.get('q', '').strip()
+
+    if not project_id or not query:
+        return Response({'error': 'project_id and q are required'}, status=400)
+
+    try:
+        project_id = int(project_id)
+        page = max(_int_param(request, 'page') or 1, 1)
+        limit = max(1, min(_int_param(request, 'limit') or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+    except ValueError:
+        return Response({'error': 'project_id, page and limit must be integers'}, status=400)
+
+    hits = search_messages(project_id, query, limit + 1, (page - 1) * limit)
+    has_more = len(hits) > limit
+    hits = hits[:limit]
+
+    results, senders = _page(
+        ChatSearchHitSerializer(hits, many=True).data, parse_names(request.GET.get('fields'))
+    )
+    return Response({
+        'results': results,
+        'senders': senders,
+        'page': page,
+        'has_more': has_more,
+    }, status=200)
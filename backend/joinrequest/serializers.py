@@ -2,6 +2,8 @@ from rest_framework.serializers import ModelSerializer
 from .models import JoinRequest
 from user.serializers import usserprofileSerializer
 from project.serializers import ProjectSerializer
+from backend.fastserializers import FastSerializer
+from backend.flexfields import FlexFieldsMixin
 from rest_framework import serializers
 from .models import JoinRequest
 
@@ -16,10 +18,17 @@ class JoinRequestSerializer(serializers.ModelSerializer):
         validated_data['sender'] = request.user
         return super().create(validated_data)
 
-class JoindtSerializer(ModelSerializer):
-    sender = usserprofileSerializer(read_only=True)
-    receiver = usserprofileSerializer(read_only=True)
-    project = ProjectSerializer(read_only=True)
+class JoindtSerializer(FlexFieldsMixin, ModelSerializer):
     class Meta:
         model = JoinRequest
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+        read_only_fields = ['sender', 'receiver', 'project']
+        expandable = {
+            'sender': usserprofileSerializer,
+            'receiver': usserprofileSerializer,
+            'project': ProjectSerializer,
+        }
+
+
+class FastJoindtSerializer(FastSerializer):
+    serializer_class = JoindtSerializer
@@ -1,3 +1,50 @@
 from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from project.models import Project
+from user.models import CustomUser
+from .models import JoinRequest
+from .serializers import FastJoindtSerializer, JoindtSerializer
+
+
+class JoinRequestListTests(TestCase):
+    def setUp(self):
+        self.me = CustomUser.objects.create_user(email="me@example.com", github_username="me")
+        self.others = [
+            CustomUser.objects.create_user(email=f"other{i}@example.com", github_username=f"other{i}")
+            for i in range(3)
+        ]
+        for i, other in enumerate(self.others):
+            project = Project.objects.create(name=f"project {i}", created_by=other)
+            project.contributors.add(*self.others[i:])
+            JoinRequest.objects.create(project=project, sender=other, receiver=self.me, content="join")
+
+    def test_fast_serializer_matches_drf_output(self):
+        requests = JoinRequest.objects.filter(receiver=self.me)
+        render = JSONRenderer().render
+        for options in (
+            {},
+            {"expand": {"sender", "receiver", "project.created_by", "project.contributors"}},
+            {"expand": {"project"}, "fields": {"id", "project.name", "project.contributors"}},
+        ):
+            with self.subTest(**options):
+                self.assertEqual(
+                    render(FastJoindtSerializer(requests, **options).data),
+                    render(JoindtSerializer(requests, many=True, **options).data),
+                )
+
+    def test_list_endpoint_query_count(self):
+        client = APIClient()
+        client.force_authenticate(self.me)
+        # relations are ids by default: a single query
+        with self.assertNumQueries(1):
+            res = client.get("/api/joinrequest/join-requests/")
+        self.assertEqual(len(res.data), 3)
+        self.assertIsInstance(res.data[0]["project"], int)
+
+        # expanded project joined in, its contributors in one more query
+        with self.assertNumQueries(2):
+            res = client.get("/api/joinrequest/join-requests/", {"expand": "sender,project.contributors"})
+        self.assertEqual(len(res.data[0]["project"]["contributors"]), 1)
+        self.assertNotIn("github_auth_token", res.data[0]["sender"])
@@ -1,3 +1,4 @@
+from django.db import transaction
 from django.shortcuts import render
 from django.views.decorators.csrf import csrf_exempt
 
@@ -8,7 +9,8 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 
 from .models import JoinRequest
-from .serializers import JoinRequestSerializer, JoindtSerializer
+from .serializers import JoinRequestSerializer, FastJoindtSerializer
+from backend.flexfields import flex_params
 from user.serializers import Userserializer
 from project.models import Project
 
@@ -18,9 +20,11 @@ class JoinRequestView(APIView):
         su = Userserializer(user)
         user_id = su.data.get('id')
         join_requests = JoinRequest.objects.filter(receiver_id=user_id)
-        serializer = JoindtSerializer(join_requests, many=True)
+        # ?fields= / ?expand=sender,receiver,project,project.contributors
+        serializer = FastJoindtSerializer(join_requests, **flex_params(request))
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    @transaction.atomic
     def post(self, request):
         serializer = JoinRequestSerializer(
             data=request.data,
@@ -33,6 +37,7 @@ class JoinRequestView(APIView):
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @transaction.atomic
     def delete(self, request, pk):
         try:
             join_request = JoinRequest.objects.get(pk=pk)
@@ -45,6 +50,7 @@ class JoinRequestView(APIView):
 @csrf_exempt
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@transaction.atomic
 def accept_join_request(request, pk):
     try:
         join_request = JoinRequest.objects.get(pk=pk)
@@ -0,0 +1,159 @@
+"""
+Project membership checks on top of the ProjectMembership index.
+
+The index holds one row per (user, project) for owners and contributors
+and is resynced from the source of truth (created_by + the contributors
+table) by the project signals. Reads go through a per-process cache of
+each user's project-id set, so the hot path is a set lookup and a miss
+is one indexed query:
+
+    is_member(user_id, project_id)
+    project_ids_for(user_id)        # frozenset
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .models import Project, ProjectMembership
+
+
+def _desired_roles(project_ids, user_ids):
+    """{(project_id, user_id): role} from created_by and the contributors table."""
+    projects = Project.objects.filter(id__in=project_ids)
+    contributors = Project.contributors.through.objects.filter(project_id__in=project_ids)
+    if user_ids is not None:
+        projects = projects.filter(created_by_id__in=user_ids)
+        contributors = contributors.filter(customuser_id__in=user_ids)
+    roles = {
+        pair: ProjectMembership.CONTRIBUTOR
+        for pair in contributors.values_list("project_id", "customuser_id")
+    }
+    for pair in projects.values_list("id", "created_by_id"):
+        roles[pair] = ProjectMembership.OWNER
+    return roles
+
+
+def sync_memberships(project_ids, user_ids=None):
+    """
+    Bring the index rows for ``project_ids`` (restricted to ``user_ids``
+    when given) in line with the projects; three reads and at most one
+    insert, one delete and one update per role. Returns the user ids whose
+    rows changed.
+    """
+    project_ids = list(project_ids)
+    if not project_ids:
+        return set()
+    if user_ids is not None:
+        user_ids = list(user_ids)
+
+    desired = _desired_roles(project_ids, user_ids)
+    rows = ProjectMembership.objects.filter(project_id__in=project_ids)
+    if user_ids is not None:
+        rows = rows.filter(user_id__in=user_ids)
+    existing = {(p, u): (pk, role) for pk, p, u, role in rows.values_list("id", "project_id", "user_id", "role")}
+
+    missing = [pair for pair in desired if pair not in existing]
+    stale, changed_roles = [], {}
+    for pair, (pk, role) in existing.items():
+        if pair not in desired:
+            stale.append(pair)
+        elif desired[pair] != role:
+            changed_roles.setdefault(desired[pair], []).append(pair)
+
+    ProjectMembership.objects.bulk_create(
+        [ProjectMembership(project_id=p, user_id=u, role=desired[p, u]) for p, u in missing],
+        batch_size=500, ignore_conflicts=True,
+    )
+    if stale:
+        ProjectMembership.objects.filter(id__in=[existing[pair][0] for pair in stale]).delete()
+    for role, pairs in changed_roles.items():
+        ProjectMembership.objects.filter(id__in=[existing[pair][0] for pair in pairs]).update(role=role)
+
+    affected = {u for _, u in missing + stale}
+    affected.update(u for pairs in changed_roles.values() for _, u in pairs)
+    membership_cache.invalidate(affected)
+    return affected
+
+
+def rebuild_memberships():
+    """Recreate the whole index; returns the row count."""
+    desired = _desired_roles(Project.objects.values("id"), None)
+    ProjectMembership.objects.all().delete()
+    ProjectMembership.objects.bulk_create(
+        [ProjectMembership(project_id=p, user_id=u, role=role) for (p, u), role in desired.items()],
+        batch_size=500,
+    )
+    membership_cache.clear()
+    return len(desired)
+
+
+class MembershipCache:
+    """
+    Bounded TTL cache of user_id -> frozenset of project ids.
+
+    Per process, like chatapp.access.AccessCache; entries are dropped
+    whenever the user's index rows change (see sync_memberships) and
+    expire after ``ttl`` seconds otherwise, which bounds staleness from
+    writes made by other processes.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, project_ids = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return project_ids
+
+    def set(self, user_id, project_ids):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, project_ids)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+membership_cache = MembershipCache(
+    maxsize=getattr(settings, "PROJECT_MEMBERSHIP_CACHE_SIZE", 10000),
+    ttl=getattr(settings, "PROJECT_MEMBERSHIP_CACHE_TTL", 60),
+)
+
+
+def project_ids_for(user_id):
+    """The ids of every project ``user_id`` owns or contributes to."""
+    project_ids = membership_cache.get(user_id)
+    if project_ids is None:
+        project_ids = frozenset(
+            ProjectMembership.objects.filter(user_id=user_id).values_list("project_id", flat=True)
+        )
+        membership_cache.set(user_id, project_ids)
+    return project_ids
+
+
+def is_member(user_id, project_id):
+    try:
+        project_id = int(project_id)
+    except (TypeError, ValueError):
+        return False
+    return project_id in project_ids_for(user_id)
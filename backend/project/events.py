@@ -0,0 +1,186 @@
+"""
+Live events for project pages and user dashboards.
+
+Writers enqueue small reference events in the outbox (OutboxEvent), in
+the same transaction as the change itself; `manage.py dispatch_outbox`
+later coalesces them, hydrates the rows and publishes to the channel
+layer (see project.outbox). What clients receive:
+
+  "events" stream, group project_{id}:
+    {"type": "task_created" | "task_updated", "project_id": 1, "task": {...}}
+    {"type": "task_deleted", "project_id": 1, "id": 7}
+    {"type": "commit_created" | "commit_updated", "project_id": 1, "commit": {...}}
+    {"type": "commit_deleted", "project_id": 1, "id": 3}
+    {"type": "members_changed", "project_id": 1, "user_ids": [...]}
+
+  "user" stream, group user_{id}:
+    {"type": "join_request_created" | "join_request_updated", "join_request": {...}}
+    {"type": "join_request_deleted", "id": 5}
+    {"type": "projects_changed", "project_ids": [...]}
+
+Rows come in the shape of the list endpoints with users expanded, so
+clients apply them without a follow-up GET.
+"""
+from .models import OutboxEvent
+
+GROUP = "project_{project_id}"
+USER_GROUP = "user_{user_id}"
+
+EVENTS_STREAM = "events"
+USER_STREAM = "user"
+
+TASK_EXPAND = frozenset({"assigned_to", "created_by"})
+COMMIT_EXPAND = frozenset({"completed_by"})
+JOIN_REQUEST_EXPAND = frozenset({"sender", "project"})
+
+
+def enqueue(events):
+    """Write (stream, group, event) triples to the outbox."""
+    OutboxEvent.objects.bulk_create(
+        [OutboxEvent(stream=stream, group=group, event=event) for stream, group, event in events],
+        batch_size=500,
+    )
+
+
+def _project_event(project_id, event):
+    return EVENTS_STREAM, GROUP.format(project_id=project_id), {**event, "project_id": project_id}
+
+
+def _user_event(user_id, event):
+    return USER_STREAM, USER_GROUP.format(user_id=user_id), event
+
+
+def task_saved(task, created):
+    enqueue([_project_event(task.project_id_id, {"type": "task_created" if created else "task_updated", "id": task.pk})])
+
+
+def tasks_saved(tasks):
+    enqueue([_project_event(task.project_id_id, {"type": "task_updated", "id": task.pk}) for task in tasks])
+
+
+def task_deleted(task):
+    enqueue([_project_event(task.project_id_id, {"type": "task_deleted", "id": task.pk})])
+
+
+def commit_saved(commit, created):
+    enqueue([_project_event(commit.project_id_id, {"type": "commit_created" if created else "commit_updated", "id": commit.pk})])
+
+
+def commits_saved(created, updated):
+    enqueue(
+        [_project_event(c.project_id_id, {"type": "commit_created", "id": c.pk}) for c in created]
+        + [_project_event(c.project_id_id, {"type": "commit_updated", "id": c.pk}) for c in updated]
+    )
+
+
+def commit_deleted(commit):
+    enqueue([_project_event(commit.project_id_id, {"type": "commit_deleted", "id": commit.pk})])
+
+
+def join_request_saved(join_request, created):
+    kind = "join_request_created" if created else "join_request_updated"
+    enqueue([_user_event(join_request.receiver_id, {"type": kind, "id": join_request.pk})])
+
+
+def join_request_deleted(join_request):
+    enqueue([_user_event(join_request.receiver_id, {"type": "join_request_deleted", "id": join_request.pk})])
+
+
+def membership_changed(project_ids, user_ids):
+    user_ids, project_ids = sorted(user_ids), sorted(project_ids)
+    enqueue(
+        [_project_event(p, {"type": "members_changed", "user_ids": user_ids}) for p in project_ids]
+        + [_user_event(u, {"type": "projects_changed", "project_ids": project_ids}) for u in user_ids]
+    )
+
+
+# -- dispatch side ---------------------------------------------------------
+
+def _task_rows(ids):
+    from task.models import Task
+    from task.serializers import FastTaskSerializer
+
+    return FastTaskSerializer(Task.objects.filter(id__in=ids), expand=TASK_EXPAND).data
+
+
+def _commit_rows(ids):
+    from task_commit.models import TaskCommit
+    from task_commit.serializers import FastTaskCommitListSerializer
+
+    return FastTaskCommitListSerializer(TaskCommit.objects.filter(id__in=ids), expand=COMMIT_EXPAND).data
+
+
+def _join_request_rows(ids):
+    from joinrequest.models import JoinRequest
+    from joinrequest.serializers import FastJoindtSerializer
+
+    return FastJoindtSerializer(JoinRequest.objects.filter(id__in=ids), expand=JOIN_REQUEST_EXPAND).data
+
+
+# event type prefix -> (payload key, loader of rows by id)
+HYDRATED = {
+    "task": ("task", _task_rows),
+    "commit": ("commit", _commit_rows),
+    "join_request": ("join_request", _join_request_rows),
+}
+
+
+def _kind(event_type):
+    """'join_request_updated' -> ('join_request', 'updated')."""
+    kind, _, action = event_type.rpartition("_")
+    return kind, action
+
+
+def coalesce(events):
+    """
+    Collapse (group, event) pairs that refer to the same object, keeping
+    the last one at its position; an object created and then updated in
+    the same batch is still announced as created.
+    """
+    last, created = {}, set()
+    for position, (group, event) in enumerate(events):
+        kind, action = _kind(event["type"])
+        if kind not in HYDRATED:
+            last[position] = position
+            continue
+        key = (group, kind, event["id"])
+        if action == "created":
+            created.add(key)
+        last[key] = position
+    keep = sorted(last.values())
+    result = []
+    for position in keep:
+        group, event = events[position]
+        kind, action = _kind(event["type"])
+        if kind in HYDRATED and action == "updated" and (group, kind, event["id"]) in created:
+            event = {**event, "type": f"{kind}_created"}
+        result.append((group, event))
+    return result
+
+
+def hydrate(events):
+    """
+    Replace the ids in created/updated events with the current rows, one
+    query per kind. Events whose row is gone are dropped: the delete
+    event that removed it is in the outbox as well.
+    """
+    wanted = {}
+    for _, event in events:
+        kind, action = _kind(event["type"])
+        if kind in HYDRATED and action != "deleted":
+            wanted.setdefault(kind, set()).add(event["id"])
+    rows = {
+        kind: {row["id"]: row for row in HYDRATED[kind][1](ids)}
+        for kind, ids in wanted.items()
+    }
+    result = []
+    for group, event in events:
+        kind, action = _kind(event["type"])
+        if kind in HYDRATED and action != "deleted":
+            row = rows[kind].get(event["id"])
+            if row is None:
+                continue
+            event = {key: value for key, value in event.items() if key != "id"}
+            event[HYDRATED[kind][0]] = row
+        result.append((group, event))
+    return result
@@ -0,0 +1,17 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+from project.outbox import BATCH_SIZE, POLL_INTERVAL, run
+
+
+class Command(BaseCommand):
+    help = "Publish outbox events (task/commit/join request/membership changes) to the channel layer."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL, help="Seconds between polls when idle")
+        parser.add_argument("--once", action="store_true", help="Drain what is there and exit")
+
+    def handle(self, *args, **options):
+        asyncio.run(run(options["batch_size"], options["poll_interval"], options["once"]))
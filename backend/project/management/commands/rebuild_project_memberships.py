@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from project.access import rebuild_memberships
+
+
+class Command(BaseCommand):
+    help = "Recreate the project membership index from project owners and contributors."
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_memberships()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {rebuilt} memberships"))
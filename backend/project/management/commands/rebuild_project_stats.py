@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from project.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized per-project task/commit/contributor counters."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--project", type=int, action="append", help="Only this project id (repeatable)")
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_stats(options["project"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {rebuilt} projects"))
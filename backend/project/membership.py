@@ -0,0 +1,93 @@
+"""
+Set-based contributor changes across many projects at once.
+
+All operations are resolved against three reads (projects, users,
+existing memberships), applied in order in memory, and written as one
+bulk insert and one delete on the through table inside a transaction.
+A single membership_changed signal then covers the whole batch.
+"""
+from django.db import transaction
+from django.db.models import Q
+
+from user.models import CustomUser
+from .models import Project
+from .signals import membership_changed
+
+ADD = "add"
+REMOVE = "remove"
+ACTIONS = (ADD, REMOVE)
+
+# per (operation, user) outcomes
+ADDED = "added"
+ALREADY_MEMBER = "already_member"
+REMOVED = "removed"
+NOT_MEMBER = "not_member"
+USER_NOT_FOUND = "user_not_found"
+PROJECT_NOT_FOUND = "project_not_found"
+PERMISSION_DENIED = "permission_denied"
+
+INSERT_BATCH_SIZE = 500
+
+
+def apply_membership_operations(operations, owner=None):
+    """
+    ``operations`` is a sequence of (action, project_id, user_ids). With
+    ``owner`` set, only projects created by that user may be changed.
+
+    Returns one result dict per (operation, user), in input order.
+    """
+    Through = Project.contributors.through
+    project_ids = {project_id for _, project_id, _ in operations}
+    user_ids = {user_id for _, _, users in operations for user_id in users}
+
+    owners = dict(Project.objects.filter(id__in=project_ids).values_list("id", "created_by_id"))
+    known_users = set(CustomUser.objects.filter(id__in=user_ids).values_list("id", flat=True))
+    before = set(
+        Through.objects.filter(project_id__in=list(owners), customuser_id__in=known_users)
+        .values_list("project_id", "customuser_id")
+    )
+
+    members = set(before)
+    results = []
+    for action, project_id, users in operations:
+        for user_id in users:
+            result = {"action": action, "project_id": project_id, "user_id": user_id}
+            pair = (project_id, user_id)
+            if project_id not in owners:
+                result["status"] = PROJECT_NOT_FOUND
+            elif owner is not None and owners[project_id] != owner.pk:
+                result["status"] = PERMISSION_DENIED
+            elif user_id not in known_users:
+                result["status"] = USER_NOT_FOUND
+            elif action == ADD:
+                result["status"] = ALREADY_MEMBER if pair in members else ADDED
+                members.add(pair)
+            else:
+                result["status"] = REMOVED if pair in members else NOT_MEMBER
+                members.discard(pair)
+            results.append(result)
+
+    added = members - before
+    removed = before - members
+    if added or removed:
+        with transaction.atomic():
+            Through.objects.bulk_create(
+                [Through(project_id=p, customuser_id=u) for p, u in added],
+                batch_size=INSERT_BATCH_SIZE, ignore_conflicts=True,
+            )
+            if removed:
+                by_project = {}
+                for project_id, user_id in removed:
+                    by_project.setdefault(project_id, []).append(user_id)
+                condition = Q()
+                for project_id, users in by_project.items():
+                    condition |= Q(project_id=project_id, customuser_id__in=users)
+                Through.objects.filter(condition).delete()
+
+            changed = added | removed
+            membership_changed.send(
+                sender=Project,
+                project_ids={p for p, _ in changed},
+                user_ids={u for _, u in changed},
+            )
+    return results
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0004_alter_project_contributors'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectStats',
+            fields=[
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='project.project')),
+                ('task_count', models.IntegerField(default=0)),
+                ('pending_tasks', models.IntegerField(default=0)),
+                ('in_progress_tasks', models.IntegerField(default=0)),
+                ('completed_tasks', models.IntegerField(default=0)),
+                ('low_priority_tasks', models.IntegerField(default=0)),
+                ('medium_priority_tasks', models.IntegerField(default=0)),
+                ('high_priority_tasks', models.IntegerField(default=0)),
+                ('contributor_count', models.IntegerField(default=0)),
+                ('commit_count', models.IntegerField(default=0)),
+                ('successful_commit_count', models.IntegerField(default=0)),
+                ('last_activity_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
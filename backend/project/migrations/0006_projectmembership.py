@@ -0,0 +1,44 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill(apps, schema_editor):
+    Project = apps.get_model('project', 'Project')
+    ProjectMembership = apps.get_model('project', 'ProjectMembership')
+    roles = {
+        pair: 'contributor'
+        for pair in Project.contributors.through.objects.values_list('project_id', 'customuser_id')
+    }
+    for pair in Project.objects.values_list('id', 'created_by_id'):
+        roles[pair] = 'owner'
+    ProjectMembership.objects.bulk_create(
+        [ProjectMembership(project_id=p, user_id=u, role=role) for (p, u), role in roles.items()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0005_projectstats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('owner', 'Owner'), ('contributor', 'Contributor')], max_length=20)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='project.project')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='project_memberships', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'project'), name='project_membership_user_project')],
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,11 @@
 from django.db import models
 from django.conf import settings
 
+from backend.tracking import LoadedValuesMixin
+
 User = settings.AUTH_USER_MODEL
 
-class Project(models.Model):
+class Project(LoadedValuesMixin, models.Model):
     name = models.CharField(max_length=255 , unique=True , default="New Project")
     description = models.TextField(blank=True, null=True)
     repo_url = models.URLField(max_length=500, default="https://github.com/example/repo")
@@ -17,3 +19,64 @@ class Project(models.Model):
     
 
 
+
+class ProjectStats(models.Model):
+    """
+    Denormalized counters for project headers, kept up to date by
+    project.stats on Task/TaskCommit/membership writes. Rebuild with
+    `manage.py rebuild_project_stats` if they ever drift.
+    """
+    project = models.OneToOneField(Project, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    task_count = models.IntegerField(default=0)
+    pending_tasks = models.IntegerField(default=0)
+    in_progress_tasks = models.IntegerField(default=0)
+    completed_tasks = models.IntegerField(default=0)
+    low_priority_tasks = models.IntegerField(default=0)
+    medium_priority_tasks = models.IntegerField(default=0)
+    high_priority_tasks = models.IntegerField(default=0)
+    contributor_count = models.IntegerField(default=0)
+    commit_count = models.IntegerField(default=0)
+    successful_commit_count = models.IntegerField(default=0)
+    last_activity_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"stats for project {self.project_id}"
+
+
+class ProjectMembership(models.Model):
+    """
+    One row per (user, project) the user can access, owners included.
+    A denormalized index over created_by + contributors maintained by
+    project.access; the unique (user, project) index answers both "is
+    this user a member" and "which projects is this user in".
+    """
+    OWNER = 'owner'
+    CONTRIBUTOR = 'contributor'
+    ROLE_CHOICES = [(OWNER, 'Owner'), (CONTRIBUTOR, 'Contributor')]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='project_memberships')
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='memberships')
+    role = models.CharField(max_length=20, choices=ROLE_CHOICES)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'project'], name='project_membership_user_project'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.role} of project {self.project_id}"
+
+
+class OutboxEvent(models.Model):
+    """
+    A live event waiting to be published, written in the transaction of
+    the change it describes (see project.events) and deleted once
+    `manage.py dispatch_outbox` has handed it to the channel layer.
+    """
+    stream = models.CharField(max_length=20)
+    group = models.CharField(max_length=100)
+    event = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.event.get('type')} -> {self.group}"
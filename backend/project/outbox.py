@@ -0,0 +1,82 @@
+"""
+Draining the outbox into the channel layer.
+
+Each pass reads a batch of events in id order, coalesces repeats of the
+same object, hydrates the rows (one query per kind) and sends one
+channel-layer message per group carrying all of that group's events.
+Rows are deleted only after their messages were sent, so a crash in
+between re-sends them: delivery is at-least-once and clients apply
+events idempotently (by id). Run a single dispatcher per database.
+
+Only the rows that were read are deleted, never "everything up to the
+last id": ids are assigned before commit, so a transaction holding a
+lower id can commit after a batch was read, and its row must survive to
+go out with the next batch (possibly after newer events).
+"""
+import asyncio
+import logging
+
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+from . import events
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = getattr(settings, "OUTBOX_BATCH_SIZE", 500)
+POLL_INTERVAL = getattr(settings, "OUTBOX_POLL_INTERVAL", 0.2)
+MAX_BACKOFF = 30
+
+
+def read_batch(limit):
+    return list(OutboxEvent.objects.order_by("id").values_list("id", "stream", "group", "event")[:limit])
+
+
+def build_messages(rows):
+    """{group: channel-layer message} for a batch of outbox rows."""
+    streams = {group: stream for _, stream, group, _ in rows}
+    pending = events.hydrate(events.coalesce([(group, event) for _, _, group, event in rows]))
+    messages = {}
+    for group, event in pending:
+        message = messages.setdefault(group, {"type": "outbox_events", "stream": streams[group], "events": []})
+        message["events"].append(event)
+    return messages
+
+
+def delete_rows(ids):
+    OutboxEvent.objects.filter(id__in=ids).delete()
+
+
+async def dispatch_batch(layer, limit=BATCH_SIZE):
+    """Publish up to ``limit`` events; returns how many rows were drained."""
+    rows = await database_sync_to_async(read_batch)(limit)
+    if not rows:
+        return 0
+    messages = await database_sync_to_async(build_messages)(rows)
+    for group, message in messages.items():
+        await layer.group_send(group, message)
+    await database_sync_to_async(delete_rows)([row[0] for row in rows])
+    return len(rows)
+
+
+async def run(batch_size=BATCH_SIZE, poll_interval=POLL_INTERVAL, once=False):
+    """Drain continuously; with ``once``, stop when the outbox is empty."""
+    layer = get_channel_layer()
+    backoff = poll_interval
+    while True:
+        try:
+            drained = await dispatch_batch(layer, batch_size)
+        except Exception:
+            if once:
+                raise
+            logger.exception("outbox dispatch failed; retrying in %.1fs", backoff)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, MAX_BACKOFF)
+            continue
+        backoff = poll_interval
+        if drained < batch_size:
+            if once:
+                return
+            await asyncio.sleep(poll_interval)
@@ -0,0 +1,21 @@
+from rest_framework.permissions import BasePermission
+
+from .access import is_member
+
+
+class IsProjectMember(BasePermission):
+    """
+    Allows requests naming a project (``?project_id=``, or the view's
+    ``project_id_param``) only for its owner and contributors. Requests
+    without one are left to the view to reject.
+
+    Checked against the membership index: a cache hit per request, one
+    indexed query on a miss.
+    """
+    message = "You do not have access to this project"
+
+    def has_permission(self, request, view):
+        project_id = request.query_params.get(getattr(view, "project_id_param", "project_id"))
+        if not project_id:
+            return True
+        return bool(request.user and request.user.is_authenticated) and is_member(request.user.pk, project_id)
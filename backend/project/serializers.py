@@ -1,10 +1,11 @@
 from rest_framework import serializers
-from .models import Project
+from .models import Project, ProjectStats
 from user.models import CustomUser
-from user.serializers import Userserializer
-class ProjectSerializer(serializers.ModelSerializer):
-    # Show contributors
-    contributors = Userserializer(read_only=True, many=True)
+from user.serializers import usserprofileSerializer
+from backend.flexfields import FlexFieldsMixin
+from backend.fastserializers import FastSerializer
+class ProjectSerializer(FlexFieldsMixin, serializers.ModelSerializer):
+    # created_by and contributors are ids unless expanded (?expand=...)
 
     # Write-only contributor IDs
     contributor_ids = serializers.PrimaryKeyRelatedField(
@@ -15,9 +16,6 @@ class ProjectSerializer(serializers.ModelSerializer):
         default=[]
     )
 
-    # Show created_by (read-only)
-    created_by = Userserializer(read_only=True)
-
     class Meta:
         model = Project
         fields = [
@@ -31,6 +29,11 @@ class ProjectSerializer(serializers.ModelSerializer):
             'created_at',
             'updated_at',
         ]
+        read_only_fields = ['created_by', 'contributors']
+        expandable = {
+            'created_by': usserprofileSerializer,
+            'contributors': usserprofileSerializer,
+        }
 
     def create(self, validated_data):
         contributor_ids = validated_data.pop('contributor_ids', [])
@@ -45,3 +48,13 @@ class ProjectSerializer(serializers.ModelSerializer):
         if contributor_ids is not None:
             instance.contributors.set(contributor_ids)
         return instance
+
+
+class FastProjectSerializer(FastSerializer):
+    serializer_class = ProjectSerializer
+
+
+class ProjectStatsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ProjectStats
+        exclude = ['project']
@@ -0,0 +1,150 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import Signal, receiver
+
+from joinrequest.models import JoinRequest
+from task.models import Task
+from task.signals import tasks_updated
+from task_commit.models import TaskCommit
+from task_commit.signals import commits_upserted
+from user.models import CustomUser
+from .models import Project, ProjectMembership, ProjectStats
+from . import access, events, stats
+
+# Sent once per change to project contributors, however it was made
+# (contributors.add/remove/clear on either side, or the bulk membership
+# API), with the sets of affected ``project_ids`` and ``user_ids``.
+membership_changed = Signal()
+
+
+@receiver(post_save, sender=Project)
+def create_stats(sender, instance, created, **kwargs):
+    if created:
+        ProjectStats.objects.get_or_create(project=instance)
+
+
+@receiver(post_save, sender=Task)
+def count_task_save(sender, instance, created, **kwargs):
+    stats.task_changed(instance, created=created)
+
+
+@receiver(post_delete, sender=Task)
+def count_task_delete(sender, instance, **kwargs):
+    stats.task_changed(instance, deleted=True)
+
+
+@receiver(tasks_updated)
+def count_task_bulk_update(sender, tasks, **kwargs):
+    stats.tasks_changed(tasks)
+
+
+@receiver(post_save, sender=TaskCommit)
+def count_commit_save(sender, instance, created, **kwargs):
+    stats.commit_changed(instance, created=created)
+
+
+@receiver(post_delete, sender=TaskCommit)
+def count_commit_delete(sender, instance, **kwargs):
+    stats.commit_changed(instance, deleted=True)
+
+
+@receiver(commits_upserted)
+def count_commit_upsert(sender, created, updated, **kwargs):
+    stats.commits_changed(created, updated)
+
+
+@receiver(m2m_changed, sender=Project.contributors.through)
+def relay_membership_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear":
+        # clear() reports no pk_set: remember what is about to go
+        instance._cleared_ids = set(instance.contributors.values_list("id", flat=True))
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    ids = set(pk_set or ()) if action != "post_clear" else getattr(instance, "_cleared_ids", set())
+    if not ids:
+        return
+    if reverse:
+        # user.contributors.add(project): instance is the user
+        project_ids, user_ids = ids, {instance.pk}
+    else:
+        project_ids, user_ids = {instance.pk}, ids
+    membership_changed.send(sender=Project, project_ids=project_ids, user_ids=user_ids)
+
+
+@receiver(membership_changed)
+def recount_contributors(sender, project_ids, **kwargs):
+    stats.recount_contributors(project_ids)
+
+
+@receiver(post_save, sender=Project)
+def index_owner(sender, instance, created, **kwargs):
+    previous = instance.loaded_values.get("created_by_id")
+    if created or previous != instance.created_by_id:
+        access.sync_memberships([instance.pk])
+
+
+@receiver(membership_changed)
+def index_contributors(sender, project_ids, user_ids, **kwargs):
+    affected = access.sync_memberships(project_ids, user_ids)
+    # readers inside a transaction that rolls back may have cached the
+    # uncommitted rows: drop them again once the outcome is known
+    transaction.on_commit(lambda: access.membership_cache.invalidate(affected))
+
+
+@receiver(pre_delete, sender=Project)
+def forget_project_members(sender, instance, **kwargs):
+    # the index rows go with the project in the cascade
+    access.membership_cache.invalidate(
+        ProjectMembership.objects.filter(project=instance).values_list("user_id", flat=True)
+    )
+
+
+@receiver(post_delete, sender=CustomUser)
+def forget_user(sender, instance, **kwargs):
+    access.membership_cache.invalidate([instance.pk])
+
+
+@receiver(post_save, sender=Task)
+def publish_task_save(sender, instance, created, **kwargs):
+    events.task_saved(instance, created)
+
+
+@receiver(tasks_updated)
+def publish_task_bulk_update(sender, tasks, **kwargs):
+    events.tasks_saved(tasks)
+
+
+@receiver(post_delete, sender=Task)
+def publish_task_delete(sender, instance, **kwargs):
+    events.task_deleted(instance)
+
+
+@receiver(post_save, sender=TaskCommit)
+def publish_commit_save(sender, instance, created, **kwargs):
+    events.commit_saved(instance, created)
+
+
+@receiver(commits_upserted)
+def publish_commit_upsert(sender, created, updated, **kwargs):
+    events.commits_saved(created, updated)
+
+
+@receiver(post_delete, sender=TaskCommit)
+def publish_commit_delete(sender, instance, **kwargs):
+    events.commit_deleted(instance)
+
+
+@receiver(post_save, sender=JoinRequest)
+def publish_join_request_save(sender, instance, created, **kwargs):
+    events.join_request_saved(instance, created)
+
+
+@receiver(post_delete, sender=JoinRequest)
+def publish_join_request_delete(sender, instance, **kwargs):
+    events.join_request_deleted(instance)
+
+
+@receiver(membership_changed)
+def publish_membership_change(sender, project_ids, user_ids, **kwargs):
+    events.membership_changed(project_ids, user_ids)
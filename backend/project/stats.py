@@ -0,0 +1,185 @@
+"""
+Incremental upkeep of ProjectStats.
+
+Writes adjust counters with F() expressions in the same transaction as
+the change that caused them; contributor counts are recounted from the
+(indexed) membership table. Rows are created with their project and
+rebuilt on first read for projects that predate the table.
+"""
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Project, ProjectStats
+
+STATUS_COLUMNS = {
+    "pending": "pending_tasks",
+    "in_progress": "in_progress_tasks",
+    "completed": "completed_tasks",
+}
+PRIORITY_COLUMNS = {
+    "low": "low_priority_tasks",
+    "medium": "medium_priority_tasks",
+    "high": "high_priority_tasks",
+}
+COUNTER_COLUMNS = [
+    "task_count", *STATUS_COLUMNS.values(), *PRIORITY_COLUMNS.values(),
+    "contributor_count", "commit_count", "successful_commit_count",
+]
+
+
+def _task_columns(status, priority):
+    columns = ["task_count"]
+    if status in STATUS_COLUMNS:
+        columns.append(STATUS_COLUMNS[status])
+    if priority in PRIORITY_COLUMNS:
+        columns.append(PRIORITY_COLUMNS[priority])
+    return columns
+
+
+def _commit_columns(is_successful):
+    return ["commit_count", "successful_commit_count"] if is_successful else ["commit_count"]
+
+
+def apply_deltas(deltas, touched=()):
+    """Add {project_id: Counter(column: n)} and mark those projects active."""
+    now = timezone.now()
+    for project_id in set(deltas) | set(touched):
+        changes = {column: F(column) + n for column, n in deltas.get(project_id, {}).items() if n}
+        ProjectStats.objects.filter(project_id=project_id).update(last_activity_at=now, **changes)
+
+
+def _diff(instance, created, deleted, key, columns):
+    """
+    Counter deltas between what ``instance`` was loaded with and what it
+    is now; ``key`` extracts (project_id, *column args) from a values dict.
+    """
+    deltas = defaultdict(Counter)
+    previous = instance.loaded_values
+    current = {field.attname: getattr(instance, field.attname) for field in instance._meta.concrete_fields}
+    touched = [] if deleted else [key(current)[0]]
+    if deleted:
+        before, after = previous or current, None
+    elif created:
+        before, after = None, current
+    elif previous:
+        before, after = previous, current
+    else:
+        # saved without having been loaded: the old row is unknown
+        return deltas, touched
+    for values, sign in ((before, -1), (after, 1)):
+        if values is not None:
+            project_id, *args = key(values)
+            for column in columns(*args):
+                deltas[project_id][column] += sign
+    return deltas, touched
+
+
+def _task_key(values):
+    return values["project_id_id"], values["status"], values["priority"]
+
+
+def task_changed(instance, created=False, deleted=False):
+    deltas, touched = _diff(instance, created, deleted, key=_task_key, columns=_task_columns)
+    apply_deltas(deltas, touched)
+
+
+def tasks_changed(instances):
+    """task_changed for a bulk update, with one UPDATE per project."""
+    deltas, touched = defaultdict(Counter), set()
+    for instance in instances:
+        task_deltas, task_touched = _diff(instance, False, False, key=_task_key, columns=_task_columns)
+        for project_id, counter in task_deltas.items():
+            deltas[project_id].update(counter)
+        touched.update(task_touched)
+    apply_deltas(deltas, touched)
+
+
+def _commit_key(values):
+    return values["project_id_id"], values["is_successful"]
+
+
+def commit_changed(instance, created=False, deleted=False):
+    deltas, touched = _diff(instance, created, deleted, key=_commit_key, columns=_commit_columns)
+    apply_deltas(deltas, touched)
+
+
+def commits_changed(created, updated):
+    """commit_changed for a batch ingestion, with one UPDATE per project."""
+    deltas, touched = defaultdict(Counter), set()
+    for instances, is_new in ((created, True), (updated, False)):
+        for instance in instances:
+            commit_deltas, commit_touched = _diff(instance, is_new, False, key=_commit_key, columns=_commit_columns)
+            for project_id, counter in commit_deltas.items():
+                deltas[project_id].update(counter)
+            touched.update(commit_touched)
+    apply_deltas(deltas, touched)
+
+
+def recount_contributors(project_ids):
+    memberships = Project.contributors.through.objects.filter(
+        project_id=OuterRef("project_id")
+    ).order_by().values("project_id").annotate(n=Count("*")).values("n")
+    ProjectStats.objects.filter(project_id__in=list(project_ids)).update(
+        contributor_count=Coalesce(Subquery(memberships), 0),
+        last_activity_at=timezone.now(),
+    )
+
+
+def rebuild_stats(project_ids=None):
+    """Recompute stats from scratch with grouped aggregates; returns the row count."""
+    from task.models import Task
+    from task_commit.models import TaskCommit
+
+    projects = Project.objects.all()
+    tasks = Task.objects.all()
+    commits = TaskCommit.objects.all()
+    memberships = Project.contributors.through.objects.all()
+    if project_ids is not None:
+        project_ids = list(project_ids)
+        projects = projects.filter(id__in=project_ids)
+        tasks = tasks.filter(project_id__in=project_ids)
+        commits = commits.filter(project_id__in=project_ids)
+        memberships = memberships.filter(project_id__in=project_ids)
+
+    rows = {
+        project_id: ProjectStats(project_id=project_id, last_activity_at=updated_at)
+        for project_id, updated_at in projects.values_list("id", "updated_at")
+    }
+
+    def touch(row, at):
+        if at is not None and (row.last_activity_at is None or at > row.last_activity_at):
+            row.last_activity_at = at
+
+    for project_id, status, priority, n, last in tasks.order_by().values_list(
+        "project_id", "status", "priority"
+    ).annotate(Count("id"), Max("updated_at")):
+        row = rows[project_id]
+        for column in _task_columns(status, priority):
+            setattr(row, column, getattr(row, column) + n)
+        touch(row, last)
+    for project_id, is_successful, n, last in commits.order_by().values_list(
+        "project_id", "is_successful"
+    ).annotate(Count("id"), Max("created_at")):
+        row = rows[project_id]
+        for column in _commit_columns(is_successful):
+            setattr(row, column, getattr(row, column) + n)
+        touch(row, last)
+    for project_id, n in memberships.order_by().values_list("project_id").annotate(Count("id")):
+        rows[project_id].contributor_count = n
+
+    ProjectStats.objects.bulk_create(
+        rows.values(), batch_size=500, update_conflicts=True,
+        unique_fields=["project"], update_fields=COUNTER_COLUMNS + ["last_activity_at"],
+    )
+    return len(rows)
+
+
+def stats_for(project_id):
+    """The project's stats row (a single-row read), built on first use."""
+    stats = ProjectStats.objects.filter(project_id=project_id).first()
+    if stats is None and rebuild_stats([project_id]):
+        stats = ProjectStats.objects.filter(project_id=project_id).first()
+    return stats
@@ -1,3 +1,299 @@
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from task.models import Task
+from task_commit.models import TaskCommit
+from user.models import CustomUser
+from .access import is_member, membership_cache, project_ids_for, rebuild_memberships
+from .models import Project, ProjectMembership, ProjectStats
+from .signals import membership_changed
+from .stats import COUNTER_COLUMNS, rebuild_stats
+
+
+class ProjectStatsTests(TestCase):
+    def setUp(self):
+        self.owner = CustomUser.objects.create_user(email="owner@example.com", github_username="owner")
+        self.devs = [
+            CustomUser.objects.create_user(email=f"dev{i}@example.com", github_username=f"dev{i}")
+            for i in range(3)
+        ]
+        self.project = Project.objects.create(name="stats", created_by=self.owner)
+
+    def counters(self):
+        stats = ProjectStats.objects.get(project=self.project)
+        return {column: getattr(stats, column) for column in COUNTER_COLUMNS}
+
+    def assert_matches_rebuild(self):
+        incremental = self.counters()
+        rebuild_stats([self.project.id])
+        self.assertEqual(incremental, self.counters())
+        return incremental
+
+    def add_task(self, **kwargs):
+        kwargs.setdefault("title", "t")
+        kwargs.setdefault("branch_name", "b")
+        return Task.objects.create(project_id=self.project, created_by=self.owner, **kwargs)
+
+    def test_task_writes_adjust_counters(self):
+        first = self.add_task(priority="high")
+        self.add_task()
+        self.add_task(status="completed", priority="low")
+
+        task = Task.objects.get(pk=first.pk)
+        task.status = "in_progress"
+        task.priority = "low"
+        task.save()
+        Task.objects.get(status="completed").delete()
+
+        counters = self.assert_matches_rebuild()
+        self.assertEqual(counters["task_count"], 2)
+        self.assertEqual(counters["pending_tasks"], 1)
+        self.assertEqual(counters["in_progress_tasks"], 1)
+        self.assertEqual(counters["completed_tasks"], 0)
+        self.assertEqual(counters["low_priority_tasks"], 1)
+        self.assertEqual(counters["high_priority_tasks"], 0)
+
+    def test_commit_and_membership_writes_adjust_counters(self):
+        task = self.add_task()
+        commits = [
+            TaskCommit.objects.create(
+                github_task=task, project_id=self.project, completed_by=self.owner,
+                commit_id=f"c{i}", message="m",
+            )
+            for i in range(3)
+        ]
+        commits[0].is_successful = True
+        commits[0].save()
+        commits[1].delete()
+
+        self.project.contributors.add(*self.devs)
+        self.project.contributors.remove(self.devs[0])
+        self.devs[1].contributors.clear()
+
+        counters = self.assert_matches_rebuild()
+        self.assertEqual(counters["commit_count"], 2)
+        self.assertEqual(counters["successful_commit_count"], 1)
+        self.assertEqual(counters["contributor_count"], 1)
+
+    def test_rebuild_command_restores_missing_rows(self):
+        self.add_task()
+        ProjectStats.objects.all().delete()
+        call_command("rebuild_project_stats", stdout=open("/dev/null", "w"))
+        self.assertEqual(self.counters()["task_count"], 1)
+
+
+class ProjectDetailTests(TestCase):
+    def setUp(self):
+        membership_cache.clear()
+        self.owner = CustomUser.objects.create_user(email="owner@example.com", github_username="owner")
+        self.project = Project.objects.create(name="detail", created_by=self.owner)
+        for i in range(5):
+            Task.objects.create(
+                project_id=self.project, title=f"task {i}", branch_name=f"b{i}", created_by=self.owner,
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def get(self, **params):
+        return self.client.get("/api/project/project_setup/", {"id": self.project.id, **params})
+
+    def test_summary_reads_the_stats_row_instead_of_tasks(self):
+        self.get(summary=1)  # warms the membership cache
+        # the project row and the stats row (contributors are counted there)
+        with self.assertNumQueries(2):
+            res = self.get(summary=1, fields="id,name,description")
+        self.assertEqual(res.status_code, 200)
+        self.assertNotIn("tasks", res.data)
+        self.assertEqual(res.data["project"]["name"], "detail")
+        self.assertEqual(res.data["stats"]["task_count"], 5)
+        self.assertEqual(res.data["stats"]["pending_tasks"], 5)
+
+    def test_paginated_tasks(self):
+        res = self.get(page=2, page_size=2)
+        self.assertEqual([t["title"] for t in res.data["tasks"]], ["task 2", "task 3"])
+        self.assertEqual(res.data["tasks_page"], {"page": 2, "page_size": 2, "has_more": True, "total": 5})
+
+        res = self.get(page=3, page_size=2)
+        self.assertEqual(len(res.data["tasks"]), 1)
+        self.assertFalse(res.data["tasks_page"]["has_more"])
+
+        self.assertEqual(self.get(page="x").status_code, 400)
+        self.assertEqual(len(self.get().data["tasks"]), 5)
+
+
+class BulkMembershipTests(TestCase):
+    def setUp(self):
+        membership_cache.clear()
+        self.owner = CustomUser.objects.create_user(email="owner@example.com", github_username="owner")
+        self.stranger = CustomUser.objects.create_user(email="stranger@example.com")
+        self.projects = [Project.objects.create(name=f"org {i}", created_by=self.owner) for i in range(2)]
+        self.foreign = Project.objects.create(name="foreign", created_by=self.stranger)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def make_users(self, count, start=0):
+        return CustomUser.objects.bulk_create([
+            CustomUser(email=f"member{i}@example.com") for i in range(start, start + count)
+        ])
+
+    def post(self, operations):
+        return self.client.post("/api/project/memberships/", {"operations": operations}, format="json")
+
+    def onboard(self, users):
+        return self.post([
+            {"action": "add", "project_id": project.id, "user_ids": [u.id for u in users]}
+            for project in self.projects
+        ])
+
+    def test_statement_count_does_not_grow_with_users(self):
+        few, many = self.make_users(10), self.make_users(500, start=10)
+        with CaptureQueriesContext(connection) as small:
+            self.onboard(few)
+        with CaptureQueriesContext(connection) as large:
+            res = self.onboard(many)
+        self.assertEqual(res.data["added"], 1000)
+        # only the INSERT batches (contributors table, membership index
+        # and outbox) grow with the number of rows
+        reads = lambda ctx: [q for q in ctx.captured_queries if not q["sql"].startswith("INSERT")]
+        self.assertEqual(len(reads(large)), len(reads(small)))
+        self.assertLessEqual(len(large) - len(reads(large)), 10)
+        for project in self.projects:
+            self.assertEqual(project.contributors.count(), 510)
+            self.assertEqual(ProjectStats.objects.get(project=project).contributor_count, 510)
+
+    def test_per_item_results_and_single_event(self):
+        alice, bob = self.make_users(2)
+        self.projects[0].contributors.add(bob)
+        events = []
+        membership_changed.connect(lambda **kwargs: events.append(kwargs), weak=False, dispatch_uid="test")
+        self.addCleanup(membership_changed.disconnect, dispatch_uid="test")
+
+        res = self.post([
+            {"action": "add", "project_id": self.projects[0].id, "user_ids": [alice.id, bob.id, 999999]},
+            {"action": "remove", "project_id": self.projects[0].id, "user_ids": [bob.id]},
+            {"action": "remove", "project_id": self.projects[1].id, "user_ids": [alice.id]},
+            {"action": "add", "project_id": self.foreign.id, "user_ids": [alice.id]},
+            {"action": "add", "project_id": 999999, "user_ids": [alice.id]},
+        ])
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual([r["status"] for r in res.data["results"]], [
+            "added", "already_member", "user_not_found", "removed", "not_member",
+            "permission_denied", "project_not_found",
+        ])
+        self.assertEqual(list(self.projects[0].contributors.all()), [alice])
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]["project_ids"], {self.projects[0].id})
+        self.assertEqual(events[0]["user_ids"], {alice.id, bob.id})
+
+    def test_invalid_payloads(self):
+        self.assertEqual(self.post([]).status_code, 400)
+        self.assertEqual(self.post([{"action": "promote", "project_id": 1, "user_ids": [1]}]).status_code, 400)
+        self.assertEqual(self.post([{"action": "add", "project_id": 1, "user_ids": ["one"]}]).status_code, 400)
+        self.assertEqual(self.post([{"action": "add", "project_id": 1, "user_ids": [True]}]).status_code, 400)
+
+    def test_single_project_views_keep_their_responses(self):
+        alice, bob = self.make_users(2)
+        url = f"/api/project/add_contributors/?project_id={self.projects[0].id}"
+        res = self.client.post(url, {"user_ids": [alice.id, bob.id]}, format="json")
+        self.assertEqual(res.data, {"message": "2 contributors added successfully"})
+        res = self.client.post(url, {"user_ids": [alice.id]}, format="json")
+        self.assertEqual(res.data, {"message": "All users are already contributors"})
+        res = self.client.post(url, {"user_ids": [999999]}, format="json")
+        self.assertEqual(res.status_code, 400)
+
+        url = f"/api/project/remove_contributors/?project_id={self.projects[0].id}"
+        res = self.client.post(url, {"user_ids": [alice.id]}, format="json")
+        self.assertEqual(res.data, {"message": "1 contributors removed successfully"})
+        res = self.client.post(url, {"user_ids": [alice.id]}, format="json")
+        self.assertEqual(res.data, {"message": "No matching contributors found to remove"})
+
+    def test_single_project_views_take_digit_strings_and_need_the_owner(self):
+        alice, bob = self.make_users(2)
+        url = f"/api/project/add_contributors/?project_id={self.projects[0].id}"
+        res = self.client.post(url, {"user_ids": [str(alice.id), bob.id]}, format="json")
+        self.assertEqual(res.data, {"message": "2 contributors added successfully"})
+        self.assertEqual(self.client.post(url, {"user_ids": ["1.5"]}, format="json").status_code, 400)
+
+        self.client.force_authenticate(self.stranger)
+        for action in ("add", "remove"):
+            res = self.client.post(
+                f"/api/project/{action}_contributors/?project_id={self.projects[0].id}",
+                {"user_ids": [str(alice.id)]}, format="json",
+            )
+            self.assertEqual(res.status_code, 403, action)
+        self.assertEqual(self.projects[0].contributors.count(), 2)
+
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.post(url, {"user_ids": [alice.id]}, format="json").status_code, 401)
+
+
+class MembershipIndexTests(TestCase):
+    def setUp(self):
+        membership_cache.clear()
+        self.owner = CustomUser.objects.create_user(email="owner@example.com", github_username="owner")
+        self.dev = CustomUser.objects.create_user(email="dev@example.com")
+        self.stranger = CustomUser.objects.create_user(email="stranger@example.com")
+        self.project = Project.objects.create(name="index", created_by=self.owner)
+
+    def index(self):
+        return set(ProjectMembership.objects.values_list("project_id", "user_id", "role"))
+
+    def test_index_follows_owner_and_contributors(self):
+        p = self.project.id
+        self.assertEqual(self.index(), {(p, self.owner.id, "owner")})
+
+        self.project.contributors.add(self.dev, self.owner)
+        self.assertEqual(self.index(), {(p, self.owner.id, "owner"), (p, self.dev.id, "contributor")})
+
+        self.project.created_by = self.dev
+        self.project.save()
+        self.assertEqual(self.index(), {(p, self.owner.id, "contributor"), (p, self.dev.id, "owner")})
+
+        self.project.contributors.clear()
+        self.assertEqual(self.index(), {(p, self.dev.id, "owner")})
+
+        self.stranger.contributors.add(self.project)
+        self.assertIn((p, self.stranger.id, "contributor"), self.index())
+
+        self.project.delete()
+        self.assertEqual(self.index(), set())
+
+    def test_rebuild_matches_incremental_upkeep(self):
+        other = Project.objects.create(name="other", created_by=self.dev)
+        other.contributors.add(self.owner, self.stranger)
+        self.project.contributors.add(self.dev)
+        incremental = self.index()
+        ProjectMembership.objects.all().delete()
+        self.assertEqual(rebuild_memberships(), len(incremental))
+        self.assertEqual(self.index(), incremental)
+
+    def test_checks_hit_the_cache(self):
+        with self.assertNumQueries(1):
+            self.assertTrue(is_member(self.owner.id, self.project.id))
+            self.assertTrue(is_member(self.owner.id, str(self.project.id)))
+            self.assertFalse(is_member(self.owner.id, "x"))
+        self.assertFalse(is_member(self.dev.id, self.project.id))
+
+        self.project.contributors.add(self.dev)
+        self.assertTrue(is_member(self.dev.id, self.project.id))
+        self.project.contributors.remove(self.dev)
+        self.assertEqual(project_ids_for(self.dev.id), frozenset())
+
+    def test_endpoints_require_membership(self):
+        self.project.contributors.add(self.dev)
+        urls = [
+            ("/api/project/project_setup/", {"id": self.project.id}),
+            ("/api/tasks/create_task/", {"project_id": self.project.id}),
+            ("/api/task_commit/commit_task/", {"project_id": self.project.id}),
+            ("/api/chat/chatapp_home/", {"project_id": self.project.id}),
+        ]
+        client = APIClient()
+        for user, expected in ((self.owner, 200), (self.dev, 200), (self.stranger, 403)):
+            client.force_authenticate(user)
+            for url, params in urls:
+                self.assertEqual(client.get(url, params).status_code, expected, (url, user.email))
+        client.force_authenticate(None)
+        self.assertEqual(client.get(*urls[0]).status_code, 401)
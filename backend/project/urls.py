@@ -4,4 +4,5 @@ urlpatterns = [
     path('project_setup/', ProjectListCreateView.as_view(), name='project_list_create'),
     path('add_contributors/', AddContributorsView.as_view(), name='add_contributors'),
     path('remove_contributors/', RemoveContributorsView.as_view(), name='remove_contributors'),
+    path('memberships/', BulkMembershipView.as_view(), name='bulk_memberships'),
 ]
@@ -2,10 +2,16 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from .models import Project
-from .serializers import ProjectSerializer
+from .permissions import IsProjectMember
+from .serializers import FastProjectSerializer, ProjectSerializer, ProjectStatsSerializer
+from .stats import stats_for
+from .membership import (
+    ACTIONS, ADD, ADDED, REMOVE, REMOVED, USER_NOT_FOUND, apply_membership_operations,
+)
 from user.models import CustomUser as User
 from task.models import Task
-from task.serializers import TaskwithuserSerializer
+from task.serializers import FastTaskSerializer
+from backend.flexfields import flex_params
 from rest_framework.permissions import IsAuthenticated
 
 from rest_framework.views import APIView
@@ -16,25 +22,89 @@ from .models import Project
 from task.models import Task
 from .serializers import ProjectSerializer
 
+TASK_PAGE_SIZE = 50
+MAX_TASK_PAGE_SIZE = 200
+MAX_MEMBERSHIP_CHANGES = 5000
+
+
+def _id(item):
+    """An integer id from an int or a string of digits, or None."""
+    if isinstance(item, int) and not isinstance(item, bool):
+        return item
+    if isinstance(item, str) and item.isascii() and item.isdigit():
+        return int(item)
+    return None
+
+
+def _id_list(value):
+    """A non-empty list of integer ids (digit strings accepted), or None."""
+    if not value or not isinstance(value, list):
+        return None
+    ids = [_id(item) for item in value]
+    if None in ids:
+        return None
+    return ids
+
+
+def _owned_project(request, project_id):
+    """None if the caller owns ``project_id``, else the error Response."""
+    owner_id = Project.objects.filter(pk=project_id).values_list('created_by_id', flat=True).first()
+    if owner_id is None:
+        return Response({"error": "Project not found"}, status=status.HTTP_404_NOT_FOUND)
+    if owner_id != request.user.id:
+        return Response({"error": "Only the project owner can change its contributors"}, status=status.HTTP_403_FORBIDDEN)
+    return None
+
+
 class ProjectListCreateView(APIView):
-    permission_classes = [IsAuthenticated]   # <-- move here
+    permission_classes = [IsAuthenticated, IsProjectMember]
+    project_id_param = 'id'
 
     def get(self, request):
+        """
+        A project and its tasks. Related users are ids unless expanded;
+        ?fields= and ?expand= apply to both the project and the tasks,
+        e.g. ?expand=created_by,contributors,assigned_to.
+
+        ?summary=1 returns the project with its counters ("stats") and no
+        tasks. ?page=N (&page_size=M) returns one page of tasks, by id.
+        """
         project_id = request.query_params.get('id')
         if not project_id:
             return Response({"error": "Project_id parameter is required"}, status=status.HTTP_400_BAD_REQUEST)
-        try:
-            project = Project.objects.get(pk=project_id)
-        except Project.DoesNotExist:
+        params = flex_params(request)
+        projects = FastProjectSerializer(Project.objects.filter(pk=project_id), **params).data
+        if not projects:
             return Response({"error": "Project not found"}, status=status.HTTP_404_NOT_FOUND)
-        
-        serializer = ProjectSerializer(project)
-        tasks = Task.objects.filter(project_id=project)
-        task_serializer = TaskwithuserSerializer(tasks, many=True)
-        response_data = {
-            "project": serializer.data,
-            "tasks": task_serializer.data
-        }
+
+        if request.query_params.get('summary') in ('1', 'true'):
+            stats = stats_for(project_id)
+            return Response({
+                "project": projects[0],
+                "stats": ProjectStatsSerializer(stats).data,
+            }, status=status.HTTP_200_OK)
+
+        tasks = Task.objects.filter(project_id=project_id)
+        response_data = {"project": projects[0]}
+        if 'page' in request.query_params:
+            try:
+                page = max(int(request.query_params['page']), 1)
+                page_size = int(request.query_params.get('page_size', TASK_PAGE_SIZE))
+            except ValueError:
+                return Response({"error": "page and page_size must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+            page_size = max(1, min(page_size, MAX_TASK_PAGE_SIZE))
+            start = (page - 1) * page_size
+            rows = FastTaskSerializer(tasks.order_by('id')[start:start + page_size + 1], **params).data
+            response_data["tasks"] = rows[:page_size]
+            response_data["tasks_page"] = {
+                "page": page,
+                "page_size": page_size,
+                "has_more": len(rows) > page_size,
+                # from the stats row, not a COUNT over the tasks
+                "total": stats_for(project_id).task_count,
+            }
+        else:
+            response_data["tasks"] = FastTaskSerializer(tasks, **params).data
         return Response(response_data, status=status.HTTP_200_OK)
 
     def post(self, request):
@@ -47,43 +117,88 @@ class ProjectListCreateView(APIView):
 
 
 class AddContributorsView(APIView):
+    permission_classes = [IsAuthenticated]
+
     def post(self, request):
         project_id = request.query_params.get('project_id')
         if not project_id:
             return Response({"error": "project_id query parameter is required"}, status=status.HTTP_400_BAD_REQUEST)
-        try:
-            project = Project.objects.get(pk=project_id)
-        except Project.DoesNotExist:
-            return Response({"error": "Project not found"}, status=status.HTTP_404_NOT_FOUND)
-        user_ids = request.data.get('user_ids')
-        if not user_ids or not isinstance(user_ids, list):
+        error = _owned_project(request, project_id)
+        if error:
+            return error
+        user_ids = _id_list(request.data.get('user_ids'))
+        if user_ids is None:
             return Response({"error": "user_ids must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
-        valid_users = User.objects.filter(id__in=user_ids)
-        if not valid_users.exists():
+        results = apply_membership_operations([(ADD, int(project_id), user_ids)], owner=request.user)
+        if all(result["status"] == USER_NOT_FOUND for result in results):
             return Response({"error": "No valid users found"}, status=status.HTTP_400_BAD_REQUEST)
-        new_users = valid_users.exclude(id__in=project.contributors.values_list('id', flat=True))
-        if not new_users.exists():
+        added = sum(result["status"] == ADDED for result in results)
+        if not added:
             return Response({"message": "All users are already contributors"}, status=status.HTTP_200_OK)
-        project.contributors.add(*new_users)
-        project.save()
-        return Response({"message": f"{new_users.count()} contributors added successfully"}, status=status.HTTP_200_OK)
+        return Response({"message": f"{added} contributors added successfully"}, status=status.HTTP_200_OK)
 
 
 class RemoveContributorsView(APIView):
+    permission_classes = [IsAuthenticated]
+
     def post(self, request):
         project_id = request.query_params.get('project_id')
         if not project_id:
             return Response({"error": "project_id query parameter is required"}, status=status.HTTP_400_BAD_REQUEST)
-        try:
-            project = Project.objects.get(id=project_id)
-        except Project.DoesNotExist:
-            return Response({"error": "Project not found"}, status=status.HTTP_404_NOT_FOUND)
-        user_ids = request.data.get('user_ids')
-        if not user_ids or not isinstance(user_ids, list):
+        error = _owned_project(request, project_id)
+        if error:
+            return error
+        user_ids = _id_list(request.data.get('user_ids'))
+        if user_ids is None:
             return Response({"error": "user_ids must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
-        current_contributors = project.contributors.filter(id__in=user_ids)
-        if not current_contributors.exists():
+        results = apply_membership_operations([(REMOVE, int(project_id), user_ids)], owner=request.user)
+        removed = sum(result["status"] == REMOVED for result in results)
+        if not removed:
             return Response({"message": "No matching contributors found to remove"}, status=status.HTTP_200_OK)
-        project.contributors.remove(*current_contributors)
-        project.save()
-        return Response({"message": f"{current_contributors.count()} contributors removed successfully"}, status=status.HTTP_200_OK)
+        return Response({"message": f"{removed} contributors removed successfully"}, status=status.HTTP_200_OK)
+
+
+class BulkMembershipView(APIView):
+    """
+    Add and remove contributors across many projects in one request.
+
+    POST {"operations": [
+        {"action": "add", "project_id": 1, "user_ids": [2, 3]},
+        {"action": "remove", "project_id": 4, "user_ids": [5]}
+    ]}
+
+    Operations apply in order, in a single transaction, to projects the
+    caller owns. The response lists one result per (operation, user)
+    with a status: added, already_member, removed, not_member,
+    user_not_found, project_not_found or permission_denied.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        operations = request.data.get('operations')
+        if not operations or not isinstance(operations, list):
+            return Response({"error": "operations must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+
+        parsed = []
+        for index, operation in enumerate(operations):
+            if not isinstance(operation, dict):
+                return Response({"error": f"operations[{index}] must be an object"}, status=status.HTTP_400_BAD_REQUEST)
+            action = operation.get('action')
+            project_id = operation.get('project_id')
+            user_ids = _id_list(operation.get('user_ids'))
+            if action not in ACTIONS or not isinstance(project_id, int) or user_ids is None:
+                return Response({
+                    "error": f"operations[{index}] needs action (add/remove), an integer project_id "
+                             f"and a non-empty list of user ids"
+                }, status=status.HTTP_400_BAD_REQUEST)
+            parsed.append((action, project_id, user_ids))
+
+        if sum(len(user_ids) for _, _, user_ids in parsed) > MAX_MEMBERSHIP_CHANGES:
+            return Response({"error": f"at most {MAX_MEMBERSHIP_CHANGES} changes per request"}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = apply_membership_operations(parsed, owner=request.user)
+        return Response({
+            "results": results,
+            "added": sum(result["status"] == ADDED for result in results),
+            "removed": sum(result["status"] == REMOVED for result in results),
+        }, status=status.HTTP_200_OK)
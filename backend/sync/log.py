@@ -0,0 +1,118 @@
+"""
+Writing and reading the change log.
+
+Writes are recorded in the same transaction as the change they describe.
+Reads collapse the log: whatever happened to an object since the cursor,
+the client gets its current row, or a tombstone if it is gone.
+
+Ids are handed out when a row is inserted, not when its transaction
+commits, so a reader can see change N+1 while change N is still
+uncommitted; a cursor moved past N would never return it. Cursors are
+therefore held back behind entries younger than SYNC_SETTLE_SECONDS
+(those are sent again on the next read, which is harmless since clients
+get current rows), and a transaction open for longer than that is caught
+by the forced reset: a cursor whose chain began more than
+SYNC_RESET_AFTER_SECONDS ago gets a fresh snapshot.
+"""
+import base64
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from backend import jsoncodec
+from .models import Change, PruneFloor
+
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 2000
+SETTLE_SECONDS = getattr(settings, "SYNC_SETTLE_SECONDS", 5)
+RESET_AFTER_SECONDS = getattr(settings, "SYNC_RESET_AFTER_SECONDS", 24 * 3600)
+
+
+def record(kind, rows, deleted=False):
+    """Log ``rows``: (project_id, object_id) pairs of one kind."""
+    Change.objects.bulk_create(
+        [Change(project_id=p, kind=kind, object_id=o, deleted=deleted) for p, o in rows],
+        batch_size=500,
+    )
+
+
+def encode_cursor(project_id, change_id, started_at):
+    """``started_at``: when the snapshot this cursor descends from was taken."""
+    return base64.urlsafe_b64encode(jsoncodec.dumps([project_id, change_id, started_at])).decode()
+
+
+def decode_cursor(cursor, project_id):
+    """
+    (change_id, started_at) from ``cursor``; ValueError unless it was
+    issued for this project.
+    """
+    try:
+        issued_for, change_id, started_at = jsoncodec.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (TypeError, ValueError):
+        issued_for = change_id = started_at = None
+    if issued_for != project_id or not isinstance(change_id, int) or not isinstance(started_at, int):
+        raise ValueError("invalid cursor")
+    return change_id, started_at
+
+
+def now_seconds():
+    return int(timezone.now().timestamp())
+
+
+def needs_reset(started_at):
+    return now_seconds() - started_at >= RESET_AFTER_SECONDS
+
+
+def _settle_cutoff():
+    return timezone.now() - timedelta(seconds=SETTLE_SECONDS)
+
+
+def latest_change_id():
+    """
+    Cursor position for a snapshot: the newest settled entry, so entries
+    still settling (or not yet committed below it) are replayed later.
+    """
+    settled = Change.objects.filter(created_at__lt=_settle_cutoff()).aggregate(latest=Max("id"))["latest"]
+    # never below the floor, even once pruning has emptied the log
+    return max(settled or 0, PruneFloor.current())
+
+
+def changes_since(project_id, change_id, limit):
+    """
+    ({kind: {object_id: deleted}}, cursor position, has_more) for up to
+    ``limit`` log entries after ``change_id``; later entries win. The
+    position stops before the first entry that has not settled yet.
+    """
+    entries = list(
+        Change.objects.filter(project_id=project_id, id__gt=change_id)
+        .order_by("id").values_list("id", "kind", "object_id", "deleted", "created_at")[:limit + 1]
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    latest = {Change.TASK: {}, Change.COMMIT: {}}
+    for _, kind, object_id, deleted, _ in entries:
+        latest[kind][object_id] = deleted
+    position, cutoff = change_id, _settle_cutoff()
+    for entry_id, *_, created_at in entries:
+        if created_at >= cutoff:
+            # held back: the rest is read again, so there is no next page yet
+            has_more = False
+            break
+        position = entry_id
+    return latest, position, has_more
+
+
+def prune(days):
+    """Drop entries older than ``days`` and raise the floor; returns the count."""
+    cutoff = timezone.now() - timedelta(days=days)
+    with transaction.atomic():
+        old = Change.objects.filter(created_at__lt=cutoff)
+        highest = old.aggregate(highest=Max("id"))["highest"]
+        if highest is None:
+            return 0
+        deleted, _ = Change.objects.filter(id__lte=highest).delete()
+        PruneFloor.objects.update_or_create(pk=1, defaults={"change_id": highest})
+    return deleted
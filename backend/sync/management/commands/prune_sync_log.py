@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from sync.log import prune
+
+
+class Command(BaseCommand):
+    help = "Delete sync change-log entries older than --days; older cursors get a full reset."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=getattr(settings, "SYNC_LOG_RETENTION_DAYS", 30),
+            help="Keep this many days of changes",
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune(options["days"])
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} change-log entries"))
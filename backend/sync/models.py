@@ -0,0 +1,44 @@
+from django.db import models
+
+
+class Change(models.Model):
+    """
+    Append-only log of task and commit writes, one row per created,
+    updated or deleted object. The id is the sync cursor: a client that
+    has seen change N asks for everything after it.
+
+    project_id is a plain column rather than a foreign key so tombstones
+    outlive the rows (and projects) they describe; old entries are removed
+    by `manage.py prune_sync_log`.
+    """
+    TASK = 'task'
+    COMMIT = 'commit'
+    KIND_CHOICES = [(TASK, 'Task'), (COMMIT, 'Commit')]
+
+    project_id = models.BigIntegerField()
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['project_id', 'id'], name='sync_change_project_id'),
+            models.Index(fields=['created_at'], name='sync_change_created'),
+        ]
+
+    def __str__(self):
+        action = "deleted" if self.deleted else "changed"
+        return f"{self.kind} {self.object_id} {action} (project {self.project_id})"
+
+
+class PruneFloor(models.Model):
+    """
+    Single row holding the highest change id removed by pruning; cursors
+    at or below it may have missed changes and must start over.
+    """
+    change_id = models.BigIntegerField(default=0)
+
+    @classmethod
+    def current(cls):
+        return cls.objects.filter(pk=1).values_list('change_id', flat=True).first() or 0
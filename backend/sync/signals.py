@@ -0,0 +1,37 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from task.models import Task
+from task.signals import tasks_updated
+from task_commit.models import TaskCommit
+from task_commit.signals import commits_upserted
+from .log import record
+from .models import Change
+
+KINDS = {Task: Change.TASK, TaskCommit: Change.COMMIT}
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=TaskCommit)
+def log_save(sender, instance, **kwargs):
+    record(KINDS[sender], [(instance.project_id_id, instance.pk)])
+    moved_from = instance.loaded_values.get("project_id_id")
+    if moved_from is not None and moved_from != instance.project_id_id:
+        # gone from the old project's point of view
+        record(KINDS[sender], [(moved_from, instance.pk)], deleted=True)
+
+
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=TaskCommit)
+def log_delete(sender, instance, **kwargs):
+    record(KINDS[sender], [(instance.project_id_id, instance.pk)], deleted=True)
+
+
+@receiver(tasks_updated)
+def log_bulk_update(sender, tasks, **kwargs):
+    record(Change.TASK, [(task.project_id_id, task.pk) for task in tasks])
+
+
+@receiver(commits_upserted)
+def log_upsert(sender, created, updated, **kwargs):
+    record(Change.COMMIT, [(commit.project_id_id, commit.pk) for commit in created + updated])
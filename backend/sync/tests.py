@@ -0,0 +1,148 @@
+import io
+from datetime import timedelta
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from project.access import membership_cache
+from project.models import Project
+from task.models import Task
+from task_commit.models import TaskCommit
+from user.models import CustomUser
+from .log import encode_cursor
+from .models import Change
+
+
+class SyncTests(TestCase):
+    def setUp(self):
+        membership_cache.clear()
+        # changes count as settled at once unless a test says otherwise
+        self.enterContext(mock.patch("sync.log.SETTLE_SECONDS", 0))
+        self.owner = CustomUser.objects.create_user(email="owner@example.com", github_username="owner")
+        self.project = Project.objects.create(name="sync", created_by=self.owner)
+        self.other = Project.objects.create(name="other", created_by=self.owner)
+        self.tasks = [self.add_task(f"t{i}") for i in range(3)]
+        self.commit = self.add_commit(self.tasks[0], "a" * 40)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def add_task(self, title, project=None):
+        return Task.objects.create(
+            project_id=project or self.project, title=title, branch_name=title, created_by=self.owner,
+        )
+
+    def add_commit(self, task, sha):
+        return TaskCommit.objects.create(
+            github_task=task, project_id=task.project_id, completed_by=self.owner, commit_id=sha, message="m",
+        )
+
+    def sync(self, cursor=None, **params):
+        if cursor:
+            params["cursor"] = cursor
+        res = self.client.get("/api/sync/", {"project_id": self.project.id, **params})
+        self.assertEqual(res.status_code, 200, res.data)
+        return res.data
+
+    def test_first_sync_is_a_snapshot(self):
+        body = self.sync()
+        self.assertTrue(body["reset"])
+        self.assertEqual([t["id"] for t in body["tasks"]], [t.id for t in self.tasks])
+        self.assertEqual([c["id"] for c in body["commits"]], [self.commit.id])
+
+        body = self.sync(body["cursor"])
+        self.assertFalse(body["reset"])
+        self.assertEqual((body["tasks"], body["commits"]), ([], []))
+        self.assertEqual(body["deleted"], {"tasks": [], "commits": []})
+
+    def test_delta_carries_only_changes_and_tombstones(self):
+        cursor = self.sync()["cursor"]
+        created = self.add_task("new")
+        self.add_task("elsewhere", project=self.other)
+        self.tasks[1].status = "in_progress"
+        self.tasks[1].save()
+        self.client.patch(
+            f"/api/tasks/batch/?project_id={self.project.id}",
+            {"changes": [{"id": self.tasks[2].id, "priority": "high"}]}, format="json",
+        )
+        denied = self.add_commit(self.tasks[1], "b" * 40)
+        self.client.post(f"/api/task_commit/task_request/deny/?commit_id={denied.commit_id}")
+        accepted = self.tasks[0].id
+        res = self.client.post(f"/api/task_commit/task_request/accept/?commit_id={self.commit.commit_id}")
+        self.assertEqual(res.status_code, 200)
+
+        body = self.sync(cursor, fields="id,status,priority")
+        self.assertEqual(sorted(t["id"] for t in body["tasks"]), sorted([created.id, self.tasks[1].id, self.tasks[2].id]))
+        by_id = {t["id"]: t for t in body["tasks"]}
+        self.assertEqual(by_id[self.tasks[1].id]["status"], "pending")  # reset by denycommit
+        self.assertEqual(by_id[self.tasks[2].id], {"id": self.tasks[2].id, "status": "pending", "priority": "high"})
+        self.assertEqual(body["commits"], [])
+        self.assertEqual(body["deleted"], {"tasks": [accepted], "commits": sorted([self.commit.id, denied.id])})
+
+    def test_pages_follow_the_cursor(self):
+        cursor = self.sync()["cursor"]
+        for i in range(5):
+            self.add_task(f"more{i}")
+        seen, pages = [], 0
+        while True:
+            body = self.sync(cursor, limit=2)
+            seen += [t["id"] for t in body["tasks"]]
+            cursor, pages = body["cursor"], pages + 1
+            if not body["has_more"]:
+                break
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(pages, 3)
+
+    def test_pruned_cursor_gets_a_reset(self):
+        cursor = self.sync()["cursor"]
+        self.add_task("late")
+        Change.objects.update(created_at=timezone.now() - timedelta(days=60))
+        call_command("prune_sync_log", "--days", "30", stdout=io.StringIO())
+        self.assertFalse(Change.objects.exists())
+        body = self.sync(cursor)
+        self.assertTrue(body["reset"])
+        self.assertEqual(len(body["tasks"]), 4)
+        self.assertFalse(self.sync(body["cursor"])["reset"])
+
+    def test_cursor_and_access_checks(self):
+        foreign = encode_cursor(self.other.id, 0, int(timezone.now().timestamp()))
+        res = self.client.get("/api/sync/", {"project_id": self.project.id, "cursor": foreign})
+        self.assertEqual(res.status_code, 400)
+        stranger = CustomUser.objects.create_user(email="stranger@example.com")
+        self.client.force_authenticate(stranger)
+        self.assertEqual(self.client.get("/api/sync/", {"project_id": self.project.id}).status_code, 403)
+
+    def test_cursor_chains_are_reset_periodically(self):
+        cursor = self.sync()["cursor"]
+        self.add_task("late")
+        with mock.patch("sync.log.RESET_AFTER_SECONDS", 0):
+            body = self.sync(cursor)
+        self.assertTrue(body["reset"])
+        self.assertEqual(len(body["tasks"]), 4)
+
+
+    def test_late_commit_below_a_seen_id_is_not_skipped(self):
+        self.enterContext(mock.patch("sync.log.SETTLE_SECONDS", 60))
+        settle = lambda: Change.objects.update(created_at=timezone.now() - timedelta(minutes=5))
+        settle()
+        cursor = self.sync()["cursor"]
+        first, second = self.add_task("first"), self.add_task("second")
+        # first's transaction has not committed yet when the client reads
+        hidden = Change.objects.get(kind=Change.TASK, object_id=first.id)
+        hidden.delete()
+
+        body = self.sync(cursor)
+        self.assertEqual([t["id"] for t in body["tasks"]], [second.id])
+        self.assertFalse(body["has_more"])
+        self.assertEqual(body["cursor"], cursor)  # held behind the unsettled change
+
+        Change.objects.create(id=hidden.id, project_id=self.project.id, kind=Change.TASK, object_id=first.id)
+        body = self.sync(body["cursor"])
+        self.assertEqual(sorted(t["id"] for t in body["tasks"]), [first.id, second.id])
+
+        settle()
+        body = self.sync(body["cursor"])
+        self.assertEqual(sorted(t["id"] for t in body["tasks"]), [first.id, second.id])
+        self.assertEqual(self.sync(body["cursor"])["tasks"], [])
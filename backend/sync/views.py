@@ -0,0 +1,86 @@
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from backend.flexfields import flex_params, trim
+from project.permissions import IsProjectMember
+from task.models import Task
+from task.serializers import FastTaskSerializer
+from task_commit.models import TaskCommit
+from task_commit.serializers import FastTaskCommitListSerializer
+from .log import (
+    DEFAULT_LIMIT, MAX_LIMIT, changes_since, decode_cursor, encode_cursor, latest_change_id, needs_reset, now_seconds,
+)
+from .models import Change, PruneFloor
+
+
+def _rows(fast_serializer, queryset, params):
+    """(rows trimmed to ?fields=, ids of the rows found)."""
+    fields = params["fields"]
+    render = None if fields is None else fields | {"id"}
+    rows = fast_serializer(queryset, fields=render, expand=params["expand"]).data
+    return [trim(row, fields) for row in rows], {row["id"] for row in rows}
+
+
+class SyncView(APIView):
+    """
+    Delta sync of a project's tasks and commits.
+
+    GET ?project_id=N returns everything plus a cursor ("reset": true).
+    GET ?project_id=N&cursor=C returns only what changed after C: current
+    rows for created/updated tasks and commits, and the ids of deleted ones
+    under "deleted". Follow "cursor" while "has_more" is true. A cursor
+    older than the pruned log, or descending from a snapshot older than
+    SYNC_RESET_AFTER_SECONDS, gets a full reset again. Changes from the
+    last few seconds may be sent twice (see sync.log).
+
+    ?fields= and ?expand= apply to tasks and commits as on their lists.
+    """
+    permission_classes = [IsAuthenticated, IsProjectMember]
+
+    def get(self, request):
+        try:
+            project_id = int(request.query_params.get('project_id', ''))
+            limit = int(request.query_params.get('limit') or DEFAULT_LIMIT)
+        except ValueError:
+            return Response({"error": "project_id and limit must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, MAX_LIMIT))
+        params = flex_params(request)
+
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            try:
+                since, started_at = decode_cursor(cursor, project_id)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            if since >= PruneFloor.current() and not needs_reset(started_at):
+                return Response(self.delta(project_id, since, started_at, limit, params), status=status.HTTP_200_OK)
+        return Response(self.snapshot(project_id, params), status=status.HTTP_200_OK)
+
+    def snapshot(self, project_id, params):
+        # taken before the reads: anything written meanwhile is replayed next time
+        change_id = latest_change_id()
+        return {
+            "cursor": encode_cursor(project_id, change_id, now_seconds()),
+            "reset": True,
+            "tasks": _rows(FastTaskSerializer, Task.objects.filter(project_id=project_id).order_by('id'), params)[0],
+            "commits": _rows(FastTaskCommitListSerializer, TaskCommit.objects.filter(project_id=project_id), params)[0],
+            "deleted": {"tasks": [], "commits": []},
+            "has_more": False,
+        }
+
+    def delta(self, project_id, since, started_at, limit, params):
+        latest, last, has_more = changes_since(project_id, since, limit)
+        body = {"cursor": encode_cursor(project_id, last, started_at), "reset": False, "deleted": {}, "has_more": has_more}
+        for key, kind, model, fast_serializer in (
+            ("tasks", Change.TASK, Task, FastTaskSerializer),
+            ("commits", Change.COMMIT, TaskCommit, FastTaskCommitListSerializer),
+        ):
+            gone = {object_id for object_id, deleted in latest[kind].items() if deleted}
+            live = set(latest[kind]) - gone
+            rows, found = _rows(fast_serializer, model.objects.filter(project_id=project_id, id__in=live), params) if live else ([], set())
+            body[key] = rows
+            # rows deleted (or moved) after the log was read count as deleted
+            body["deleted"][key] = sorted(gone | (live - found))
+        return body
@@ -0,0 +1,112 @@
+"""
+Many task changes (status, priority, assignee) validated together and
+written with one bulk_update.
+
+Changes are checked against two reads (the project's tasks and its
+members); nothing is written unless every change is valid. Saving goes
+through bulk_update inside a transaction and is followed by a single
+tasks_updated signal in place of per-row post_save.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from project.models import ProjectMembership
+from .models import Task
+from .signals import tasks_updated
+
+FIELDS = ("status", "priority", "assigned_to")
+STATUSES = {value for value, _ in Task.STATUS_CHOICES}
+PRIORITIES = {value for value, _ in Task.PRIORITY_CHOICES}
+
+UPDATE_BATCH_SIZE = 500
+
+
+def _error(index, message, field=None):
+    error = {"index": index, "error": message}
+    if field is not None:
+        error["field"] = field
+    return error
+
+
+def _int(value):
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+
+def validate_changes(project_id, changes):
+    """
+    Returns ({task_id: {field: value}}, errors). Each change is a dict
+    with an integer ``id`` and any of status, priority and assigned_to
+    (a user id of a project member, or None).
+    """
+    changes = [change if isinstance(change, dict) else {} for change in changes]
+    task_ids = {_int(change.get("id")) for change in changes} - {None}
+    assignees = {_int(change.get("assigned_to")) for change in changes} - {None}
+    tasks = set(Task.objects.filter(project_id=project_id, id__in=task_ids).values_list("id", flat=True))
+    members = set(
+        ProjectMembership.objects.filter(project_id=project_id, user_id__in=assignees)
+        .values_list("user_id", flat=True)
+    ) if assignees else set()
+
+    errors = []
+    updates = {}
+    for index, change in enumerate(changes):
+        task_id = _int(change.get("id"))
+        if task_id is None:
+            errors.append(_error(index, "Each change needs an integer id", "id"))
+            continue
+        if task_id not in tasks:
+            errors.append(_error(index, "Task not found in this project", "id"))
+            continue
+        if task_id in updates:
+            errors.append(_error(index, "Task listed more than once", "id"))
+            continue
+        unknown = set(change) - {"id", *FIELDS}
+        if unknown:
+            errors.append(_error(index, f"Unknown fields: {', '.join(sorted(unknown))}"))
+            continue
+        fields = {field: change[field] for field in FIELDS if field in change}
+        if not fields:
+            errors.append(_error(index, "Nothing to change"))
+            continue
+        if "status" in fields and fields["status"] not in STATUSES:
+            errors.append(_error(index, "Invalid status", "status"))
+            continue
+        if "priority" in fields and fields["priority"] not in PRIORITIES:
+            errors.append(_error(index, "Invalid priority", "priority"))
+            continue
+        assignee = fields.get("assigned_to")
+        if assignee is not None and _int(assignee) not in members:
+            errors.append(_error(index, "Assignee is not a member of this project", "assigned_to"))
+            continue
+        updates[task_id] = fields
+    return updates, errors
+
+
+def apply_changes(updates):
+    """Write validated ``updates``; returns the ids of tasks that changed."""
+    attnames = {"status": "status", "priority": "priority", "assigned_to": "assigned_to_id"}
+    with transaction.atomic():
+        tasks = Task.objects.select_for_update().filter(id__in=list(updates))
+        changed, fields = [], set()
+        for task in tasks:
+            dirty = {
+                attnames[field] for field, value in updates[task.id].items()
+                if getattr(task, attnames[field]) != value
+            }
+            if not dirty:
+                continue
+            for field, value in updates[task.id].items():
+                setattr(task, attnames[field], value)
+            changed.append(task)
+            fields |= dirty
+
+        if changed:
+            # bulk_update skips auto_now
+            now = timezone.now()
+            for task in changed:
+                task.updated_at = now
+            Task.objects.bulk_update(changed, [*fields, "updated_at"], batch_size=UPDATE_BATCH_SIZE)
+            tasks_updated.send(sender=Task, tasks=changed)
+            for task in changed:
+                task.remember_values()
+    return [task.id for task in changed]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0006_projectmembership'),
+        ('task', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project_id', 'status', 'priority'], name='task_project_status_priority'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assigned_to', 'status'], name='task_assignee_status'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project_id', 'updated_at'], name='task_project_updated'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project_id', 'branch_name'], name='task_project_branch'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0007_outboxevent'),
+        ('task', '0002_task_list_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project_id', 'created_at'], name='task_project_created'),
+        ),
+    ]
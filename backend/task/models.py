@@ -1,9 +1,10 @@
 from django.db import models
 from django.conf import settings
 from project.models import Project
+from backend.tracking import LoadedValuesMixin
 User = settings.AUTH_USER_MODEL
 
-class Task(models.Model):
+class Task(LoadedValuesMixin, models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
         ('in_progress', 'In Progress'),
@@ -26,3 +27,13 @@ class Task(models.Model):
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_tasks')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # the task list filters (see task.query)
+        indexes = [
+            models.Index(fields=['project_id', 'status', 'priority'], name='task_project_status_priority'),
+            models.Index(fields=['assigned_to', 'status'], name='task_assignee_status'),
+            models.Index(fields=['project_id', 'updated_at'], name='task_project_updated'),
+            models.Index(fields=['project_id', 'created_at'], name='task_project_created'),
+            models.Index(fields=['project_id', 'branch_name'], name='task_project_branch'),
+        ]
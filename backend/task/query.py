@@ -0,0 +1,137 @@
+"""
+Filtering, ordering and keyset pagination for task lists.
+
+    ?status=pending,in_progress    any of these (also priority=)
+    ?assigned_to=12                or assigned_to=none
+    ?branch=feature/login
+    ?updated_since=2026-01-01T00:00:00Z
+    ?ordering=-updated_at          id (default), created_at, updated_at
+    ?limit=50&cursor=...           one page; the response carries next_cursor
+
+Each filter, and each ordering of a project's tasks, is served by one of
+the composite indexes on Task (see Task.Meta.indexes); a filter combined
+with a non-id ordering may still sort the matching rows. Cursors are
+opaque: (sort value, id) of the last row, so a page is an index range
+scan however deep it is.
+"""
+import base64
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from backend import jsoncodec
+from backend.flexfields import trim
+from .models import Task
+from .serializers import FastTaskSerializer
+
+STATUSES = {value for value, _ in Task.STATUS_CHOICES}
+PRIORITIES = {value for value, _ in Task.PRIORITY_CHOICES}
+ORDERINGS = ("id", "created_at", "updated_at")
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+def _choices(params, name, allowed):
+    value = params.get(name)
+    if not value:
+        return None
+    chosen = {item.strip() for item in value.split(",") if item.strip()}
+    if not chosen <= allowed:
+        raise ValueError(f"{name} must be one of {', '.join(sorted(allowed))}")
+    return chosen
+
+
+def filter_tasks(tasks, params):
+    """Apply the filters in ``params``; raises ValueError on bad values."""
+    status = _choices(params, "status", STATUSES)
+    if status:
+        tasks = tasks.filter(status__in=status)
+    priority = _choices(params, "priority", PRIORITIES)
+    if priority:
+        tasks = tasks.filter(priority__in=priority)
+
+    assigned_to = params.get("assigned_to")
+    if assigned_to == "none":
+        tasks = tasks.filter(assigned_to__isnull=True)
+    elif assigned_to:
+        tasks = tasks.filter(assigned_to_id=int(assigned_to))
+
+    if params.get("branch"):
+        tasks = tasks.filter(branch_name=params["branch"])
+
+    if params.get("updated_since"):
+        since = parse_datetime(params["updated_since"])
+        if since is None:
+            raise ValueError("updated_since must be an ISO 8601 datetime")
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        tasks = tasks.filter(updated_at__gte=since)
+    return tasks
+
+
+def ordering_for(params):
+    """(field, descending) from ?ordering=."""
+    ordering = params.get("ordering") or "id"
+    field = ordering.lstrip("-")
+    if field not in ORDERINGS:
+        raise ValueError(f"ordering must be one of {', '.join(ORDERINGS)} (- for descending)")
+    return field, ordering.startswith("-")
+
+
+def order_tasks(tasks, field, descending):
+    sign = "-" if descending else ""
+    if field == "id":
+        return tasks.order_by(f"{sign}id")
+    return tasks.order_by(f"{sign}{field}", f"{sign}id")
+
+
+def encode_cursor(value, pk):
+    return base64.urlsafe_b64encode(jsoncodec.dumps([value, pk])).decode()
+
+
+def decode_cursor(cursor, field):
+    try:
+        value, pk = jsoncodec.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if field != "id":
+            value = parse_datetime(value)
+    except (TypeError, ValueError):
+        value = pk = None
+    if value is None or not isinstance(pk, int):
+        raise ValueError("invalid cursor")
+    return value, pk
+
+
+def after_cursor(tasks, field, descending, cursor):
+    """Rows strictly after the (value, id) cursor in the chosen order."""
+    value, pk = decode_cursor(cursor, field)
+    op = "lt" if descending else "gt"
+    if field == "id":
+        return tasks.filter(**{f"id__{op}": pk})
+    # the redundant bound on the sort key lets the index seek to the cursor
+    return tasks.filter(
+        Q(**{f"{field}__{op}e": value}),
+        Q(**{f"{field}__{op}": value}) | Q(**{f"id__{op}": pk}),
+    )
+
+
+def task_page(tasks, params, fields=None, expand=frozenset()):
+    """
+    One page of ``tasks`` (already filtered) as {"results", "next_cursor"};
+    next_cursor is None on the last page.
+    """
+    field, descending = ordering_for(params)
+    limit = max(1, min(int(params.get("limit") or DEFAULT_LIMIT), MAX_LIMIT))
+    tasks = order_tasks(tasks, field, descending)
+    if params.get("cursor"):
+        tasks = after_cursor(tasks, field, descending, params["cursor"])
+
+    # the cursor is read off the last row, so render the sort key too
+    render = None if fields is None else fields | {"id", field}
+    rows = FastTaskSerializer(tasks[:limit + 1], fields=render, expand=expand).data
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][field], rows[-1]["id"])
+    return {"results": [trim(row, fields) for row in rows], "next_cursor": next_cursor}
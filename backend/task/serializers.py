@@ -1,8 +1,11 @@
 from rest_framework import serializers
 from .models import Task
-from user.serializers import Userserializer
+from user.serializers import Userserializer, usserprofileSerializer
+from project.serializers import ProjectSerializer
+from backend.fastserializers import FastSerializer
+from backend.flexfields import FlexFieldsMixin
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(FlexFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Task
         fields = "__all__"
@@ -12,9 +15,18 @@ class TaskSerializer(serializers.ModelSerializer):
             "updated_at",
             "created_by",
         )
+        expandable = {
+            "project_id": ProjectSerializer,
+            "assigned_to": usserprofileSerializer,
+            "created_by": usserprofileSerializer,
+        }
 class TaskwithuserSerializer(serializers.ModelSerializer):
     created_by = Userserializer(read_only=True)  
     assigned_to = Userserializer(read_only=True)
     class Meta:
         model = Task
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+
+class FastTaskSerializer(FastSerializer):
+    serializer_class = TaskSerializer
@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent after Task.objects.bulk_update() in place of post_save, with the
+# updated ``tasks``; their loaded_values still hold the previous values.
+tasks_updated = Signal()
@@ -1,3 +1,323 @@
-from django.test import TestCase
+import threading
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from project.access import membership_cache
+from project.models import Project, ProjectStats
+from project.stats import COUNTER_COLUMNS, rebuild_stats
+from backend import fastserializers
+from backend.jsoncodec import FastJSONRenderer
+from user.dashboard import dashboard_version
+from user.models import CustomUser
+from .models import Task
+from .query import encode_cursor, filter_tasks, order_tasks, after_cursor
+from .serializers import FastTaskSerializer, TaskSerializer
+
+
+class TaskListTests(TestCase):
+    def setUp(self):
+        membership_cache.clear()
+        self.owner = CustomUser.objects.create_user(email="owner@example.com", github_username="owner")
+        self.dev = CustomUser.objects.create_user(email="dev@example.com")
+        self.project = Project.objects.create(name="tasks", created_by=self.owner)
+        Task.objects.create(
+            project_id=self.project, title="unassigned", branch_name="b1", created_by=self.owner,
+        )
+        Task.objects.create(
+            project_id=self.project, title="assigned", branch_name="b2", description="details",
+            status="in_progress", priority="high", assigned_to=self.dev, created_by=self.owner,
+        )
+
+    def test_fast_serializer_matches_drf_output(self):
+        tasks = Task.objects.filter(project_id=self.project)
+        render = JSONRenderer().render
+        for options in (
+            {},
+            {"expand": {"assigned_to", "created_by"}},
+            {"expand": {"project_id.contributors"}, "fields": {"id", "project_id"}},
+        ):
+            with self.subTest(**options):
+                self.assertEqual(
+                    render(FastTaskSerializer(tasks, **options).data),
+                    render(TaskSerializer(tasks, many=True, **options).data),
+                )
+
+    def test_threads_share_one_plan_per_option_set(self):
+        FastTaskSerializer.__dict__.get("_plans", {}).clear()
+        build = fastserializers.Plan
+        started = threading.Barrier(8)
+
+        def slow_build(serializer):
+            started.wait(timeout=5)  # every thread has missed the cache
+            return build(serializer)
+
+        plans = []
+        work = lambda: plans.append(FastTaskSerializer.plan(fields={"id", "title"}))
+        with mock.patch.object(fastserializers, "Plan", side_effect=slow_build):
+            threads = [threading.Thread(target=work) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(len(plans), 8)
+        self.assertEqual(len({id(plan) for plan in plans}), 1)
+        self.assertIs(FastTaskSerializer.plan(fields={"id", "title"}), plans[0])
+
+    def test_fast_renderer_matches_drf_renderer(self):
+        payload = {
+            "tasks": FastTaskSerializer(Task.objects.all(), expand={"created_by"}).data,
+            "at": timezone.now(),
+            "cost": Decimal("12.50"),
+            "ref": uuid.UUID(int=7),
+            "text": "caf\u00e9 \u2028 <b>",
+        }
+        self.assertEqual(FastJSONRenderer().render(payload), JSONRenderer().render(payload))
+
+    def test_list_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        # the membership check is a cache hit once warm
+        client.get("/api/tasks/create_task/", {"project_id": self.project.id})
+        # project lookup + one values() query
+        with self.assertNumQueries(2):
+            res = client.get("/api/tasks/create_task/", {"project_id": self.project.id})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(res.data), 2)
+        self.assertIsNone(res.data[0]["assigned_to"])
+        self.assertEqual(res.data[1]["assigned_to"], self.dev.id)
+
+        res = client.get("/api/tasks/create_task/", {
+            "project_id": self.project.id, "expand": "assigned_to", "fields": "id,title,assigned_to",
+        })
+        self.assertEqual(list(res.data[1]), ["id", "title", "assigned_to"])
+        self.assertEqual(
+            res.data[1]["assigned_to"],
+            {"id": self.dev.id, "email": "dev@example.com", "github_username": ""},
+        )
+
+
+    def test_status_update_requires_membership(self):
+        task = Task.objects.get(title="unassigned")
+        client = APIClient()
+        client.force_authenticate(self.dev)  # not a contributor
+        res = client.put(f"/api/tasks/create_task/?pk={task.id}", {"status": "completed"}, format="json")
+        self.assertEqual(res.status_code, 403)
+        task.refresh_from_db()
+        self.assertEqual(task.status, "pending")
+
+        client.force_authenticate(self.owner)
+        res = client.put(f"/api/tasks/create_task/?pk={task.id}", {"status": "done"}, format="json")
+        self.assertEqual(res.status_code, 400)
+        res = client.put(f"/api/tasks/create_task/?pk={task.id}", {"status": "completed"}, format="json")
+        self.assertEqual((res.status_code, res.data["status"]), (200, "completed"))
+
+class TaskBatchUpdateTests(TestCase):
+    def setUp(self):
+        membership_cache.clear()
+        cache.clear()
+        self.owner = CustomUser.objects.create_user(email="owner@example.com", github_username="owner")
+        self.dev = CustomUser.objects.create_user(email="dev@example.com")
+        self.stranger = CustomUser.objects.create_user(email="stranger@example.com")
+        self.project = Project.objects.create(name="board", created_by=self.owner)
+        self.project.contributors.add(self.dev)
+        self.tasks = self.make_tasks(5)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def make_tasks(self, count):
+        return Task.objects.bulk_create([
+            Task(project_id=self.project, title=f"t{i}", branch_name=f"b{i}", created_by=self.owner)
+            for i in range(count)
+        ])
+
+    def patch(self, changes):
+        return self.client.patch(
+            f"/api/tasks/batch/?project_id={self.project.id}", {"changes": changes}, format="json",
+        )
+
+    def counters(self):
+        stats = ProjectStats.objects.get(project=self.project)
+        return {column: getattr(stats, column) for column in COUNTER_COLUMNS}
+
+    @override_settings(DASHBOARD_CACHE="default")
+    def test_applies_changes_and_keeps_stats_in_step(self):
+        rebuild_stats([self.project.id])
+        first, second, third = self.tasks[:3]
+        before = Task.objects.get(pk=first.pk).updated_at
+        version = dashboard_version(self.dev.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.patch([
+                {"id": first.id, "status": "in_progress", "assigned_to": self.dev.id},
+                {"id": second.id, "priority": "high"},
+                {"id": third.id, "status": "pending"},  # unchanged
+            ])
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["changed"], [first.id, second.id])
+        self.assertEqual([t["id"] for t in res.data["tasks"]], [first.id, second.id, third.id])
+        self.assertEqual(res.data["tasks"][0]["status"], "in_progress")
+        self.assertEqual(res.data["tasks"][0]["assigned_to"], self.dev.id)
+        self.assertEqual(res.data["tasks"][1]["priority"], "high")
+        self.assertGreater(Task.objects.get(pk=first.pk).updated_at, before)
+
+        incremental = self.counters()
+        rebuild_stats([self.project.id])
+        self.assertEqual(incremental, self.counters())
+        self.assertEqual(incremental["in_progress_tasks"], 1)
+        self.assertEqual(incremental["high_priority_tasks"], 1)
+        self.assertNotEqual(dashboard_version(self.dev.id), version)
+
+    def test_invalid_batch_changes_nothing(self):
+        res = self.patch([
+            {"id": self.tasks[0].id, "status": "completed"},
+            {"id": self.tasks[1].id, "status": "done"},
+            {"id": self.tasks[2].id, "assigned_to": self.stranger.id},
+            {"id": 999999, "priority": "low"},
+            {"id": self.tasks[0].id, "priority": "low"},
+            {"id": self.tasks[3].id, "title": "renamed"},
+            {"status": "completed"},
+        ])
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual([(e["index"], e.get("field")) for e in res.data["errors"]], [
+            (1, "status"), (2, "assigned_to"), (3, "id"), (4, "id"), (5, None), (6, "id"),
+        ])
+        self.assertFalse(Task.objects.filter(status="completed").exists())
+        self.assertEqual(self.patch([]).status_code, 400)
+
+    def test_requires_membership(self):
+        self.client.force_authenticate(self.stranger)
+        self.assertEqual(self.patch([{"id": self.tasks[0].id, "status": "completed"}]).status_code, 403)
+
+    def test_statement_count_does_not_grow_with_batch_size(self):
+        def complete(tasks):
+            # tasks, members, locked rows, one UPDATE, one stats UPDATE, one
+            # outbox and one change-log INSERT, an INSERT and an UPDATE per
+            # rollup table (one day, one assignee), the response read, and
+            # the savepoint pair
+            with self.assertNumQueries(14):
+                res = self.patch([{"id": t.id, "status": "completed", "assigned_to": self.dev.id} for t in tasks])
+            self.assertEqual(len(res.data["changed"]), len(tasks))
+
+        self.patch([{"id": self.tasks[0].id, "priority": "low"}])  # warms the membership cache
+        complete(self.tasks)
+        complete(self.make_tasks(40))
+
+
+class TaskQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = CustomUser.objects.bulk_create([CustomUser(email=f"q{i}@example.com") for i in range(50)])
+        cls.projects = [Project.objects.create(name=f"q{i}", created_by=cls.users[0]) for i in range(20)]
+        statuses, priorities = ["pending", "in_progress", "completed"], ["low", "medium", "high"]
+        Task.objects.bulk_create([
+            Task(
+                project_id=cls.projects[i % 20], title=f"t{i}", branch_name=f"b{i % 300}",
+                status=statuses[i % 3], priority=priorities[i // 3 % 3],
+                assigned_to=cls.users[i % 50] if i % 7 else None, created_by=cls.users[0],
+            )
+            for i in range(20000)
+        ], batch_size=2000)
+        cls.project = cls.projects[3]
+        # ties on updated_at, which the cursor breaks by id
+        Task.objects.filter(project_id=cls.project, id__lt=500).update(updated_at=timezone.now() - timedelta(days=1))
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def setUp(self):
+        membership_cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+
+    def get(self, **params):
+        return self.client.get("/api/tasks/create_task/", {"project_id": self.project.id, **params})
+
+    def test_filters(self):
+        tasks = Task.objects.filter(project_id=self.project)
+        res = self.get(status="pending,completed", priority="high", fields="id,status,priority")
+        self.assertEqual(res.status_code, 200)
+        expected = tasks.filter(status__in=["pending", "completed"], priority="high")
+        self.assertEqual([row["id"] for row in res.data], list(expected.order_by("id").values_list("id", flat=True)))
+
+        self.assertEqual(len(self.get(assigned_to="none").data), tasks.filter(assigned_to=None).count())
+        self.assertEqual(len(self.get(assigned_to=self.users[3].id).data), tasks.filter(assigned_to=self.users[3]).count())
+        self.assertEqual(len(self.get(branch="b3").data), tasks.filter(branch_name="b3").count())
+        recent = self.get(updated_since=(timezone.now() - timedelta(hours=1)).isoformat()).data
+        self.assertEqual(len(recent), tasks.filter(id__gte=500).count())
+
+        for params in ({"status": "done"}, {"assigned_to": "x"}, {"updated_since": "yesterday"},
+                       {"ordering": "title"}, {"limit": 10, "cursor": "garbage"}):
+            self.assertEqual(self.get(**params).status_code, 400, params)
+
+    def test_cursor_pages_cover_the_list_in_order(self):
+        for ordering in ("id", "-updated_at", "created_at"):
+            seen, cursor, pages = [], None, 0
+            while True:
+                params = {"ordering": ordering, "limit": 150, "fields": "id"}
+                if cursor:
+                    params["cursor"] = cursor
+                res = self.get(**params)
+                self.assertEqual(res.status_code, 200)
+                self.assertTrue(all(list(row) == ["id"] for row in res.data["results"]))
+                seen += [row["id"] for row in res.data["results"]]
+                cursor, pages = res.data["next_cursor"], pages + 1
+                if cursor is None:
+                    break
+            expected = order_tasks(Task.objects.filter(project_id=self.project), ordering.lstrip("-"), ordering.startswith("-"))
+            self.assertEqual(seen, list(expected.values_list("id", flat=True)), ordering)
+            self.assertEqual(pages, 7)
+
+    @skipUnless(connection.vendor == "sqlite", "plan text is SQLite's")
+    def test_query_plans_use_the_composite_indexes(self):
+        tasks = Task.objects.filter(project_id=self.project)
+        cases = [
+            (filter_tasks(tasks, {"status": "pending"}), "task_project_status_priority"),
+            (filter_tasks(tasks, {"status": "pending,completed", "priority": "high"}), "task_project_status_priority"),
+            (filter_tasks(Task.objects.all(), {"assigned_to": str(self.users[4].id), "status": "pending"}), "task_assignee_status"),
+            (filter_tasks(tasks, {"branch": "b7"}), "task_project_branch"),
+            (order_tasks(filter_tasks(tasks, {"updated_since": "2020-01-01T00:00:00Z"}), "updated_at", True), "task_project_updated"),
+            (after_cursor(order_tasks(tasks, "updated_at", True), "updated_at", True,
+                          encode_cursor(timezone.now().isoformat(), 1000)), "task_project_updated"),
+            (order_tasks(tasks, "created_at", False), "task_project_created"),
+            (after_cursor(order_tasks(tasks, "created_at", True), "created_at", True,
+                          encode_cursor(timezone.now().isoformat(), 1000)), "task_project_created"),
+        ]
+        for queryset, index in cases:
+            plan = queryset[:50].explain()
+            self.assertIn(f"USING INDEX {index} ", plan)
+            self.assertNotIn("TEMP B-TREE", plan)
+
+
+class TaskExportTests(TestCase):
+    def setUp(self):
+        membership_cache.clear()
+        self.owner = CustomUser.objects.create_user(email="owner@example.com", github_username="owner")
+        self.project = Project.objects.create(name="export", created_by=self.owner)
+        Task.objects.bulk_create([
+            Task(project_id=self.project, title=f"t{i}", branch_name="b", created_by=self.owner,
+                 status="completed" if i % 3 == 0 else "pending")
+            for i in range(10)
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def test_export_takes_the_list_filters(self):
+        query = f"project_id={self.project.id}&status=completed&ordering=-id"
+        res = self.client.get(f"/api/tasks/export/?{query}&output=csv&fields=id,title,status")
+        self.assertTrue(res.streaming)
+        lines = b"".join(res.streaming_content).decode().splitlines()
+        listed = self.client.get(f"/api/tasks/create_task/?{query}").json()
+        self.assertEqual(lines[0], "id,title,status")
+        self.assertEqual(lines[1:], [f"{t['id']},{t['title']},completed" for t in listed])
+        self.assertEqual(len(lines), 5)
+
+        bad = self.client.get(f"/api/tasks/export/?project_id={self.project.id}&status=done")
+        self.assertEqual(bad.status_code, 400)
@@ -2,4 +2,6 @@ from django.urls import path
 from .views import *
 urlpatterns = [
     path('create_task/', TaskInitializeView.as_view(), name='create_task'),
+    path('batch/', TaskBatchUpdateView.as_view(), name='batch_update_tasks'),
+    path('export/', TaskExportView.as_view(), name='export_tasks'),
 ]
\ No newline at end of file
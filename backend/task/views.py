@@ -1,15 +1,25 @@
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from urllib3 import request
+from .batch import apply_changes, validate_changes
 from .models import Task
+from .query import filter_tasks, ordering_for, order_tasks, task_page
 from project.models import Project
-from .serializers import TaskSerializer , TaskwithuserSerializer
+from project.access import is_member
+from project.permissions import IsProjectMember
+from .serializers import TaskSerializer , FastTaskSerializer
+from backend.export import output_for, stream_export
+from backend.flexfields import flex_params
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 
 class TaskInitializeView(APIView):
+    permission_classes = [IsAuthenticated, IsProjectMember]
+
+    @transaction.atomic
     def post(self, request):
         project_id = request.query_params.get('project_id')
         if not project_id:
@@ -27,6 +37,12 @@ class TaskInitializeView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     def get(self, request):
+        """
+        The project's tasks. Filters (status, priority, assigned_to, branch,
+        updated_since) and ?ordering= are described in task.query; with
+        ?limit= or ?cursor= the response is one page, {"results",
+        "next_cursor"}, instead of the whole list.
+        """
         project_id = request.query_params.get('project_id')
         if not project_id:
             return Response({"error": "project_id query parameter is required"}, status=status.HTTP_400_BAD_REQUEST)
@@ -36,20 +52,91 @@ class TaskInitializeView(APIView):
         except Project.DoesNotExist:
             return Response({"error": "Project not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        tasks = Task.objects.filter(project_id=project)
-        serializer = TaskwithuserSerializer(tasks, many=True)
+        params = request.query_params
+        try:
+            tasks = filter_tasks(Task.objects.filter(project_id=project), params)
+            if 'limit' in params or 'cursor' in params:
+                return Response(task_page(tasks, params, **flex_params(request)), status=status.HTTP_200_OK)
+            tasks = order_tasks(tasks, *ordering_for(params))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # users are ids unless expanded, e.g. ?expand=assigned_to,created_by
+        serializer = FastTaskSerializer(tasks, **flex_params(request))
         return Response(serializer.data, status=status.HTTP_200_OK)
     
+    @transaction.atomic
     def put(self, request):
         pk = request.query_params.get("pk")
         task = get_object_or_404(Task, pk=pk)
+        # ?pk= names no project, so IsProjectMember let it through
+        if not is_member(request.user.pk, task.project_id_id):
+            return Response({"error": IsProjectMember.message}, status=status.HTTP_403_FORBIDDEN)
 
-        status = request.data.get("status")
-        if status not in ["pending", "in_progress", "completed"]:
+        new_status = request.data.get("status")
+        if new_status not in ["pending", "in_progress", "completed"]:
             return Response({"error": "Invalid status"}, status=status.HTTP_400_BAD_REQUEST)
-        task.status = status
+        task.status = new_status
         task.save()
         serializer = TaskSerializer(task)
 
         return Response(serializer.data, status=200)
 
+
+class TaskExportView(APIView):
+    """
+    GET ?project_id=N: the project's tasks as a streamed NDJSON or CSV
+    download (?output=, ?gzip=1, see backend.export). Takes the filters
+    and ?ordering= of the task list, and ?fields= / ?expand=.
+    """
+    permission_classes = [IsAuthenticated, IsProjectMember]
+
+    def get(self, request):
+        project_id = request.query_params.get('project_id')
+        if not project_id:
+            return Response({"error": "project_id query parameter is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        params = request.query_params
+        try:
+            output, gzip = output_for(params)
+            tasks = filter_tasks(Task.objects.filter(project_id=project_id), params)
+            tasks = order_tasks(tasks, *ordering_for(params))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return stream_export(
+            request, FastTaskSerializer(tasks, **flex_params(request)), f"project-{project_id}-tasks", output, gzip,
+        )
+
+
+MAX_BATCH_CHANGES = 500
+
+
+class TaskBatchUpdateView(APIView):
+    """
+    PATCH ?project_id=N with {"changes": [{"id", "status"?, "priority"?,
+    "assigned_to"?}, ...]}: every change is validated first and applied in
+    one transaction, or none is. Returns the updated tasks (?fields= and
+    ?expand= apply as on the task list).
+    """
+    permission_classes = [IsAuthenticated, IsProjectMember]
+
+    def patch(self, request):
+        project_id = request.query_params.get('project_id')
+        if not project_id:
+            return Response({"error": "project_id query parameter is required"}, status=status.HTTP_400_BAD_REQUEST)
+        changes = request.data.get("changes") if isinstance(request.data, dict) else None
+        if not changes or not isinstance(changes, list):
+            return Response({"error": "changes must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(changes) > MAX_BATCH_CHANGES:
+            return Response({"error": f"at most {MAX_BATCH_CHANGES} changes per request"}, status=status.HTTP_400_BAD_REQUEST)
+
+        updates, errors = validate_changes(project_id, changes)
+        if errors:
+            return Response({"error": "Some changes are invalid", "errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+        changed = apply_changes(updates)
+
+        tasks = Task.objects.filter(id__in=list(updates)).order_by('id')
+        return Response({
+            "changed": changed,
+            "tasks": FastTaskSerializer(tasks, **flex_params(request)).data,
+        }, status=status.HTTP_200_OK)
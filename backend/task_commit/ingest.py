@@ -0,0 +1,149 @@
+"""
+Batch ingestion of pipeline step records (clone/build/test/push) sent by
+the agent.
+
+Records are upserted on (project, commit_id, step), so an agent may resend
+a whole run after a timeout: steps that are already stored with the same
+values are reported as unchanged and not written again. The same commit
+may be ingested by several projects (forks) without clashing. Validation
+reads the referenced tasks once and nothing is written unless every
+record is valid; the stored steps are then read (and locked) once. New
+rows go in with one bulk_create, changed ones with one bulk_update,
+followed by a single commits_upserted signal in place of per-row
+post_save.
+"""
+from django.db import transaction
+
+from task.models import Task
+from .models import TaskCommit
+from .signals import commits_upserted
+
+COMMIT_ID_LENGTH = TaskCommit._meta.get_field("commit_id").max_length
+STEP_LENGTH = TaskCommit._meta.get_field("step").max_length
+# what a resend may overwrite; the (project, commit_id, step) key is fixed
+UPDATE_FIELDS = ("github_task", "message", "is_successful", "completed_by")
+ATTNAMES = {"github_task": "github_task_id", "completed_by": "completed_by_id"}
+
+WRITE_BATCH_SIZE = 500
+
+
+def _error(index, message, field=None):
+    error = {"index": index, "error": message}
+    if field is not None:
+        error["field"] = field
+    return error
+
+
+def _int(value):
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+
+def _clean(index, record):
+    """(values, error) for one record."""
+    if not isinstance(record, dict):
+        return None, _error(index, "Each record must be an object")
+    unknown = set(record) - {"github_task", "commit_id", "step", "message", "is_successful"}
+    if unknown:
+        return None, _error(index, f"Unknown fields: {', '.join(sorted(unknown))}")
+    if _int(record.get("github_task")) is None:
+        return None, _error(index, "github_task must be a task id", "github_task")
+    commit_id = record.get("commit_id")
+    if not isinstance(commit_id, str) or not commit_id or len(commit_id) > COMMIT_ID_LENGTH:
+        return None, _error(index, f"commit_id must be 1-{COMMIT_ID_LENGTH} characters", "commit_id")
+    step = record.get("step", "")
+    if not isinstance(step, str) or len(step) > STEP_LENGTH:
+        return None, _error(index, f"step must be at most {STEP_LENGTH} characters", "step")
+    message = record.get("message")
+    if not isinstance(message, str) or not message:
+        return None, _error(index, "message is required", "message")
+    is_successful = record.get("is_successful", False)
+    if not isinstance(is_successful, bool):
+        return None, _error(index, "is_successful must be a boolean", "is_successful")
+    return {
+        "github_task": record["github_task"],
+        "commit_id": commit_id,
+        "step": step,
+        "message": message,
+        "is_successful": is_successful,
+    }, None
+
+
+def validate_records(project_id, records):
+    """
+    Returns ({(commit_id, step): values}, errors). A record may repeat an
+    earlier (commit_id, step) in the same batch; the later one wins.
+    """
+    cleaned, errors = {}, []
+    for index, record in enumerate(records):
+        values, error = _clean(index, record)
+        if error:
+            errors.append(error)
+        else:
+            cleaned[index] = values
+
+    task_ids = {values["github_task"] for values in cleaned.values()}
+    tasks = set(Task.objects.filter(project_id=project_id, id__in=task_ids).values_list("id", flat=True))
+
+    records = {}
+    for index, values in cleaned.items():
+        key = (values["commit_id"], values["step"])
+        if values["github_task"] not in tasks:
+            errors.append(_error(index, "Task not found in this project", "github_task"))
+        else:
+            records[key] = values
+    errors.sort(key=lambda error: error["index"])
+    return records, errors
+
+
+def upsert_records(project_id, user_id, records):
+    """
+    Write validated ``records`` for ``project_id`` as ``user_id``; returns
+    {"created": [ids], "updated": [ids], "unchanged": [ids]}.
+    """
+    with transaction.atomic():
+        stored = {
+            (commit.commit_id, commit.step): commit
+            for commit in TaskCommit.objects.select_for_update().filter(
+                project_id=project_id, commit_id__in={commit_id for commit_id, _ in records},
+            ).order_by()
+            if (commit.commit_id, commit.step) in records
+        }
+        created, updated, unchanged = [], [], []
+        for key, values in records.items():
+            values = {**values, "completed_by": user_id}
+            commit = stored.get(key)
+            if commit is None:
+                created.append(TaskCommit(
+                    project_id_id=project_id, commit_id=key[0], step=key[1],
+                    **{ATTNAMES.get(field, field): values[field] for field in UPDATE_FIELDS},
+                ))
+                continue
+            dirty = [
+                field for field in UPDATE_FIELDS
+                if getattr(commit, ATTNAMES.get(field, field)) != values[field]
+            ]
+            if not dirty:
+                unchanged.append(commit)
+                continue
+            for field in dirty:
+                setattr(commit, ATTNAMES.get(field, field), values[field])
+            updated.append(commit)
+
+        if created:
+            # a concurrent request may have inserted the same step since the
+            # read above: let the newer values win instead of failing
+            TaskCommit.objects.bulk_create(
+                created, batch_size=WRITE_BATCH_SIZE, update_conflicts=True,
+                unique_fields=["project_id", "commit_id", "step"], update_fields=list(UPDATE_FIELDS),
+            )
+        if updated:
+            TaskCommit.objects.bulk_update(updated, list(UPDATE_FIELDS), batch_size=WRITE_BATCH_SIZE)
+        if created or updated:
+            commits_upserted.send(sender=TaskCommit, created=created, updated=updated)
+            for commit in created + updated:
+                commit.remember_values()
+    return {
+        "created": [commit.id for commit in created],
+        "updated": [commit.id for commit in updated],
+        "unchanged": [commit.id for commit in unchanged],
+    }
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:40
+
+import logging
+
+from django.db import migrations, models
+from django.db.models import Max
+
+logger = logging.getLogger(__name__)
+
+
+def drop_duplicates(apps, schema_editor):
+    """
+    Keep the latest row of each (project, commit_id, step) before it
+    becomes unique; what is dropped is logged, per project.
+    """
+    TaskCommit = apps.get_model("task_commit", "TaskCommit")
+    keep = (
+        TaskCommit.objects.order_by()
+        .values("project_id_id", "commit_id", "step")
+        .annotate(keep_id=Max("id"))
+        .values_list("keep_id", flat=True)
+    )
+    duplicates = list(
+        TaskCommit.objects.exclude(id__in=list(keep))
+        .order_by("id").values_list("id", "project_id_id", "commit_id", "step")
+    )
+    for row_id, project_id, commit_id, step in duplicates:
+        logger.warning(
+            "task_commit: dropping duplicate step %r of commit %s in project %s (row %s)",
+            step, commit_id, project_id, row_id,
+        )
+    if duplicates:
+        TaskCommit.objects.filter(id__in=[row[0] for row in duplicates]).delete()
+        logger.warning("task_commit: dropped %s duplicate commit step rows", len(duplicates))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task_commit', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='taskcommit',
+            constraint=models.UniqueConstraint(
+                fields=('project_id', 'commit_id', 'step'), name='task_commit_project_commit_step',
+            ),
+        ),
+    ]
@@ -2,7 +2,8 @@ from django.db import models
 from task.models import Task 
 from project.models import Project
 from user.models import CustomUser
-class TaskCommit(models.Model):
+from backend.tracking import LoadedValuesMixin
+class TaskCommit(LoadedValuesMixin, models.Model):
     github_task = models.ForeignKey(
         Task,
         on_delete=models.CASCADE,
@@ -32,3 +33,10 @@ class TaskCommit(models.Model):
 
     class Meta:
         ordering = ["created_at"]
+        constraints = [
+            # one row per pipeline step of a commit in a project; agents
+            # upsert on it (forks may share a commit across projects)
+            models.UniqueConstraint(
+                fields=["project_id", "commit_id", "step"], name="task_commit_project_commit_step",
+            ),
+        ]
@@ -1,15 +1,21 @@
 # serializers.py
 from rest_framework import serializers
 from .models import TaskCommit
-from user.serializers import Userserializer  # Fix import name
+from user.serializers import Userserializer, usserprofileSerializer  # Fix import name
+from task.serializers import TaskSerializer
+from backend.fastserializers import FastSerializer
+from backend.flexfields import FlexFieldsMixin
 
-class TaskCommitListSerializer(serializers.ModelSerializer):  # ✅ NEW for listing
-    completed_by = Userserializer(read_only=True)  # Nested user data
-    
+class TaskCommitListSerializer(FlexFieldsMixin, serializers.ModelSerializer):  # ✅ NEW for listing
     class Meta:
         model = TaskCommit
         fields = '__all__'  # All model fields including commit_id, is_successful, etc.
         read_only_fields = ('id', 'created_at')
+        # relations are ids unless expanded (?expand=completed_by)
+        expandable = {
+            'completed_by': usserprofileSerializer,
+            'github_task': TaskSerializer,
+        }
 
 class TaskCommitCreateSerializer(serializers.ModelSerializer):  # Keep for POST
     completed_by = Userserializer(read_only=True)
@@ -26,3 +32,7 @@ class TaskCommitSerializer(serializers.ModelSerializer):  # Keep for POST valida
         model = TaskCommit
         fields = "__all__"
         read_only_fields = ("id", "created_at")
+
+
+class FastTaskCommitListSerializer(FastSerializer):
+    serializer_class = TaskCommitListSerializer
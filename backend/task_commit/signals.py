@@ -0,0 +1,10 @@
+from django.dispatch import Signal
+
+# Sent after a batch ingestion (task_commit.ingest) in place of post_save,
+# with the inserted ``created`` commits and the overwritten ``updated``
+# ones; the latter's loaded_values still hold the previous values.
+commits_upserted = Signal()
+
+# Sent by the accept endpoint with the accepted ``commit`` (is_successful
+# set, unsaved) just before its task is deleted, taking the commit along.
+commit_accepted = Signal()
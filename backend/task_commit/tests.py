@@ -1,3 +1,291 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+from unittest import mock
 
-# Create your tests here.
+from django.test import AsyncClient, TestCase
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from project.access import membership_cache
+from project.models import OutboxEvent, Project, ProjectStats
+from project.stats import COUNTER_COLUMNS, rebuild_stats
+from analytics.models import ProjectDay
+from analytics.rollups import COLUMNS, rebuild_rollups
+from backend import export
+from backend.jsoncodec import loads
+from sync.models import Change
+from task.models import Task
+from user.models import CustomUser
+from .models import TaskCommit
+from .serializers import FastTaskCommitListSerializer, TaskCommitListSerializer
+
+
+class TaskCommitListTests(TestCase):
+    def test_fast_serializer_matches_drf_output(self):
+        user = CustomUser.objects.create_user(email="dev@example.com", github_username="dev")
+        project = Project.objects.create(name="commits", created_by=user)
+        task = Task.objects.create(project_id=project, title="t", branch_name="b", created_by=user)
+        for step in ("build", "test"):
+            TaskCommit.objects.create(
+                github_task=task, project_id=project, completed_by=user,
+                commit_id="abc123", message=f"{step} ok", step=step, is_successful=True,
+            )
+
+        commits = TaskCommit.objects.filter(project_id=project)
+        render = JSONRenderer().render
+        self.assertEqual(
+            render(FastTaskCommitListSerializer(commits).data),
+            render(TaskCommitListSerializer(commits, many=True).data),
+        )
+
+
+class CommitBatchIngestTests(TestCase):
+    def setUp(self):
+        membership_cache.clear()
+        self.owner = CustomUser.objects.create_user(email="owner@example.com", github_username="owner")
+        self.stranger = CustomUser.objects.create_user(email="stranger@example.com")
+        self.project = Project.objects.create(name="pipeline", created_by=self.owner)
+        self.other = Project.objects.create(name="elsewhere", created_by=self.stranger)
+        self.task = Task.objects.create(project_id=self.project, title="t", branch_name="b", created_by=self.owner)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def ingest(self, records):
+        return self.client.post(
+            f"/api/task_commit/commit_task/batch/?project_id={self.project.id}", {"records": records}, format="json",
+        )
+
+    def run_records(self, sha, test_ok=False):
+        return [
+            {"github_task": self.task.id, "commit_id": sha, "step": step, "message": f"{step} done",
+             "is_successful": step != "test" or test_ok}
+            for step in ("clone", "build", "test", "push")
+        ]
+
+    def counters(self):
+        stats = ProjectStats.objects.get(project=self.project)
+        return {column: getattr(stats, column) for column in COUNTER_COLUMNS}
+
+    def test_retries_are_idempotent(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.ingest(self.run_records("a" * 40))
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(len(first.data["created"]), 4)
+
+        changes, events = Change.objects.count(), OutboxEvent.objects.count()
+        with self.assertNumQueries(4):  # tasks, locked steps, savepoint pair
+            retry = self.ingest(self.run_records("a" * 40))
+        self.assertEqual((retry.data["created"], retry.data["updated"]), ([], []))
+        self.assertEqual(sorted(retry.data["unchanged"]), sorted(first.data["created"]))
+        self.assertEqual((Change.objects.count(), OutboxEvent.objects.count()), (changes, events))
+
+        fixed = self.ingest(self.run_records("a" * 40, test_ok=True))
+        test_row = TaskCommit.objects.get(commit_id="a" * 40, step="test")
+        self.assertEqual(fixed.data["updated"], [test_row.id])
+        self.assertTrue(test_row.is_successful)
+        self.assertEqual(TaskCommit.objects.count(), 4)
+
+        incremental = self.counters()
+        rebuild_stats([self.project.id])
+        self.assertEqual(incremental, self.counters())
+        self.assertEqual((incremental["commit_count"], incremental["successful_commit_count"]), (4, 4))
+
+    def test_later_duplicate_in_a_batch_wins(self):
+        records = self.run_records("b" * 40)
+        records.append({**records[0], "message": "clone retried"})
+        res = self.ingest(records)
+        self.assertEqual(len(res.data["created"]), 4)
+        self.assertEqual(TaskCommit.objects.get(commit_id="b" * 40, step="clone").message, "clone retried")
+
+    def test_statement_count_does_not_grow_with_batch_size(self):
+        def ingest(count, sha):
+            records = [
+                {"github_task": self.task.id, "commit_id": sha, "step": f"step{i}", "message": "ok"}
+                for i in range(count)
+            ]
+            with self.assertNumQueries(12):
+                # tasks, locked steps, INSERT, stats UPDATE,
+                # outbox and change-log INSERTs, an INSERT and an UPDATE per
+                # rollup table, and the savepoint pair
+                res = self.ingest(records)
+            self.assertEqual(len(res.data["created"]), count)
+
+        self.ingest(self.run_records("0" * 40))  # warms the membership cache
+        ingest(5, "c" * 40)
+        ingest(100, "d" * 40)
+
+    def test_invalid_batch_writes_nothing(self):
+        foreign_task = Task.objects.create(project_id=self.other, title="x", branch_name="x", created_by=self.stranger)
+        good = self.run_records("f" * 40)[0]
+        res = self.ingest([
+            good,
+            {**good, "github_task": foreign_task.id},
+            {**good, "commit_id": "x" * 41},
+            {**good, "is_successful": "yes"},
+            {**good, "author": "me"},
+            "clone",
+        ])
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual([(e["index"], e.get("field")) for e in res.data["errors"]], [
+            (1, "github_task"), (2, "commit_id"), (3, "is_successful"), (4, None), (5, None),
+        ])
+        self.assertFalse(TaskCommit.objects.filter(project_id=self.project).exists())
+        self.assertEqual(self.ingest([]).status_code, 400)
+
+    def test_projects_keep_their_own_steps_of_a_shared_commit(self):
+        fork_task = Task.objects.create(project_id=self.other, title="x", branch_name="x", created_by=self.stranger)
+        theirs = TaskCommit.objects.create(
+            github_task=fork_task, project_id=self.other, completed_by=self.stranger,
+            commit_id="e" * 40, message="theirs", step="build",
+        )
+        good = self.run_records("e" * 40)[0]
+        res = self.ingest([{**good, "step": "build", "message": "ours"}])
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(res.data["created"]), 1)
+        self.assertEqual(TaskCommit.objects.get(project_id=self.project, commit_id="e" * 40).message, "ours")
+        theirs.refresh_from_db()
+        self.assertEqual((theirs.message, theirs.completed_by), ("theirs", self.stranger))
+
+    def test_requires_membership(self):
+        self.client.force_authenticate(self.stranger)
+        self.assertEqual(self.ingest(self.run_records("a" * 40)).status_code, 403)
+
+
+class AcceptCommitTests(TestCase):
+    def setUp(self):
+        membership_cache.clear()
+        self.owner = CustomUser.objects.create_user(email="owner@example.com", github_username="owner")
+        self.project = Project.objects.create(name="review", created_by=self.owner)
+        self.task = Task.objects.create(project_id=self.project, title="t", branch_name="b", created_by=self.owner)
+        self.keep = Task.objects.create(project_id=self.project, title="k", branch_name="k", created_by=self.owner)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def test_accept_removes_the_task_and_its_commit_everywhere(self):
+        self.enterContext(mock.patch("sync.log.SETTLE_SECONDS", 0))
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(
+                f"/api/task_commit/commit_task/?project_id={self.project.id}",
+                {"github_task": self.task.id, "project_id": self.project.id, "completed_by": self.owner.id,
+                 "commit_id": "a" * 40, "message": "fix", "step": "push"},
+                format="json",
+            )
+        self.assertEqual(res.status_code, 201)
+        commit_id = res.data["id"]
+        cursor = self.client.get("/api/sync/", {"project_id": self.project.id}).data["cursor"]
+        OutboxEvent.objects.all().delete()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(f"/api/task_commit/task_request/accept/?commit_id={'a' * 40}")
+        self.assertEqual(res.status_code, 200)
+        self.assertFalse(Task.objects.filter(id=self.task.id).exists())
+        self.assertFalse(TaskCommit.objects.exists())
+
+        body = self.client.get("/api/sync/", {"project_id": self.project.id, "cursor": cursor}).data
+        self.assertEqual(body["deleted"], {"tasks": [self.task.id], "commits": [commit_id]})
+        self.assertEqual((body["tasks"], body["commits"]), ([], []))
+
+        events = [(row.event["type"], row.event["id"]) for row in OutboxEvent.objects.order_by("id")]
+        self.assertIn(("task_deleted", self.task.id), events)
+        self.assertIn(("commit_deleted", commit_id), events)
+        self.assertNotIn(("commit_updated", commit_id), events)
+
+        incremental = {column: getattr(ProjectStats.objects.get(project=self.project), column) for column in COUNTER_COLUMNS}
+        rebuild_stats([self.project.id])
+        self.assertEqual(
+            incremental, {column: getattr(ProjectStats.objects.get(project=self.project), column) for column in COUNTER_COLUMNS},
+        )
+        self.assertEqual(incremental["commit_count"], 0)
+
+        rollups = list(ProjectDay.objects.values_list(*COLUMNS))
+        rebuild_rollups([self.project.id])
+        self.assertEqual(list(ProjectDay.objects.values_list(*COLUMNS)), rollups)
+        # the accepted task and its successful commit stay in the history
+        day = ProjectDay.objects.get()
+        self.assertEqual((day.tasks_created, day.commits, day.successful_commits), (2, 1, 1))
+
+    def test_accept_and_deny_require_membership(self):
+        TaskCommit.objects.create(
+            github_task=self.task, project_id=self.project, completed_by=self.owner,
+            commit_id="b" * 40, message="fix", step="push",
+        )
+        self.client.force_authenticate(CustomUser.objects.create_user(email="stranger@example.com"))
+        for action in ("accept", "deny"):
+            res = self.client.post(f"/api/task_commit/task_request/{action}/?commit_id={'b' * 40}")
+            self.assertEqual(res.status_code, 403, action)
+        self.assertTrue(TaskCommit.objects.filter(commit_id="b" * 40).exists())
+        self.assertEqual(Task.objects.get(id=self.task.id).status, self.task.status)
+
+
+class CommitExportTests(TestCase):
+    def setUp(self):
+        membership_cache.clear()
+        self.owner = CustomUser.objects.create_user(email="owner@example.com", github_username="owner")
+        self.project = Project.objects.create(name="audit", created_by=self.owner)
+        task = Task.objects.create(project_id=self.project, title="t", branch_name="b", created_by=self.owner)
+        TaskCommit.objects.bulk_create([
+            TaskCommit(
+                github_task=task, project_id=self.project, completed_by=self.owner,
+                commit_id=f"{i:040x}", message=f"step {i}, \"quoted\"\nline", step="build", is_successful=i % 2 == 0,
+            )
+            for i in range(25)
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def export(self, query=""):
+        res = self.client.get(f"/api/task_commit/commit_task/export/?project_id={self.project.id}{query}")
+        self.assertTrue(res.streaming)
+        return res, b"".join(res.streaming_content)
+
+    def test_ndjson_matches_the_commit_list(self):
+        listed = self.client.get(
+            f"/api/task_commit/commit_task/?project_id={self.project.id}&expand=completed_by"
+        ).json()
+        # small chunks: rows are read and encoded a few at a time
+        with mock.patch.object(export, "CHUNK_SIZE", 4):
+            res, body = self.export("&expand=completed_by")
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        self.assertIn(f'filename="project-{self.project.id}-commits.ndjson"', res["Content-Disposition"])
+        self.assertEqual([loads(line) for line in body.splitlines()], listed)
+
+    def test_csv_flattens_expanded_users(self):
+        res, body = self.export("&output=csv&expand=completed_by&fields=id,message,is_successful,completed_by")
+        self.assertEqual(res["Content-Type"], "text/csv; charset=utf-8")
+        rows = list(csv.reader(io.StringIO(body.decode())))
+        self.assertEqual(rows[0][:4], ["id", "message", "is_successful", "completed_by.id"])
+        self.assertIn("completed_by.email", rows[0])
+        self.assertEqual(len(rows), 26)
+        self.assertEqual(rows[1][1], 'step 0, "quoted"\nline')
+        self.assertEqual(rows[1][rows[0].index("completed_by.email")], "owner@example.com")
+
+    def test_gzip_output(self):
+        plain = self.export()[1]
+        res, body = self.export("&gzip=1")
+        self.assertEqual(res["Content-Type"], "application/gzip")
+        self.assertTrue(res["Content-Disposition"].endswith('.ndjson.gz"'))
+        self.assertEqual(gzip.decompress(body), plain)
+
+    async def test_streams_incrementally_under_asgi(self):
+        auth = {"Authorization": f"Bearer {AccessToken.for_user(self.owner)}"}
+        encoded = []
+        dumps, buffered = export.jsoncodec.dumps, export.buffered
+        self.enterContext(mock.patch.object(export, "buffered", lambda pieces: buffered(pieces, size=1)))
+        with mock.patch.object(export, "CHUNK_SIZE", 4), \
+                mock.patch.object(export.jsoncodec, "dumps", side_effect=lambda row: encoded.append(row) or dumps(row)):
+            res = await AsyncClient().get(
+                f"/api/task_commit/commit_task/export/?project_id={self.project.id}", headers=auth,
+            )
+            self.assertTrue(res.is_async)
+            pieces = aiter(res.streaming_content)
+            first = await anext(pieces)
+            # one piece out means a few rows read, not the whole table
+            self.assertLess(len(encoded), 25)
+            body = first + b"".join([piece async for piece in pieces])
+        self.assertEqual(len(body.splitlines()), 25)
+
+    def test_rejects_unknown_output(self):
+        res = self.client.get(f"/api/task_commit/commit_task/export/?project_id={self.project.id}&output=xml")
+        self.assertEqual(res.status_code, 400)
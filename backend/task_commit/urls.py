@@ -4,6 +4,8 @@ from . import views
 urlpatterns = [
     # Existing patterns
     path('commit_task/', views.TaskInitializeView.as_view(), name='commit_task'),
+    path('commit_task/batch/', views.CommitBatchIngestView.as_view(), name='commit_task_batch'),
+    path('commit_task/export/', views.CommitExportView.as_view(), name='commit_task_export'),
     
     # ✅ ADD THESE TWO:
     path('task_request/accept/', views.acceptcommit, name='accept_commit'),
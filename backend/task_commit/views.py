@@ -1,16 +1,23 @@
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
+from .ingest import upsert_records, validate_records
 from .models import TaskCommit
+from .signals import commit_accepted
 from .serializers import *
+from backend.export import output_for, stream_export
+from backend.flexfields import flex_params
 from task.models import Task
 from project.models import Project
+from project.access import is_member
+from project.permissions import IsProjectMember
 # views.py
 class TaskInitializeView(APIView):
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, IsProjectMember]
 
     def get(self, request):
         project_id = request.query_params.get("project_id")
@@ -18,9 +25,11 @@ class TaskInitializeView(APIView):
             return Response({"error": "project_id required"}, status=status.HTTP_400_BAD_REQUEST)
             
         task_commits = TaskCommit.objects.filter(project_id=project_id)
-        serializer = TaskCommitListSerializer(task_commits, many=True)  # ✅ List serializer
+        # ?fields= / ?expand=completed_by,github_task
+        serializer = FastTaskCommitListSerializer(task_commits, **flex_params(request))
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    @transaction.atomic
     def post(self, request):
         project_id = request.query_params.get("project_id")
         if not project_id:
@@ -35,14 +44,69 @@ class TaskInitializeView(APIView):
         serializer.is_valid(raise_exception=True)
         serializer.save(project_id=project, completed_by=request.user)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
+class CommitExportView(APIView):
+    """
+    GET ?project_id=N: the project's whole commit history as a streamed
+    NDJSON or CSV download (?output=, ?gzip=1, see backend.export), oldest
+    first; ?fields= and ?expand= apply as on the commit list.
+    """
+    permission_classes = [IsAuthenticated, IsProjectMember]
+
+    def get(self, request):
+        project_id = request.query_params.get("project_id")
+        if not project_id:
+            return Response({"error": "project_id required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            output, gzip = output_for(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        commits = TaskCommit.objects.filter(project_id=project_id).order_by("id")
+        return stream_export(
+            request, FastTaskCommitListSerializer(commits, **flex_params(request)),
+            f"project-{project_id}-commits", output, gzip,
+        )
+
+
+MAX_BATCH_RECORDS = 1000
+
+
+class CommitBatchIngestView(APIView):
+    """
+    POST ?project_id=N with {"records": [{"github_task", "commit_id",
+    "step", "message", "is_successful"?}, ...]}: pipeline steps upserted on
+    (project, commit_id, step), all or none. Safe to retry; returns the ids of the
+    created, updated and unchanged rows.
+    """
+    permission_classes = [IsAuthenticated, IsProjectMember]
+
+    def post(self, request):
+        project_id = request.query_params.get("project_id")
+        if not project_id:
+            return Response({"error": "project_id required"}, status=status.HTTP_400_BAD_REQUEST)
+        records = request.data.get("records") if isinstance(request.data, dict) else None
+        if not records or not isinstance(records, list):
+            return Response({"error": "records must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(records) > MAX_BATCH_RECORDS:
+            return Response({"error": f"at most {MAX_BATCH_RECORDS} records per request"}, status=status.HTTP_400_BAD_REQUEST)
+
+        records, errors = validate_records(project_id, records)
+        if errors:
+            return Response({"error": "Some records are invalid", "errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(upsert_records(int(project_id), request.user.id, records), status=status.HTTP_200_OK)
+
+
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
+@transaction.atomic
 def acceptcommit(request):
     commit_id = request.query_params.get("commit_id")
     if not commit_id:
         return Response({"error": "commit_id required"}, status=status.HTTP_400_BAD_REQUEST)
     
     task_commit = get_object_or_404(TaskCommit, commit_id=commit_id)
+    if not is_member(request.user.pk, task_commit.project_id_id):
+        return Response({"error": IsProjectMember.message}, status=status.HTTP_403_FORBIDDEN)
     
     # ✅ Safely get task
     if not task_commit.github_task:
@@ -51,17 +115,21 @@ def acceptcommit(request):
     task_id = task_commit.github_task.id
     task = get_object_or_404(Task, id=task_id)
     
-    task.delete()
+    # not saved: deleting the task cascades to its commits anyway
     task_commit.is_successful = True
-    task_commit.save()
+    commit_accepted.send(sender=TaskCommit, commit=task_commit)
+    task.delete()
     
     return Response({"message": "Commit accepted and task deleted."}, status=status.HTTP_200_OK)
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
+@transaction.atomic
 def denycommit(request):
     commit_id = request.query_params.get("commit_id")  # Fix typo
     task_commit = get_object_or_404(TaskCommit, commit_id=commit_id)
+    if not is_member(request.user.pk, task_commit.project_id_id):
+        return Response({"error": IsProjectMember.message}, status=status.HTTP_403_FORBIDDEN)
     task_id = task_commit.github_task.id if hasattr(task_commit.github_task, 'id') else task_commit.github_task
     task = get_object_or_404(Task, id=task_id)  # Fix: Task_id → id
     task.status = "pending"
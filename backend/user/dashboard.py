@@ -0,0 +1,122 @@
+"""
+Versioned caching for the /api/user/me/ dashboard.
+
+Every user has a version in the Django cache. Signals (see
+user.signals) bump it for each user whose dashboard a write can change;
+the rendered body is cached under (user, version) and its ETag is
+derived from the version, so an unchanged dashboard costs a version
+lookup plus a body lookup (or nothing at all, on a 304).
+
+Versions are clock readings, set afresh on every bump rather than
+counted up from 0, so a version that was evicted never comes back as a
+value an old ETag or body was stored under.
+
+The cache is the DASHBOARD_CACHE alias, which must be shared by every
+worker (Redis, or the database cache without it): with a per-process
+cache a bump made in one worker is never seen by the others, which keep
+serving stale bodies and 304s. With DASHBOARD_CACHE = None versioning is
+off and every request renders the dashboard fresh.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Q
+
+DASHBOARD_CACHE_TTL = getattr(settings, "DASHBOARD_CACHE_TTL", 60 * 60)
+
+
+def dashboard_cache():
+    """The shared cache named by DASHBOARD_CACHE, or None when caching is off."""
+    alias = getattr(settings, "DASHBOARD_CACHE", None)
+    return caches[alias] if alias else None
+
+
+def _version_key(user_id):
+    return f"dashboard:version:{user_id}"
+
+
+def _body_key(user_id, version):
+    return f"dashboard:body:{user_id}:{version}"
+
+
+def dashboard_version(user_id):
+    """The user's current version; None when caching is off."""
+    cache = dashboard_cache()
+    if cache is None:
+        return None
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump(user_ids):
+    cache = dashboard_cache()
+    # a fresh value rather than incr(): outside Redis incr() is a read and
+    # a write, and two bumps racing through it would land on one version
+    cache.set_many({_version_key(user_id): time.time_ns() for user_id in user_ids}, timeout=None)
+
+
+def bump_dashboards(user_ids):
+    """
+    Invalidate the dashboards of ``user_ids`` once the current
+    transaction commits, so a concurrent read can't cache pre-commit
+    data under the new version.
+    """
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if user_ids and dashboard_cache() is not None:
+        transaction.on_commit(lambda: _bump(user_ids))
+
+
+def project_audience(project_ids):
+    """Users whose dashboard shows any of ``project_ids``."""
+    from joinrequest.models import JoinRequest
+    from project.models import Project
+
+    project_ids = list(project_ids)
+    if not project_ids:
+        return set()
+    users = set(
+        Project.objects.filter(id__in=project_ids).values_list("created_by_id", flat=True)
+    )
+    users.update(
+        Project.contributors.through.objects.filter(project_id__in=project_ids)
+        .values_list("customuser_id", flat=True)
+    )
+    # join requests nest the whole project
+    users.update(
+        JoinRequest.objects.filter(project_id__in=project_ids).values_list("receiver_id", flat=True)
+    )
+    return users
+
+
+def user_audience(user_id):
+    """Users whose dashboard shows ``user_id``'s profile."""
+    from joinrequest.models import JoinRequest
+    from project.models import Project
+
+    project_ids = Project.objects.filter(
+        Q(created_by_id=user_id) | Q(contributors__id=user_id)
+    ).values_list("id", flat=True).distinct()
+    users = project_audience(project_ids)
+    users.update(
+        JoinRequest.objects.filter(sender_id=user_id).values_list("receiver_id", flat=True)
+    )
+    users.add(user_id)
+    return users
+
+
+def etag_for(user_id, version):
+    return f'"{user_id}-{version}"'
+
+
+def cached_body(user_id, version):
+    return dashboard_cache().get(_body_key(user_id, version))
+
+
+def store_body(user_id, version, body):
+    dashboard_cache().set(_body_key(user_id, version), body, timeout=DASHBOARD_CACHE_TTL)
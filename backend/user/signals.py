@@ -0,0 +1,55 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from joinrequest.models import JoinRequest
+from project.models import Project
+from project.signals import membership_changed
+from task.models import Task
+from task.signals import tasks_updated
+from .dashboard import bump_dashboards, dashboard_cache, project_audience, user_audience
+from .models import CustomUser
+
+
+@receiver(post_save, sender=Project)
+@receiver(pre_delete, sender=Project)
+def bump_on_project_change(sender, instance, **kwargs):
+    if dashboard_cache() is None:
+        return  # no versions to bump; skip the audience queries
+    # pre_delete: the audience is still readable before the cascade
+    bump_dashboards(project_audience([instance.pk]))
+
+
+@receiver(membership_changed)
+def bump_on_membership_change(sender, project_ids, user_ids, **kwargs):
+    if dashboard_cache() is None:
+        return
+    # removed users are no longer in the audience, hence user_ids
+    bump_dashboards(project_audience(project_ids) | set(user_ids))
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def bump_on_task_change(sender, instance, **kwargs):
+    # a reassigned task leaves the previous assignee's dashboard too
+    bump_dashboards({instance.assigned_to_id, instance.loaded_values.get("assigned_to_id")})
+
+
+@receiver(tasks_updated)
+def bump_on_task_bulk_update(sender, tasks, **kwargs):
+    bump_dashboards(
+        {task.assigned_to_id for task in tasks} | {task.loaded_values.get("assigned_to_id") for task in tasks}
+    )
+
+
+@receiver(post_save, sender=JoinRequest)
+@receiver(post_delete, sender=JoinRequest)
+def bump_on_join_request_change(sender, instance, **kwargs):
+    bump_dashboards({instance.receiver_id})
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(pre_delete, sender=CustomUser)
+def bump_on_user_change(sender, instance, update_fields=None, **kwargs):
+    if dashboard_cache() is None or update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    bump_dashboards(user_audience(instance.pk))
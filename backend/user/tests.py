@@ -1,3 +1,164 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from joinrequest.models import JoinRequest
+from project.models import Project
+from task.models import Task
+from .models import CustomUser
+
+
+class UserInfoTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email="me@example.com", github_username="me")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.others = [
+            CustomUser.objects.create_user(email=f"other{i}@example.com", github_username=f"other{i}")
+            for i in range(3)
+        ]
+
+    def add_projects(self, count, start=0):
+        # dashboard versions are bumped on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            self._add_projects(count, start)
+
+    def _add_projects(self, count, start):
+        for i in range(start, start + count):
+            owned = Project.objects.create(name=f"owned {i}", created_by=self.user)
+            owned.contributors.add(*self.others)
+            theirs = Project.objects.create(name=f"theirs {i}", created_by=self.others[0])
+            theirs.contributors.add(self.user, *self.others[1:])
+            Task.objects.create(
+                project_id=theirs, title=f"task {i}", branch_name=f"b{i}",
+                assigned_to=self.user, created_by=self.others[0],
+            )
+            JoinRequest.objects.create(
+                project=theirs, sender=self.others[0], receiver=self.user, content="join us",
+            )
+
+    def get_info(self):
+        return self.client.get("/api/user/me/")
+
+    @override_settings(DASHBOARD_CACHE=None)  # counts the render, not the cache
+    def test_query_count_does_not_grow_with_projects(self):
+        self.add_projects(1)
+        with self.assertNumQueries(7):
+            self.get_info()
+
+        self.add_projects(10, start=1)
+        with self.assertNumQueries(7):
+            res = self.get_info()
+
+        self.assertEqual(len(res.json()["owned_projects"]), 11)
+        self.assertEqual(len(res.json()["contributed_projects"]), 11)
+        self.assertEqual(len(res.json()["assigned_tasks"]), 11)
+        self.assertEqual(len(res.json()["join_requests"]), 11)
+
+    def test_payload_shape(self):
+        self.add_projects(1)
+        res = self.get_info()
+        self.assertEqual(res.status_code, 200)
+        owned = res.json()["owned_projects"][0]
+        self.assertEqual(owned["created_by"]["email"], "me@example.com")
+        self.assertEqual(
+            sorted(c["email"] for c in owned["contributors"]),
+            sorted(u.email for u in self.others),
+        )
+        join = res.json()["join_requests"][0]
+        self.assertEqual(join["sender"]["github_username"], "other0")
+        self.assertEqual(join["project"]["created_by"]["id"], self.others[0].id)
+        self.assertEqual(len(join["project"]["contributors"]), 3)
+
+
+@override_settings(DASHBOARD_CACHE="default")
+class DashboardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email="me@example.com", github_username="me")
+        self.other = CustomUser.objects.create_user(email="other@example.com", github_username="other")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project = Project.objects.create(name="shared", created_by=self.other)
+            self.project.contributors.add(self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_info(self, etag=None):
+        headers = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+        return self.client.get("/api/user/me/", **headers)
+
+    def test_unchanged_dashboard_is_served_from_cache(self):
+        first = self.get_info()
+        self.assertEqual(first.status_code, 200)
+        with self.assertNumQueries(0):
+            second = self.get_info()
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["ETag"], first["ETag"])
+
+    def test_matching_etag_gets_304(self):
+        etag = self.get_info()["ETag"]
+        with self.assertNumQueries(0):
+            res = self.get_info(etag)
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res["ETag"], etag)
+
+    def test_related_writes_change_the_etag(self):
+        etag = self.get_info()["ETag"]
+        writes = [
+            lambda: Task.objects.create(
+                project_id=self.project, title="t", branch_name="b",
+                assigned_to=self.user, created_by=self.other,
+            ),
+            lambda: JoinRequest.objects.create(
+                project=self.project, sender=self.other, receiver=self.user, content="hi",
+            ),
+            lambda: self.project.contributors.add(
+                CustomUser.objects.create_user(email="new@example.com")
+            ),
+            lambda: Project.objects.filter(pk=self.project.pk).first().save(),
+            lambda: self.project.contributors.remove(self.user),
+        ]
+        for write in writes:
+            with self.captureOnCommitCallbacks(execute=True):
+                write()
+            res = self.get_info(etag)
+            self.assertEqual(res.status_code, 200)
+            self.assertNotEqual(res["ETag"], etag)
+            etag = res["ETag"]
+        self.assertEqual(res.json()["contributed_projects"], [])
+
+    def test_unrelated_writes_keep_the_etag(self):
+        etag = self.get_info()["ETag"]
+        stranger = CustomUser.objects.create_user(email="stranger@example.com")
+        with self.captureOnCommitCallbacks(execute=True):
+            Project.objects.create(name="elsewhere", created_by=stranger)
+        self.assertEqual(self.get_info(etag).status_code, 304)
+
+
+    @override_settings(DASHBOARD_CACHE="shared", CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "shared": {"BACKEND": "django.core.cache.backends.db.DatabaseCache", "LOCATION": "django_cache"},
+    })
+    def test_database_cache_without_redis(self):
+        etag = self.get_info()["ETag"]
+        self.assertEqual(self.get_info(etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(
+                project_id=self.project, title="t", branch_name="b", assigned_to=self.user, created_by=self.other,
+            )
+        res = self.get_info(etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self.get_info(res["ETag"]).status_code, 304)
+
+    @override_settings(DASHBOARD_CACHE=None)
+    def test_without_a_shared_cache_every_request_is_fresh(self):
+        cache.clear()
+        first = self.get_info()
+        self.assertNotIn("ETag", first)
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(
+                project_id=self.project, title="t", branch_name="b", assigned_to=self.user, created_by=self.other,
+            )
+        self.assertEqual(len(self.get_info().json()["assigned_tasks"]), 1)
+        self.assertIsNone(cache.get(f"dashboard:version:{self.user.id}"))
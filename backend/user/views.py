@@ -11,10 +11,12 @@ from project.serializers import ProjectSerializer
 from task.models import Task
 from task.serializers import TaskSerializer
 from .models import CustomUser as MyUser
+from .dashboard import cached_body, dashboard_version, etag_for, store_body
 import requests
 from django.conf import settings
 from django.shortcuts import redirect
-from django.http import JsonResponse
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
+from django.utils.http import parse_etags
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.tokens import RefreshToken
 
@@ -37,36 +39,84 @@ def MyUserView(request):
     return Response({'error': 'Method not allowed'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
 
+# the dashboard renders related users in full (public profile fields)
+DASHBOARD_PROJECT_EXPAND = {'created_by', 'contributors'}
+DASHBOARD_JOIN_REQUEST_EXPAND = {
+    'sender', 'receiver', 'project.created_by', 'project.contributors',
+}
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_user_info(request):
+    """
+    The signed-in user's dashboard. With a shared DASHBOARD_CACHE,
+    responses carry an ETag tied to the user's dashboard version (see
+    user.dashboard): a matching If-None-Match gets a 304, and unchanged
+    JSON bodies come from cache.
+    """
     user = request.user
+    version = dashboard_version(user.id)
+    if version is None:
+        return Response(_dashboard_data(user), status=status.HTTP_200_OK)
+    etag = etag_for(user.id, version)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+    if if_none_match and (etag in parse_etags(if_none_match) or if_none_match.strip() == "*"):
+        return HttpResponseNotModified(headers=headers)
+
+    renderer = request.accepted_renderer
+    if renderer.format != "json":
+        # browsable API: render fresh
+        return Response(_dashboard_data(user), status=status.HTTP_200_OK, headers=headers)
+
+    body = cached_body(user.id, version)
+    if body is None:
+        body = renderer.render(_dashboard_data(user), request.accepted_media_type)
+        store_body(user.id, version, body)
+    return HttpResponse(body, content_type=renderer.media_type, headers=headers)
+
+
+def _dashboard_data(user):
     user_id = user.id
 
-    # Fetch user-owned and contributed projects
-    projects = Project.objects.filter(created_by=user)
-    contributed_projects = Project.objects.filter(contributors=user).exclude(created_by=user)
+    # Fetch user-owned and contributed projects; the nested serializers
+    # read created_by and contributors, so load them set-wise up front
+    # (query count stays constant however many projects the user has)
+    projects = Project.objects.filter(created_by=user).select_related(
+        'created_by'
+    ).prefetch_related('contributors')
+    contributed_projects = Project.objects.filter(contributors=user).exclude(
+        created_by=user
+    ).select_related('created_by').prefetch_related('contributors')
 
     # Fetch assigned tasks
     assigned_tasks = Task.objects.filter(assigned_to=user)
 
     # Fetch join requests where the user is the receiver
-    join_requests = JoinRequest.objects.filter(receiver_id=user_id)
-    join_request_data = JoindtSerializer(join_requests, many=True).data
+    join_requests = JoinRequest.objects.filter(receiver_id=user_id).select_related(
+        'sender', 'receiver', 'project__created_by'
+    ).prefetch_related('project__contributors')
+    join_request_data = JoindtSerializer(
+        join_requests, many=True, expand=DASHBOARD_JOIN_REQUEST_EXPAND
+    ).data
 
     # Serialize everything
     user_data = MyUserSerializer(user).data
-    owned = ProjectSerializer(projects, many=True).data
-    contributed = ProjectSerializer(contributed_projects, many=True).data
+    owned = ProjectSerializer(projects, many=True, expand=DASHBOARD_PROJECT_EXPAND).data
+    contributed = ProjectSerializer(
+        contributed_projects, many=True, expand=DASHBOARD_PROJECT_EXPAND
+    ).data
     tasks = TaskSerializer(assigned_tasks, many=True).data
 
-    return Response({
+    return {
         "user": user_data,
         "owned_projects": owned,
         "contributed_projects": contributed,
         "assigned_tasks": tasks,
         "join_requests": join_request_data,     # <-- added here
-    }, status=status.HTTP_200_OK)
+    }
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
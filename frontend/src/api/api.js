@@ -30,4 +30,8 @@ api.interceptors.response.use(
   }
 );
 
+// Related users come back as ids unless expanded; the project pages render
+// the owner, contributors and task assignees/creators in full.
+export const PROJECT_EXPAND = "created_by,contributors,assigned_to";
+
 export default api;
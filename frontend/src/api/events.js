@@ -0,0 +1,39 @@
+import { useEffect, useRef } from "react";
+
+// Live task/commit events for one project over the multiplexed socket
+// (ws/stream/, "events" stream). Each event carries the changed row in the
+// list endpoints' shape, so callers update local state instead of refetching.
+// Returns a ref that is true while the subscription is live.
+export function useProjectEvents(projectId, onEvent) {
+  const handlerRef = useRef(onEvent);
+  const liveRef = useRef(false);
+  handlerRef.current = onEvent;
+
+  useEffect(() => {
+    const token = localStorage.getItem("access");
+    if (!projectId || !token) return;
+    const WS_BASE_URL = import.meta.env.VITE_WS_BASE_URL ||
+      `${window.location.protocol === "https:" ? "wss" : "ws"}://${window.location.host}`;
+    const socket = new WebSocket(`${WS_BASE_URL}/ws/stream/?token=${token}`);
+    const id = Number(projectId);
+
+    socket.onopen = () => {
+      socket.send(JSON.stringify({ action: "subscribe", stream: "events", project_id: id }));
+    };
+    socket.onmessage = (message) => {
+      const data = JSON.parse(message.data);
+      if (data.stream !== "events" || data.project_id !== id) return;
+      if (data.type === "subscribed") {
+        liveRef.current = true;
+      } else {
+        handlerRef.current(data);
+      }
+    };
+    socket.onclose = () => {
+      liveRef.current = false;
+    };
+    return () => socket.close();
+  }, [projectId]);
+
+  return liveRef;
+}
@@ -4,6 +4,14 @@ import { useParams } from "react-router-dom";
 import ProjectChatsList from "./ProjectChatsList";
 import api from "../../api/api";
 
+// a chatapp_home page (newest-first, senders listed once) as oldest-first messages
+const historyPage = (data) => {
+  const senders = data.senders || {};
+  return (data.messages || [])
+    .map((m) => ({ ...m, sender: senders[m.sender_id] }))
+    .reverse();
+};
+
 const ChatPage = () => {
   const { projectId: urlProjectId } = useParams();
   const [selectedProjectId, setSelectedProjectId] = useState(urlProjectId || null);
@@ -15,12 +23,19 @@ const ChatPage = () => {
   const [isConnecting, setIsConnecting] = useState(false);
   const messagesEndRef = useRef(null);
   const wsRef = useRef(null);
+  const lastSeqRef = useRef(0);
+  const [historyVersion, setHistoryVersion] = useState(0);
+  // cursor for the next older page (the API's next_before), null when none is left
+  const [olderCursor, setOlderCursor] = useState(null);
+  const [loadingOlder, setLoadingOlder] = useState(false);
+  const keepScrollRef = useRef(false);
 
   // ✅ Receives PROJECT NAME from ProjectChatsList
   const handleProjectSelect = useCallback((projectId, projectData) => {
     setSelectedProjectId(projectId);
     setSelectedProjectName(projectData?.name || `Project #${projectId}`); // ✅ SETS PROJECT NAME
     setMessages([]);
+    setOlderCursor(null);
   }, []);
 
   // ... rest of your effects (unchanged) ...
@@ -30,14 +45,35 @@ const ChatPage = () => {
     const fetchMessages = async () => {
       try {
         const res = await api.get(`/chat/chatapp_home/?project_id=${selectedProjectId}`);
-        setMessages(res.data.messages || []);
+        const page = historyPage(res.data);
+        lastSeqRef.current = Math.max(0, ...page.map((m) => m.seq || 0));
+        setMessages(page);
+        setOlderCursor(res.data.has_more ? res.data.next_before : null);
       } catch (err) {
         console.error("Error fetching messages", err);
         setMessages([]);
+        setOlderCursor(null);
       }
     };
+    lastSeqRef.current = 0;
     fetchMessages();
-  }, [selectedProjectId]);
+  }, [selectedProjectId, historyVersion]);
+
+  const loadOlder = async () => {
+    if (olderCursor == null || loadingOlder) return;
+    setLoadingOlder(true);
+    try {
+      const res = await api.get(`/chat/chatapp_home/?project_id=${selectedProjectId}&before=${olderCursor}`);
+      const page = historyPage(res.data);
+      keepScrollRef.current = true;
+      setMessages((prev) => [...page.filter((m) => !prev.some((p) => p.id === m.id)), ...prev]);
+      setOlderCursor(res.data.has_more ? res.data.next_before : null);
+    } catch (err) {
+      console.error("Error fetching older messages", err);
+    } finally {
+      setLoadingOlder(false);
+    }
+  };
 
   useEffect(() => {
     if (!selectedProjectId || selectedProjectId === -1) {
@@ -51,35 +87,57 @@ const ChatPage = () => {
       `${window.location.protocol === "https:" ? "wss" : "ws"}://${window.location.host}`;
     const socketUrl = `${WS_BASE_URL}/ws/chat/${selectedProjectId}/?token=${token}`;
     
-    if (wsRef.current) wsRef.current.close();
-    const socket = new WebSocket(socketUrl);
-    wsRef.current = socket;
+    let closedByUs = false;
+    let retryTimer = null;
 
-    socket.onopen = () => {
-      console.log("WebSocket connected");
-      setIsConnecting(false);
-    };
-    socket.onmessage = (event) => {
-      try {
-        const data = JSON.parse(event.data);
-        if (data.type === "connection_success") setCurrentUser(data.user);
-        else if (data.type === "chat_message") setMessages((prev) => [...prev, data]);
-      } catch (e) {
-        console.error("WS parse error", e);
-      }
-    };
-    socket.onerror = (e) => {
-      console.error("WebSocket error", e);
-      setIsConnecting(false);
+    // append live/replayed messages, skipping ones we already have
+    const addMessage = (data) => {
+      if (data.seq) lastSeqRef.current = Math.max(lastSeqRef.current, data.seq);
+      setMessages((prev) => (prev.some((m) => m.id === data.id) ? prev : [...prev, data]));
     };
-    socket.onclose = () => {
-      console.log("WebSocket closed");
-      setIsConnecting(false);
-      wsRef.current = null;
+
+    const open = () => {
+      // after a drop, ask only for what we missed
+      const since = lastSeqRef.current ? `&since=${lastSeqRef.current}` : "";
+      if (wsRef.current) wsRef.current.close();
+      const socket = new WebSocket(`${socketUrl}${since}`);
+      wsRef.current = socket;
+
+      socket.onopen = () => {
+        console.log("WebSocket connected");
+        setIsConnecting(false);
+      };
+      socket.onmessage = (event) => {
+        try {
+          const data = JSON.parse(event.data);
+          if (data.type === "connection_success") setCurrentUser(data.user);
+          else if (data.type === "chat_message") addMessage(data);
+          else if (data.type === "resync_required") setHistoryVersion((v) => v + 1);
+        } catch (e) {
+          console.error("WS parse error", e);
+        }
+      };
+      socket.onerror = (e) => {
+        console.error("WebSocket error", e);
+        setIsConnecting(false);
+      };
+      socket.onclose = () => {
+        console.log("WebSocket closed");
+        setIsConnecting(false);
+        wsRef.current = null;
+        if (!closedByUs) {
+          setIsConnecting(true);
+          retryTimer = setTimeout(open, 2000);
+        }
+      };
+      setWs(socket);
     };
-    setWs(socket);
+    open();
+
     return () => {
-      if (socket.readyState === WebSocket.OPEN) socket.close();
+      closedByUs = true;
+      clearTimeout(retryTimer);
+      if (wsRef.current && wsRef.current.readyState === WebSocket.OPEN) wsRef.current.close();
       wsRef.current = null;
     };
   }, [selectedProjectId]);
@@ -108,6 +166,11 @@ const ChatPage = () => {
   };
 
   useEffect(() => {
+    // older pages go on top; stay where the reader is
+    if (keepScrollRef.current) {
+      keepScrollRef.current = false;
+      return;
+    }
     messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
   }, [messages]);
 
@@ -171,28 +234,42 @@ const ChatPage = () => {
                   <p className="text-sm mt-2 opacity-75">{isConnecting ? "" : "Be the first to start!"}</p>
                 </div>
               ) : (
-                messages.map((msg, index) => (
-                  <div key={msg.id || `${msg.timestamp}-${msg.message}-${index}`} className={`flex ${isOwnMessage(msg) ? "justify-end" : "justify-start"} px-2`}>
-                    <div className={`max-w-[75%] rounded-2xl px-4 py-2.5 text-sm shadow-md transform transition-all hover:scale-[1.01] select-text ${
-                      isOwnMessage(msg)
-                        ? "rounded-bl-lg bg-gradient-to-r from-blue-500 to-blue-600 text-white ml-4"
-                        : "rounded-br-lg bg-white/90 backdrop-blur-sm border border-gray-200/50 text-gray-900 mr-4 shadow-sm"
-                    }`}>
-                      <div className="mb-1 text-xs font-semibold opacity-90 truncate max-w-[200px]">
-                        {msg.sender?.github_username || msg.sender?.email || "User"}
-                      </div>
-                      <div className="whitespace-pre-wrap leading-relaxed break-words">
-                        {msg.message}
-                      </div>
-                      <div className={`mt-2 text-xs opacity-75 flex items-center gap-1 ${
-                        isOwnMessage(msg) ? "text-blue-100 justify-end" : "text-gray-500"
+                <>
+                  {olderCursor != null && (
+                    <div className="flex justify-center">
+                      <button
+                        type="button"
+                        onClick={loadOlder}
+                        disabled={loadingOlder}
+                        className="text-xs font-medium text-blue-600 bg-white/90 border border-gray-200 rounded-full px-4 py-1.5 shadow-sm hover:bg-blue-50 disabled:opacity-50"
+                      >
+                        {loadingOlder ? "Loading..." : "Load older messages"}
+                      </button>
+                    </div>
+                  )}
+                  {messages.map((msg, index) => (
+                    <div key={msg.id || `${msg.timestamp}-${msg.message}-${index}`} className={`flex ${isOwnMessage(msg) ? "justify-end" : "justify-start"} px-2`}>
+                      <div className={`max-w-[75%] rounded-2xl px-4 py-2.5 text-sm shadow-md transform transition-all hover:scale-[1.01] select-text ${
+                        isOwnMessage(msg)
+                          ? "rounded-bl-lg bg-gradient-to-r from-blue-500 to-blue-600 text-white ml-4"
+                          : "rounded-br-lg bg-white/90 backdrop-blur-sm border border-gray-200/50 text-gray-900 mr-4 shadow-sm"
                       }`}>
-                        {formatTime(msg.timestamp)}
-                        {isOwnMessage(msg) && <div className="w-3 h-3 bg-white/30 rounded-full" />}
+                        <div className="mb-1 text-xs font-semibold opacity-90 truncate max-w-[200px]">
+                          {msg.sender?.github_username || msg.sender?.email || "User"}
+                        </div>
+                        <div className="whitespace-pre-wrap leading-relaxed break-words">
+                          {msg.message}
+                        </div>
+                        <div className={`mt-2 text-xs opacity-75 flex items-center gap-1 ${
+                          isOwnMessage(msg) ? "text-blue-100 justify-end" : "text-gray-500"
+                        }`}>
+                          {formatTime(msg.timestamp)}
+                          {isOwnMessage(msg) && <div className="w-3 h-3 bg-white/30 rounded-full" />}
+                        </div>
                       </div>
                     </div>
-                  </div>
-                ))
+                  ))}
+                </>
               )}
               <div ref={messagesEndRef} />
             </div>
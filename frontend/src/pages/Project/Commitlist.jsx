@@ -6,6 +6,7 @@ import {
   RefreshCw, Github, AlertCircle
 } from 'lucide-react';
 import api from '../../api/api';
+import { useProjectEvents } from '../../api/events';
 
 const CommitRequests = () => {
   const { projectId } = useParams();
@@ -20,7 +21,7 @@ const CommitRequests = () => {
     try {
       setLoading(true);
       setError(null);
-      const res = await api.get(`/task_commit/commit_task/?project_id=${projectId}`);
+      const res = await api.get(`/task_commit/commit_task/?project_id=${projectId}&expand=completed_by`);
       setCommits(Array.isArray(res.data) ? res.data : []);
       console.log('Fetched commits:', res.data);
     } catch (err) {
@@ -36,11 +37,22 @@ const CommitRequests = () => {
     fetchCommits();
   }, [fetchCommits]);
 
+  // apply commit changes as they happen instead of refetching the list
+  const live = useProjectEvents(projectId, (event) => {
+    if (event.type === 'commit_created') {
+      setCommits(prev => (prev.some(c => c.id === event.commit.id) ? prev : [...prev, event.commit]));
+    } else if (event.type === 'commit_updated') {
+      setCommits(prev => prev.map(c => (c.id === event.commit.id ? event.commit : c)));
+    } else if (event.type === 'commit_deleted') {
+      setCommits(prev => prev.filter(c => c.id !== event.id));
+    }
+  });
+
   const handleAccept = async (commitId) => {
     try {
       setActionLoading(prev => ({ ...prev, [commitId]: 'accept' }));
       await api.post(`task_commit/task_request/accept/?commit_id=${commitId}`);
-      fetchCommits(); // Refresh data
+      if (!live.current) fetchCommits(); // otherwise the commit events update the list
     } catch (err) {
       console.error('Accept failed:', err);
       alert('Failed to accept commit');
@@ -53,7 +65,7 @@ const CommitRequests = () => {
     try {
       setActionLoading(prev => ({ ...prev, [commitId]: 'deny' }));
       await api.post(`/task_commit/task_request/deny/?commit_id=${commitId}`);
-      fetchCommits(); // Refresh data
+      if (!live.current) fetchCommits(); // otherwise the commit events update the list
     } catch (err) {
       console.error('Deny failed:', err);
       alert('Failed to deny commit');
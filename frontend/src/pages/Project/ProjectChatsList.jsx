@@ -2,13 +2,11 @@
 import React, { useContext, useEffect, useCallback } from "react";
 import { useNavigate } from "react-router-dom";
 import { UserDataContext } from "../../context/user";
-import { ProjectDataContext } from "../../context/project";
 import api from "../../api/api";
 import { fetchUserDataWithRefresh } from "../../api/auth";
 
 export default function ProjectChatsList({ onProjectSelect, selectedProjectId }) {
   const { userdata, setuserdata } = useContext(UserDataContext);
-  const { setProjectData } = useContext(ProjectDataContext);
   const navigate = useNavigate();
 
   const user = userdata?.user || {};
@@ -29,14 +27,14 @@ export default function ProjectChatsList({ onProjectSelect, selectedProjectId })
 
   const handleOpenChat = useCallback(async (projectId) => {
     try {
-      const res = await api.get(`/project/project_setup/?id=${projectId}`);
-      setProjectData(res.data);
-      onProjectSelect?.(projectId, res.data);
+      // the chat header only needs the project row and its counters
+      const res = await api.get(`/project/project_setup/?id=${projectId}&summary=1&fields=id,name,description`);
+      onProjectSelect?.(projectId, { ...res.data.project, stats: res.data.stats });
     } catch (err) {
       console.error("Error fetching project data:", err);
       onProjectSelect?.(projectId, { name: "Project", id: projectId });
     }
-  }, [onProjectSelect, setProjectData]);
+  }, [onProjectSelect]);
 
   const formatDate = (iso) => iso ? new Date(iso).toLocaleDateString() : "";
   const allProjects = [
@@ -12,7 +12,7 @@ import {
 } from "lucide-react";
 import { UserDataContext } from "../context/user";
 import { useNavigate } from "react-router-dom";
-import api from "../api/api";
+import api, { PROJECT_EXPAND } from "../api/api";
 import { ProjectDataContext } from "../context/project";
 import { fetchUserDataWithRefresh } from "../api/auth";
 
@@ -48,7 +48,7 @@ export default function TeamProjectDashboard() {
 
   const handleProjectClick = async (projectId) => {
     try {
-      const response = await api.get(`/project/project_setup/?id=${projectId}`);
+      const response = await api.get(`/project/project_setup/?id=${projectId}&expand=${PROJECT_EXPAND}`);
       console.log("Project data fetched:", response.data);
       setProjectData(response.data);
       navigate(`/project/${projectId}`);